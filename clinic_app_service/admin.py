@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Patient, MedicalRecord, Service, User, PriceList, PriceListEntry, Invoice, Appointment
+from .models import Patient, MedicalRecord, Service, User, PriceList, PriceListEntry, Invoice, Appointment, \
+    DoctorWorkingHours, DoctorBreak, DoctorDayOff
 from .forms import MedicalRecordForm
 
 admin.site.register(Patient)
@@ -10,4 +11,6 @@ admin.site.register(PriceList)
 admin.site.register(PriceListEntry)
 admin.site.register(Invoice)
 admin.site.register(Appointment)
-
+admin.site.register(DoctorWorkingHours)
+admin.site.register(DoctorBreak)
+admin.site.register(DoctorDayOff)
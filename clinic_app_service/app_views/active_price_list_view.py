@@ -1,14 +1,40 @@
 # views.py
 
+from django.db import transaction
 from django.db.models.query import QuerySet
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.views import APIView
 
-from ..models import PriceList, PriceListEntry, Service
+from ..models import PriceList, PriceListEntry
+from ..price_service import bump_price_version
 from ..serializers import CurrentPriceListEntrySerializer
 
 
+def carry_forward_prices(price_list: PriceList) -> int:
+    """
+    Переносить у прайс-лист останню відому ціну кожної неархівованої послуги, якої в ньому ще немає.
+    Одна вибірка (DISTINCT ON service_id) та одна пакетна вставка замість запитів на кожну послугу.
+    """
+    recent_entries = (
+        PriceListEntry.objects
+        .filter(service__is_service_archived=False)
+        .exclude(service_id__in=PriceListEntry.objects.filter(price_list=price_list).values('service_id'))
+        .order_by('service_id', '-price_list_id', '-id')
+        .distinct('service_id')
+        .values_list('service_id', 'price')
+    )
+
+    created_entries = PriceListEntry.objects.bulk_create(
+        PriceListEntry(price_list=price_list, service_id=service_id, price=price)
+        for service_id, price in recent_entries
+    )
+    # bulk_create не надсилає post_save, тож версію цін для знімків інших воркерів змінюємо явно
+    if created_entries:
+        bump_price_version(price_list.id)
+    return len(created_entries)
+
+
 class ActivePriceListView(APIView):
     def get(self, request):
         active_pl = PriceList.objects.filter(status='ACTIVE').first()
@@ -54,32 +80,18 @@ class ActivePriceListView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        PriceList.objects.update(status='INACTIVE')
-
-        pl.status = 'ACTIVE'
-        pl.save()
+        with transaction.atomic():
+            PriceList.objects.update(status='INACTIVE')
 
-        non_archived_services = Service.objects.filter(is_service_archived=False)
+            pl.status = 'ACTIVE'
+            pl.save()
 
-        for service in non_archived_services:
-            existing_entry = PriceListEntry.objects.filter(price_list=pl, service=service).exists()
-            if existing_entry:
-                continue
-
-            recent_entry = PriceListEntry.objects.filter(service=service).order_by('-price_list__id').first()
-
-            if not recent_entry:
-                continue
-
-            PriceListEntry.objects.create(
-                price_list=pl,
-                service=service,
-                price=recent_entry.price
-            )
+            carried_over_count = carry_forward_prices(pl)
 
         return JsonResponse({
             'payloadType': 'StatusResponseDto',
             'payload': {
-                'status': 'OK'
+                'status': 'OK',
+                'carriedOverEntries': carried_over_count
             }
         }, status=status.HTTP_200_OK)
@@ -0,0 +1,55 @@
+from django.http import JsonResponse
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework import status
+
+from ..appointment_service import transition_planned_appointments
+from ..auth_service import ClinicJWTAuthentication
+
+MAX_STATUS_BATCH_SIZE = 500
+
+
+class AppointmentStatusBatchView(APIView):
+    """
+    Масове завершення або скасування запланованих прийомів з результатом для кожного id.
+    """
+    authentication_classes = [ClinicJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        ids = request.data.get('ids')
+        new_status = request.data.get('status')
+
+        if new_status not in ('COMPLETED', 'CANCELED') or not isinstance(ids, list) or not ids:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': "Body must contain non-empty 'ids' list and 'status' COMPLETED or CANCELED."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if len(ids) > MAX_STATUS_BATCH_SIZE:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': f"At most {MAX_STATUS_BATCH_SIZE} appointments per request."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            appointment_ids = list(dict.fromkeys(int(appointment_id) for appointment_id in ids))
+        except (TypeError, ValueError):
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': "'ids' must contain integers."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        outcomes = transition_planned_appointments(appointment_ids, new_status)
+
+        return JsonResponse({
+            'payloadType': 'AppointmentStatusBatchDto',
+            'payload': {
+                'status': new_status,
+                'updated': sum(1 for outcome in outcomes.values() if outcome == 'UPDATED'),
+                'results': [
+                    {'id': appointment_id, 'outcome': outcomes[appointment_id]}
+                    for appointment_id in appointment_ids
+                ]
+            }
+        }, status=status.HTTP_200_OK)
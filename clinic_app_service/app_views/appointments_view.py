@@ -1,17 +1,55 @@
+from datetime import datetime, timedelta
 from math import ceil
 from django.db.models import QuerySet
 from django.http import JsonResponse
+from rest_framework.permissions import IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework import status
 from django.utils import timezone
 
 from ..models import Appointment
+from ..pagination_service import paginate_by_cursor, InvalidCursorError
+from ..count_service import count_registry
+from ..appointment_service import complete_appointment, cancel_appointment
+from ..auth_service import ClinicJWTAuthentication
+from ..availability_service import CLINIC_TZ, local_day_bounds
+
+
+def date_window(window, from_str, to_str):
+    """
+    Межі [початок, кінець) вікна у днях клініки: today, week (пн-нд поточного тижня) або custom (from..to включно).
+    """
+    today = timezone.now().astimezone(CLINIC_TZ).date()
+    if window == 'today':
+        first_day = last_day = today
+    elif window == 'week':
+        first_day = today - timedelta(days=today.weekday())
+        last_day = first_day + timedelta(days=6)
+    elif window == 'custom':
+        first_day = datetime.strptime(from_str, "%Y-%m-%d").date()
+        last_day = datetime.strptime(to_str or from_str, "%Y-%m-%d").date()
+    else:
+        raise ValueError(window)
+    return local_day_bounds(first_day)[0], local_day_bounds(last_day)[1]
+
 
 class AppointmentsView(APIView):
+    # Лікарі не є auth.User: працівник визначається за claim 'sub'; без валідного токена - 401
+    authentication_classes = [ClinicJWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
     def get(self, request):
         page = int(request.query_params.get('p', 1))
         per_page = int(request.query_params.get('q', 10))
         status_filter = request.query_params.get('status')
+        cursor = request.query_params.get('cursor')
+        window = request.query_params.get('window')
+
+        # Лікар бачить лише власні прийоми; інші ролі можуть обрати лікаря параметром doctorId
+        if request.user.user_type == 'DOCTOR':
+            doctor_id = request.user.id
+        else:
+            doctor_id = request.query_params.get('doctorId')
 
         qs: QuerySet[Appointment] = Appointment.objects.select_related(
             'doctor',
@@ -22,14 +60,40 @@ class AppointmentsView(APIView):
 
         if status_filter in ['PLANNED', 'CANCELED', 'COMPLETED']:
             qs = qs.filter(execution_status=status_filter)
-
-        qs = qs.order_by('appointment_date')
-
-        total_count = qs.count()
-
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        page_qs = qs[start_index:end_index]
+        if doctor_id:
+            qs = qs.filter(doctor_id=doctor_id)
+        if window:
+            try:
+                window_start, window_end = date_window(
+                    window, request.query_params.get('from'), request.query_params.get('to')
+                )
+            except (TypeError, ValueError):
+                return JsonResponse({
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {'detail': "Invalid 'window' (today, week, custom) or 'from'/'to' (YYYY-MM-DD)."}
+                }, status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(appointment_date__gte=window_start, appointment_date__lt=window_end)
+
+        is_filtered = status_filter in ['PLANNED', 'CANCELED', 'COMPLETED'] or bool(doctor_id) or bool(window)
+
+        qs = qs.order_by('appointment_date', 'id')
+
+        if cursor is not None:
+            try:
+                page_qs, next_cursor, prev_cursor = paginate_by_cursor(
+                    qs, ['appointment_date', 'id'], cursor, per_page
+                )
+            except InvalidCursorError as e:
+                return JsonResponse({
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {'detail': str(e)}
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            total_count, is_count_exact = count_registry(qs, is_filtered=is_filtered)
+
+            start_index = (page - 1) * per_page
+            end_index = start_index + per_page
+            page_qs = qs[start_index:end_index]
 
         entries = []
         for appt in page_qs:
@@ -56,6 +120,17 @@ class AppointmentsView(APIView):
                 "patientName": patient_name
             })
 
+        if cursor is not None:
+            return JsonResponse({
+                "payloadType": "AppointmentsRegistryDto",
+                "payload": {
+                    "perPage": per_page,
+                    "nextCursor": next_cursor,
+                    "prevCursor": prev_cursor,
+                    "entries": entries
+                }
+            }, status=status.HTTP_200_OK)
+
         total_pages = ceil(total_count / per_page)
 
         return JsonResponse({
@@ -64,6 +139,7 @@ class AppointmentsView(APIView):
                 "page": page,
                 "perPage": per_page,
                 "totalPages": total_pages,
+                "isCountExact": is_count_exact,
                 "entries": entries
             }
         }, status=status.HTTP_200_OK)
@@ -79,7 +155,7 @@ class AppointmentsView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            appt = Appointment.objects.select_related('doctor').get(pk=appt_id)
+            appt = Appointment.objects.select_related('doctor', 'price_list_entry').get(pk=appt_id)
         except Appointment.DoesNotExist:
             return JsonResponse({
                 'payloadType': 'ErrorResponseDto',
@@ -97,9 +173,7 @@ class AppointmentsView(APIView):
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        appt.execution_status = 'COMPLETED'
-        appt.completion_date = timezone.now()
-        appt.save()
+        complete_appointment(appt)
 
         return JsonResponse({
             'payloadType': 'StatusResponseDto',
@@ -118,15 +192,14 @@ class AppointmentsView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            appt = Appointment.objects.get(pk=appt_id)
+            appt = Appointment.objects.select_related('price_list_entry').get(pk=appt_id)
         except Appointment.DoesNotExist:
             return JsonResponse({
                 'payloadType': 'ErrorResponseDto',
                 'payload': {'detail': f'Appointment with id={appt_id} does not exist.'}
             }, status=status.HTTP_404_NOT_FOUND)
 
-        appt.execution_status = 'CANCELED'
-        appt.save()
+        cancel_appointment(appt)
 
         return JsonResponse({
             'payloadType': 'StatusResponseDto',
@@ -0,0 +1,100 @@
+from datetime import datetime, timedelta
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework import status
+
+from ..models import User
+from ..availability_service import (
+    free_slots, get_weekly_schedules, load_booked_masks, load_days_off, slot_label, unavailable_mask
+)
+
+MAX_GRID_DAYS = 31
+
+
+class AvailabilityGridView(APIView):
+    """
+    Вільні слоти лікар × день для послуги за діапазоном дат (from..to включно).
+    Слоти кожного лікаря будуються з його власного графіка та тривалості прийому послуги.
+    """
+
+    def get(self, request):
+        service_name = request.query_params.get('service')
+        from_str = request.query_params.get('from')
+        to_str = request.query_params.get('to', from_str)
+
+        if not service_name or not from_str:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "Missing 'service' or 'from' query parameter."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            first_day = datetime.strptime(from_str, "%Y-%m-%d").date()
+            last_day = datetime.strptime(to_str, "%Y-%m-%d").date()
+        except ValueError:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "Invalid date format. Use YYYY-MM-DD."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        days_count = (last_day - first_day).days + 1
+        if days_count < 1 or days_count > MAX_GRID_DAYS:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"Date range must contain 1..{MAX_GRID_DAYS} days."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        days = [first_day + timedelta(days=i) for i in range(days_count)]
+
+        doctors = list(User.objects.filter(
+            user_type='DOCTOR',
+            services__service_name=service_name
+        ).order_by('last_name', 'first_name', 'middle_name').values(
+            'id', 'last_name', 'first_name', 'middle_name', 'qualification', 'schedule_version',
+            'services__slot_minutes'
+        ))
+        doctor_ids = [doc['id'] for doc in doctors]
+
+        schedules = get_weekly_schedules({doc['id']: doc['schedule_version'] for doc in doctors}) if doctors else {}
+        booked = load_booked_masks(doctor_ids, first_day, last_day) if doctors else {}
+        days_off = load_days_off(doctor_ids, first_day, last_day) if doctors else set()
+
+        now = timezone.now()
+        past_masks = {day: unavailable_mask(day, now) for day in days}
+
+        first_available = None
+        doctor_entries = []
+        for doc in doctors:
+            availability = []
+            for day in days:
+                if (doc['id'], day) in days_off:
+                    availability.append([])
+                    continue
+
+                slots = free_slots(schedules[doc['id']], doc['services__slot_minutes'], day,
+                                   booked.get((doc['id'], day), 0) | past_masks[day])
+                availability.append([slot_label(slot) for slot in slots])
+
+                if slots and (first_available is None or (day, slots[0].start_tick) < first_available[1:3]):
+                    first_available = (doc['id'], day, slots[0].start_tick, slots[0])
+
+            doctor_entries.append({
+                "id": doc['id'],
+                "displayName": f"{doc['last_name']} {doc['first_name']} {doc['middle_name']} "
+                               f"({doc['qualification']})".strip(),
+                "availability": availability
+            })
+
+        return JsonResponse({
+            "payloadType": "AvailabilityGridDto",
+            "payload": {
+                "days": [day.isoformat() for day in days],
+                "doctors": doctor_entries,
+                "firstAvailable": {
+                    "doctorId": first_available[0],
+                    "date": first_available[1].isoformat(),
+                    "time": slot_label(first_available[3])
+                } if first_available else None
+            }
+        }, status=status.HTTP_200_OK)
@@ -1,15 +1,18 @@
-from datetime import datetime, timedelta
+from datetime import datetime
 from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework import status
-import pytz
 
-from clinic_app_service.models import Appointment
+from clinic_app_service.models import Service, User
+from clinic_app_service.availability_service import (
+    DEFAULT_SLOT_MINUTES, free_slots, get_weekly_schedules, load_booked_masks, load_days_off, slot_label
+)
 
 class AvailableTimesView(APIView):
     def get(self, request):
         doctor_id = request.query_params.get('doctorId')
         date_str = request.query_params.get('date')
+        service_name = request.query_params.get('service')
 
         if not doctor_id or not date_str:
             return JsonResponse({
@@ -18,49 +21,34 @@ class AvailableTimesView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            naive_date = datetime.strptime(date_str, "%Y-%m-%d")
-            tz = pytz.FixedOffset(120)
-            local_date = tz.localize(naive_date)
+            day = datetime.strptime(date_str, "%Y-%m-%d").date()
+            doctor_id = int(doctor_id)
         except ValueError:
             return JsonResponse({
                 "payloadType": "ErrorResponseDto",
                 "payload": {"detail": "Invalid date format. Use YYYY-MM-DD."}
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        if local_date.weekday() in [5, 6]:
+        schedule_version = User.objects.filter(pk=doctor_id, user_type='DOCTOR') \
+            .values_list('schedule_version', flat=True).first()
+        if schedule_version is None:
             return JsonResponse({
-                "payloadType": "AvailableTimes",
-                "payload": {"entries": []}
-            }, status=status.HTTP_200_OK)
-
-        existing_appointments = Appointment.objects.filter(
-            doctor_id=doctor_id,
-            appointment_date__year=local_date.year,
-            appointment_date__month=local_date.month,
-            appointment_date__day=local_date.day
-        ).exclude(execution_status='CANCELED').values_list('appointment_date', flat=True)
-
-        tz = pytz.FixedOffset(120)
-        taken_slots = {appt.astimezone(tz).time() for appt in existing_appointments}
-
-        start_time = datetime.strptime("09:00", "%H:%M").time()
-        end_time = datetime.strptime("18:00", "%H:%M").time()
-        slot_duration = timedelta(minutes=30)
-
-        available_slots = []
-
-        naive_start = datetime.combine(local_date.date(), start_time)
-        current_time = tz.localize(naive_start)
-
-        while current_time.time() < end_time:
-            next_time = current_time + slot_duration
-
-            if current_time.time() not in taken_slots:
-                available_slots.append(
-                    f"{current_time.strftime('%H:%M')} - {next_time.strftime('%H:%M')}"
-                )
-
-            current_time = next_time
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"Doctor with id={doctor_id} does not exist."}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Тривалість слоту - за послугою, якщо її вказано
+        slot_minutes = DEFAULT_SLOT_MINUTES
+        if service_name:
+            slot_minutes = Service.objects.filter(service_name=service_name) \
+                .values_list('slot_minutes', flat=True).first() or DEFAULT_SLOT_MINUTES
+
+        if load_days_off([doctor_id], day, day):
+            available_slots = []
+        else:
+            schedule = get_weekly_schedules({doctor_id: schedule_version})[doctor_id]
+            booked = load_booked_masks([doctor_id], day, day).get((doctor_id, day), 0)
+            available_slots = [slot_label(slot) for slot in free_slots(schedule, slot_minutes, day, booked)]
 
         return JsonResponse({
             "payloadType": "AvailableTimes",
@@ -2,7 +2,10 @@ from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework import status
 
-from ..models import PriceList, PriceListEntry, Patient
+from ..models import Patient
+from ..price_service import get_price_table, to_cents, apply_discount_cents, BENEFIT_GROUP_DISCOUNTS
+
+MAX_BATCH_QUOTE_CARTS = 200
 
 class CalculateTotalsView(APIView):
     def post(self, request):
@@ -31,40 +34,92 @@ class CalculateTotalsView(APIView):
                 "payload": {"detail": f"Patient with id={patient_id} not found."}
             }, status=status.HTTP_404_NOT_FOUND)
 
-        discount_map = {
-            "military": 20,
-            "elderly": 10,
-            "disabled": 5,
-            "staff_family": 40
-        }
-        discount_percent = discount_map.get(patient.benefit_group, 0)
+        discount_percent = BENEFIT_GROUP_DISCOUNTS.get(patient.benefit_group, 0)
+
+        price_table = get_price_table()
+        if price_table is None:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "No active price list found."}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Ті самі копійки й округлення, що й у BatchQuoteView, тож обидва ендпоінти рахують кошик однаково
+        prices = (price_table.price_of(svc) for svc in services)
+        subtotal_cents = sum(to_cents(price) for price in prices if price is not None)
+        total_cents = apply_discount_cents(subtotal_cents, discount_percent)
+
+        return JsonResponse({
+            "payloadType": "ServicesTotalDto",
+            "payload": {
+                "subtotal": subtotal_cents / 100,
+                "discount": float(discount_percent),
+                "total": total_cents / 100
+            }
+        }, status=status.HTTP_200_OK)
+
+
+class BatchQuoteView(APIView):
+    def post(self, request):
+        carts = request.data.get("carts", [])
+        if not isinstance(carts, list) or len(carts) == 0 or len(carts) > MAX_BATCH_QUOTE_CARTS:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {
+                    "detail": f"Request body must include 'carts' as a list of 1..{MAX_BATCH_QUOTE_CARTS} items."
+                }
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        for cart in carts:
+            if not isinstance(cart, dict) or not cart.get("patientId") or not isinstance(cart.get("services"), list):
+                return JsonResponse({
+                    "payloadType": "ErrorResponseDto",
+                    "payload": {"detail": "Each cart must include 'patientId' and a 'services' list."}
+                }, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            active_pl = PriceList.objects.get(status='ACTIVE')
-        except PriceList.DoesNotExist:
+            patient_ids = {int(cart["patientId"]) for cart in carts}
+        except (TypeError, ValueError):
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "'patientId' must be an integer."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        benefit_groups = dict(Patient.objects.filter(pk__in=patient_ids).values_list('id', 'benefit_group'))
+        missing_ids = patient_ids - benefit_groups.keys()
+        if missing_ids:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"Patients not found: {sorted(missing_ids)}."}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        price_table = get_price_table()
+        if price_table is None:
             return JsonResponse({
                 "payloadType": "ErrorResponseDto",
                 "payload": {"detail": "No active price list found."}
             }, status=status.HTTP_404_NOT_FOUND)
 
-        entries_qs = PriceListEntry.objects.select_related('service').filter(
-            price_list=active_pl,
-            service__service_name__in=services
-        )
+        price_cents = {name: to_cents(entry.price) for name, entry in price_table.entries.items()}
 
-        subtotal = 0.0
-        found_services = {e.service.service_name: float(e.price) for e in entries_qs}
-        for svc in services:
-            price_val = found_services.get(svc, 0.0)
-            subtotal += price_val
+        quotes = []
+        for cart in carts:
+            patient_id = int(cart["patientId"])
+            discount_percent = BENEFIT_GROUP_DISCOUNTS.get(benefit_groups[patient_id], 0)
 
-        total = subtotal * (100 - discount_percent) / 100.0
+            subtotal_cents = sum(price_cents.get(svc, 0) for svc in cart["services"])
+            total_cents = apply_discount_cents(subtotal_cents, discount_percent)
+
+            quotes.append({
+                "patientId": patient_id,
+                "subtotal": subtotal_cents / 100,
+                "discount": float(discount_percent),
+                "total": total_cents / 100,
+                "unknownServices": [svc for svc in cart["services"] if svc not in price_cents]
+            })
 
         return JsonResponse({
-            "payloadType": "ServicesTotalDto",
+            "payloadType": "ServicesTotalsBatchDto",
             "payload": {
-                "subtotal": round(subtotal, 2),
-                "discount": float(discount_percent),
-                "total": round(total, 2)
+                "quotes": quotes
             }
-        }, status=status.HTTP_200_OK)
\ No newline at end of file
+        }, status=status.HTTP_200_OK)
@@ -2,7 +2,7 @@ from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework import status
 
-from ..models import PriceList, PriceListEntry, Patient
+from ..price_service import get_price_table
 
 class CartCalculationView(APIView):
     def post(self, request):
@@ -16,27 +16,17 @@ class CartCalculationView(APIView):
                 }
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            active_pl = PriceList.objects.get(status='ACTIVE')
-        except PriceList.DoesNotExist:
+        price_table = get_price_table()
+        if price_table is None:
             return JsonResponse({
                 "payloadType": "ErrorResponseDto",
                 "payload": {"detail": "No active price list found."}
             }, status=status.HTTP_404_NOT_FOUND)
 
-        entries_qs = PriceListEntry.objects.select_related('service').filter(
-            price_list=active_pl,
-            service__service_name__in=services
-        )
-
-        found_services = {e.service.service_name: float(e.price) for e in entries_qs}
-
         prices_list = []
         for svc in services:
-            if svc in found_services:
-                prices_list.append({"service": svc, "price": found_services[svc]})
-            else:
-                prices_list.append({"service": svc, "price": 0.0})
+            price = price_table.price_of(svc)
+            prices_list.append({"service": svc, "price": float(price) if price is not None else 0.0})
 
         return JsonResponse({
             "payloadType": "ServicesPricesDto",
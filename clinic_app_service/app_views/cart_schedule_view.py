@@ -0,0 +1,114 @@
+from datetime import datetime, timedelta
+from django.http import JsonResponse
+from django.utils import timezone
+from rest_framework.views import APIView
+from rest_framework import status
+
+from ..models import Patient, User
+from ..availability_service import (
+    CLINIC_TZ, get_weekly_schedules, load_booked_masks, load_days_off, load_patient_booked_masks, slot_label,
+    unavailable_mask
+)
+from ..scheduling_service import schedule_cart
+
+DEFAULT_SCHEDULE_DAYS = 14
+MAX_SCHEDULE_DAYS = 31
+
+
+class CartScheduleView(APIView):
+    """
+    Підбирає найраніші слоти для всіх послуг кошика пацієнта.
+    Відповідь має формат 'appointments' для create-appointments.
+    """
+
+    def post(self, request):
+        patient_id = request.query_params.get('patientId')
+        body = request.data
+        services = body.get('services', [])
+
+        if not patient_id or not isinstance(services, list) or len(services) == 0:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "Missing 'patientId' query parameter or non-empty 'services' list."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            first_day = datetime.strptime(body['from'], "%Y-%m-%d").date() if body.get('from') \
+                else timezone.now().astimezone(CLINIC_TZ).date()
+            days_count = int(body.get('days', DEFAULT_SCHEDULE_DAYS))
+        except (TypeError, ValueError):
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "Invalid 'from' (YYYY-MM-DD) or 'days' value."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if days_count < 1 or days_count > MAX_SCHEDULE_DAYS:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"'days' must be within 1..{MAX_SCHEDULE_DAYS}."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not Patient.objects.filter(pk=patient_id).exists():
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"Patient with id={patient_id} does not exist."}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        doctors = {}
+        schedule_versions = {}
+        doctors_by_service = {name: [] for name in services}
+        slot_minutes_by_service = {}
+        qualified = User.objects.filter(
+            user_type='DOCTOR',
+            services__service_name__in=set(services)
+        ).order_by('last_name', 'first_name', 'middle_name', 'id').values_list(
+            'services__service_name', 'services__slot_minutes', 'id', 'schedule_version',
+            'last_name', 'first_name', 'middle_name'
+        )
+        for service_name, slot_minutes, doctor_id, schedule_version, last_name, first_name, middle_name in qualified:
+            doctors_by_service[service_name].append(doctor_id)
+            slot_minutes_by_service[service_name] = slot_minutes
+            schedule_versions[doctor_id] = schedule_version
+            doctors[doctor_id] = f"{last_name} {first_name} {middle_name}".strip()
+
+        unqualified = [name for name, doctor_ids in doctors_by_service.items() if not doctor_ids]
+        if unqualified:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"No doctors provide services: {', '.join(unqualified)}"}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        days = [first_day + timedelta(days=i) for i in range(days_count)]
+        last_day = days[-1]
+
+        schedules = get_weekly_schedules(schedule_versions)
+        booked_masks = load_booked_masks(doctors.keys(), first_day, last_day)
+        days_off = load_days_off(doctors.keys(), first_day, last_day)
+        patient_masks = load_patient_booked_masks(patient_id, first_day, last_day)
+
+        now = timezone.now()
+        blocked_masks = {day: unavailable_mask(day, now) | patient_masks.get(day, 0) for day in days}
+
+        slots = schedule_cart(services, doctors_by_service, slot_minutes_by_service, schedules, days,
+                              booked_masks, days_off, blocked_masks, same_day=bool(body.get('sameDay', False)))
+        if slots is None:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "No free slots for the whole cart in the given range."}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return JsonResponse({
+            "payloadType": "CartScheduleDto",
+            "payload": {
+                "appointments": [
+                    {
+                        "service": slot.service_name,
+                        "doctorId": slot.doctor_id,
+                        "doctorName": doctors[slot.doctor_id],
+                        "date": slot.day.isoformat(),
+                        "time": slot_label(slot.slot)
+                    }
+                    for slot in slots
+                ]
+            }
+        }, status=status.HTTP_200_OK)
@@ -1,13 +1,28 @@
+from collections import defaultdict
 from django.db import transaction
 from django.utils.timezone import now
-from ..models import Invoice, PriceListEntry, Appointment, Patient, PriceList, User
+from ..models import Invoice, Appointment, Patient, User
 from datetime import datetime
 from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework import status
-import pytz
+from ..appointment_service import SlotConflictError, reserve_slots
+from ..availability_service import CLINIC_TZ
+from ..outbox_service import enqueue_appointment_notifications
+from ..price_service import BENEFIT_GROUP_DISCOUNTS, get_price_table
+
+
+def parse_requested_appointment(appt) -> tuple[str, int, datetime]:
+    """
+    Розбирає елемент запиту на (послуга, id лікаря, початок прийому в часовому поясі клініки).
+    """
+    service_name = appt['service']
+    if not isinstance(service_name, str):
+        raise TypeError("'service' must be a string.")
+    start_time = appt['time'].split(' - ')[0]
+    start = CLINIC_TZ.localize(datetime.strptime(f"{appt['date']} {start_time}", "%Y-%m-%d %H:%M"))
+    return service_name, int(appt['doctorId']), start
 
-from ..mail_service import send_appointment_notification
 
 class CreateAppointmentView(APIView):
     def post(self, request):
@@ -20,6 +35,20 @@ class CreateAppointmentView(APIView):
                 "payload": {"detail": "Missing 'patientId' query parameter or appointments data."}
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        # Увесь список перевіряється до запитів до БД: порожній чи хибний елемент - це 400, а не 500 чи 404
+        requested = body['appointments']
+        try:
+            if not isinstance(requested, list) or not requested:
+                raise ValueError("'appointments' must be a non-empty list.")
+            parsed = [parse_requested_appointment(appt) for appt in requested]
+        except (AttributeError, KeyError, TypeError, ValueError):
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": "'appointments' must be a non-empty list; each appointment needs 'service', "
+                                      "numeric 'doctorId', 'date' (YYYY-MM-DD) and 'time' (HH:MM - HH:MM)."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        service_names = {service_name for service_name, _, _ in parsed}
+
         try:
             patient = Patient.objects.get(pk=patient_id)
         except Patient.DoesNotExist:
@@ -28,99 +57,86 @@ class CreateAppointmentView(APIView):
                 "payload": {"detail": f"Patient with id={patient_id} does not exist."}
             }, status=status.HTTP_404_NOT_FOUND)
 
-        try:
-            price_list = PriceList.objects.get(status='ACTIVE')
-        except PriceList.DoesNotExist:
+        price_table = get_price_table()
+        if price_table is None:
             return JsonResponse({
                 "payloadType": "ErrorResponseDto",
                 "payload": {"detail": "No active price list found."}
             }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
-        service_names = {appt['service'] for appt in body['appointments']}
-        price_entries = PriceListEntry.objects.filter(
-            price_list=price_list,
-            service__service_name__in=service_names
-        ).select_related('service')
+        unknown_services = sorted(service_names - price_table.entries.keys())
+        if unknown_services:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"Price entry not found for services: {', '.join(unknown_services)}"}
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        # Усі пари лікар/послуга перевіряються до відкриття транзакції, одним запитом до лікарів
+        doctor_services = defaultdict(set)
+        for doctor_id, service_name in User.objects.filter(
+                pk__in={doctor_id for _, doctor_id, _ in parsed}, user_type='DOCTOR'
+        ).values_list('id', 'services__service_name'):
+            doctor_services[doctor_id].add(service_name)
 
-        if not price_entries.exists():
+        missing_doctors = sorted({doctor_id for _, doctor_id, _ in parsed} - doctor_services.keys())
+        if missing_doctors:
             return JsonResponse({
                 "payloadType": "ErrorResponseDto",
-                "payload": {"detail": "No price list entries found for provided services."}
+                "payload": {"detail": f"Doctors do not exist: {missing_doctors}"}
             }, status=status.HTTP_404_NOT_FOUND)
 
-        subtotal = sum(entry.price for entry in price_entries)
-        discount_percent = {
-            'military': 20,
-            'elderly': 10,
-            'disabled': 5,
-            'staff_family': 40
-        }.get(patient.benefit_group, 0)
+        mismatched = [
+            f"{doctor_id}/{service_name}" for service_name, doctor_id, _ in parsed
+            if service_name not in doctor_services[doctor_id]
+        ]
+        if mismatched:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {"detail": f"Doctors do not provide services (doctorId/service): {', '.join(mismatched)}"}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        priced_services = {name: price_table.entries[name] for name in service_names}
+        subtotal = sum(entry.price for entry in priced_services.values())
+        discount_percent = BENEFIT_GROUP_DISCOUNTS.get(patient.benefit_group, 0)
         total = subtotal * (100 - discount_percent) / 100
 
-        with transaction.atomic():
-            invoice = Invoice.objects.create(
-                subtotal=subtotal,
-                discount_percent=discount_percent,
-                total=total,
-                paid_date=now()
-            )
-
-            appointments = []
-            for appt in body['appointments']:
-                service_name = appt['service']
-                doctor_id = appt['doctorId']
-                appt_date_str = appt['date']
-                appt_time_str = appt['time'].split(" - ")[0]
-
-                try:
-                    price_entry = price_entries.get(service__service_name=service_name)
-                except PriceListEntry.DoesNotExist:
-                    return JsonResponse({
-                        "payloadType": "ErrorResponseDto",
-                        "payload": {"detail": f"Price entry not found for service: {service_name}"}
-                    }, status=status.HTTP_404_NOT_FOUND)
-
-                appointment_datetime = datetime.strptime(
-                    f"{appt_date_str} {appt_time_str}", "%Y-%m-%d %H:%M"
-                )
-                utc_plus_2 = pytz.FixedOffset(120)
-                dt_with_tz = utc_plus_2.localize(appointment_datetime)
-
-                appointment = Appointment(
-                    patient=patient,
-                    doctor_id=doctor_id,
-                    price_list_entry=price_entry,
-                    invoice=invoice,
-                    execution_status="PLANNED",
-                    appointment_date=dt_with_tz,
-                    completion_date=None
-                )
-                appointments.append(appointment)
-
-            Appointment.objects.bulk_create(appointments)
-
-            for appt in appointments:
-                try:
-                    doctor = User.objects.get(pk=appt.doctor_id)
-                except User.DoesNotExist:
-                    continue
-
-                doctor_name = f"{doctor.first_name} {doctor.last_name}"
-                doctor_email = doctor.email
-                patient_name = f"{patient.last_name} {patient.first_name} {patient.middle_name}"
-                appt_date_formatted = appt.appointment_date.strftime("%d.%m.%Y")
-                appt_time_formatted = appt.appointment_date.strftime("%H:%M")
-
-                send_appointment_notification(
-                    doctor_email=doctor_email,
-                    doctor_name=doctor_name,
-                    patient_name=patient_name,
-                    appointment_date=appt_date_formatted,
-                    appointment_time=appt_time_formatted,
-                    patient_id=patient.id,
-                    patient_sex=patient.gender
+        try:
+            with transaction.atomic():
+                invoice = Invoice.objects.create(
+                    subtotal=subtotal,
+                    discount_percent=discount_percent,
+                    total=total,
+                    paid_date=now()
                 )
 
+                appointments = [
+                    Appointment(
+                        patient=patient,
+                        doctor_id=doctor_id,
+                        price_list_entry_id=priced_services[service_name].entry_id,
+                        invoice=invoice,
+                        execution_status="PLANNED",
+                        appointment_date=appointment_date,
+                        completion_date=None
+                    )
+                    for service_name, doctor_id, appointment_date in parsed
+                ]
+
+                # Конкурентні бронювання того самого лікаря серіалізуються локом його розкладу
+                reserve_slots(appointments, [priced_services[service_name].slot_minutes
+                                             for service_name, _, _ in parsed])
+
+                # Листи надсилає воркер drain_email_outbox після коміту, а не під час відкритої транзакції
+                enqueue_appointment_notifications(appointments)
+        except SlotConflictError as error:
+            return JsonResponse({
+                "payloadType": "ErrorResponseDto",
+                "payload": {
+                    "detail": "Some of the requested slots are already taken.",
+                    "conflicts": error.conflicts
+                }
+            }, status=status.HTTP_409_CONFLICT)
+
         return JsonResponse({
             "payloadType": "StatusResponseDto",
             "payload": {"status": "Appointments successfully created."}
@@ -7,7 +7,8 @@ from jinja2 import Environment, FileSystemLoader
 from weasyprint import HTML
 from rest_framework.views import APIView
 
-from ..models import Patient, PriceList, PriceListEntry
+from ..models import Patient
+from ..price_service import get_price_table
 
 class DynamicInvoiceView(APIView):
     def post(self, request):
@@ -33,9 +34,8 @@ class DynamicInvoiceView(APIView):
         if not isinstance(appointments, list) or len(appointments) == 0:
             return HttpResponse("Invalid or empty 'appointments' array.", status=400)
 
-        try:
-            active_price_list = PriceList.objects.get(status='ACTIVE')
-        except PriceList.DoesNotExist:
+        price_table = get_price_table()
+        if price_table is None:
             return HttpResponse("Active PriceList not found.", status=500)
 
         items_data = []
@@ -47,12 +47,8 @@ class DynamicInvoiceView(APIView):
             combined_date = f"{appt_date_str} {appt_time_str}".strip() or '-'
             service_name = appt.get('service', '').strip()
 
-            entry = PriceListEntry.objects.filter(
-                price_list=active_price_list,
-                service__service_name=service_name
-            ).first()
-
-            price_value = float(entry.price) if entry else 0.00
+            price = price_table.price_of(service_name)
+            price_value = float(price) if price is not None else 0.00
             subtotal += price_value
 
             items_data.append({
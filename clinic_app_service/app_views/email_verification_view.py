@@ -1,11 +1,15 @@
+import logging
 import random
+
 from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework import status
 
-from ..mail_service import send_email_verification_notification
+from ..mail_service import MailDeliveryError, send_email_verification_notification
 from ..models import User, Verification
 
+logger = logging.getLogger(__name__)
+
 
 class SendVerificationCodeView(APIView):
     def get(self, request):
@@ -28,8 +32,20 @@ class SendVerificationCodeView(APIView):
             }, status=status.HTTP_400_BAD_REQUEST)
         except Verification.DoesNotExist:
             code = random.randint(100000, 999999)
-            Verification.objects.create(email=email, code=code)
-            send_email_verification_notification(email, code)
+            # Код комітиться до звернення до пошти, тож транзакція не тримається відкритою під час надсилання
+            verification = Verification.objects.create(email=email, code=code)
+            try:
+                send_email_verification_notification(email, code)
+            except MailDeliveryError:
+                logger.exception("Failed to send verification code to %s", email)
+                # Якщо лист не надіслано, код видаляється й запит можна повторити
+                verification.delete()
+                return JsonResponse({
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {
+                        "detail": "Failed to send verification email. Try again later."
+                    }
+                }, status=status.HTTP_502_BAD_GATEWAY)
 
             return JsonResponse({
                 'payloadType': 'StatusResponseDto',
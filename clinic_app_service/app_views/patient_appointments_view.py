@@ -1,13 +1,48 @@
+import json
+from datetime import datetime
 from django.db.models import QuerySet
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework import status
 
+from ..availability_service import local_day_bounds
 from ..models import Appointment, Patient
+from ..pagination_service import paginate_by_cursor, InvalidCursorError
+
+PATIENT_APPOINTMENTS_ORDER = ['-appointment_date', '-id']
+STREAM_CHUNK_SIZE = 500
+
+
+def appointment_entry(appt: Appointment, patient_name: str) -> dict:
+    doc = appt.doctor
+    base_price = float(appt.price_list_entry.price)
+    discount_percent = appt.invoice.discount_percent if appt.invoice else 0
+    total_price = base_price * (100 - discount_percent) / 100
+
+    return {
+        "id": appt.id,
+        "service": appt.price_list_entry.service.service_name,
+        "appointmentDate": int(appt.appointment_date.timestamp() * 1000) if appt.appointment_date else 0,
+        "status": appt.execution_status,
+        "price": round(total_price, 2),
+        "doctorName": f"{doc.last_name} {doc.first_name} {doc.middle_name}".strip(),
+        "patientName": patient_name
+    }
+
 
 class PatientAppointmentsView(APIView):
+    """
+    Історія прийомів пацієнта від найновіших: keyset-сторінки (cursor) або потік NDJSON (output=ndjson).
+    Фільтри: status, from/to (дні клініки включно).
+    """
+
     def get(self, request):
         patient_id = request.query_params.get('id')
+        per_page = int(request.query_params.get('q', 10))
+        cursor = request.query_params.get('cursor')
+        status_filter = request.query_params.get('status')
+        from_str = request.query_params.get('from')
+        to_str = request.query_params.get('to')
 
         if not patient_id:
             return JsonResponse({
@@ -28,40 +63,49 @@ class PatientAppointmentsView(APIView):
             'price_list_entry',
             'price_list_entry__service',
             'invoice'
-        ).order_by('-appointment_date')
-
-        entries = []
-        for appt in qs:
-            doc = appt.doctor
-            service_name = appt.price_list_entry.service.service_name
-            base_price = float(appt.price_list_entry.price)
-
-            discount_percent = appt.invoice.discount_percent if appt.invoice else 0
-            total_price = base_price * (100 - discount_percent) / 100
+        )
 
-            doc_name = f"{doc.last_name} {doc.first_name} {doc.middle_name}".strip()
-            patient_name = f"{patient.last_name} {patient.first_name} {patient.middle_name}".strip()
+        if status_filter in ['PLANNED', 'CANCELED', 'COMPLETED']:
+            qs = qs.filter(execution_status=status_filter)
+        try:
+            if from_str:
+                qs = qs.filter(appointment_date__gte=local_day_bounds(
+                    datetime.strptime(from_str, "%Y-%m-%d").date())[0])
+            if to_str:
+                qs = qs.filter(appointment_date__lt=local_day_bounds(
+                    datetime.strptime(to_str, "%Y-%m-%d").date())[1])
+        except ValueError:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': "Invalid 'from' or 'to' date format. Use YYYY-MM-DD."}
+            }, status=status.HTTP_400_BAD_REQUEST)
 
-            appt_date_ts = int(appt.appointment_date.timestamp() * 1000) if appt.appointment_date else 0
+        patient_name = f"{patient.last_name} {patient.first_name} {patient.middle_name}".strip()
 
-            entries.append({
-                "id": appt.id,
-                "service": service_name,
-                "appointmentDate": appt_date_ts,
-                "status": appt.execution_status,
-                "price": round(total_price, 2),
-                "doctorName": doc_name,
-                "patientName": patient_name
-            })
+        if request.query_params.get('output') == 'ndjson':
+            # Уся відфільтрована історія потоком: рядки читаються з БД порціями, а не в одну пам'ять
+            rows = qs.order_by(*PATIENT_APPOINTMENTS_ORDER).iterator(chunk_size=STREAM_CHUNK_SIZE)
+            return StreamingHttpResponse(
+                (json.dumps(appointment_entry(appt, patient_name), ensure_ascii=False) + '\n' for appt in rows),
+                content_type='application/x-ndjson'
+            )
 
-            print(entries)
+        try:
+            page_qs, next_cursor, prev_cursor = paginate_by_cursor(
+                qs, PATIENT_APPOINTMENTS_ORDER, cursor, per_page
+            )
+        except InvalidCursorError as e:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': str(e)}
+            }, status=status.HTTP_400_BAD_REQUEST)
 
         return JsonResponse({
             "payloadType": "AppointmentsRegistryDto",
             "payload": {
-                "page": 0,
-                "perPage": 0,
-                "totalPages": 0,
-                "entries": entries
+                "perPage": per_page,
+                "nextCursor": next_cursor,
+                "prevCursor": prev_cursor,
+                "entries": [appointment_entry(appt, patient_name) for appt in page_qs]
             }
         }, status=status.HTTP_200_OK)
@@ -0,0 +1,110 @@
+import csv
+import io
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.http import JsonResponse
+from rest_framework import status
+from rest_framework.views import APIView
+
+from ..models import PriceList, PriceListEntry, Service
+from .price_lists_view import PRICE_LIST_ENTRIES_BATCH_SIZE
+
+
+class PriceListImportError(Exception):
+    pass
+
+
+def _parse_price(raw_price: str, row_number: int) -> Decimal:
+    # Ті самі правила поля PriceListEntry.price, що й у validate_price_list_entries
+    try:
+        return PriceListEntry._meta.get_field('price').clean(raw_price.strip().replace(',', '.'), None)
+    except ValidationError as e:
+        raise PriceListImportError(f"Invalid price '{raw_price}' in row {row_number}: {' '.join(e.messages)}")
+
+
+def _import_batch(price_list: PriceList, batch: list[tuple[int, str, Decimal]]) -> int:
+    names = {name for _, name, _ in batch}
+    service_ids = dict(Service.objects.filter(service_name__in=names).values_list('service_name', 'id'))
+
+    unknown_rows = [f"{name} (row {row_number})" for row_number, name, _ in batch if name not in service_ids]
+    if unknown_rows:
+        raise PriceListImportError(f"Services do not exist: {', '.join(unknown_rows)}")
+
+    PriceListEntry.objects.bulk_create(
+        PriceListEntry(price_list=price_list, service_id=service_ids[name], price=price)
+        for _, name, price in batch
+    )
+    return len(batch)
+
+
+class PriceListImportView(APIView):
+    """
+    Імпорт прайс-листа з CSV (колонки: назва послуги, ціна; рядок заголовка необов'язковий).
+    Файл читається потоково, назви послуг зіставляються пакетами по PRICE_LIST_ENTRIES_BATCH_SIZE рядків.
+    """
+
+    def post(self, request):
+        name = request.query_params.get('name')
+        upload = request.FILES.get('file')
+
+        if not name or upload is None:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': "Missing 'name' query param or 'file' upload."}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        rows = csv.reader(io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline=''))
+
+        try:
+            with transaction.atomic():
+                price_list = PriceList.objects.create(name=name, status='INACTIVE', is_archived=False)
+
+                imported_count = 0
+                seen_names = set()
+                batch = []
+                for row_number, row in enumerate(rows, start=1):
+                    if not row or not any(cell.strip() for cell in row):
+                        continue
+                    if len(row) < 2:
+                        raise PriceListImportError(f"Row {row_number} must contain service name and price.")
+
+                    service_name, raw_price = row[0].strip(), row[1]
+                    if row_number == 1 and service_name.lower() in ('name', 'service', 'назва'):
+                        continue
+
+                    if service_name in seen_names:
+                        raise PriceListImportError(f"Duplicate service '{service_name}' in row {row_number}.")
+                    seen_names.add(service_name)
+
+                    batch.append((row_number, service_name, _parse_price(raw_price, row_number)))
+                    if len(batch) >= PRICE_LIST_ENTRIES_BATCH_SIZE:
+                        imported_count += _import_batch(price_list, batch)
+                        batch = []
+
+                if batch:
+                    imported_count += _import_batch(price_list, batch)
+        except PriceListImportError as e:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': str(e)}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except csv.Error as e:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': f'Malformed CSV file: {e}.'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except UnicodeDecodeError:
+            return JsonResponse({
+                'payloadType': 'ErrorResponseDto',
+                'payload': {'detail': 'CSV file must be UTF-8 encoded.'}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        return JsonResponse({
+            'payloadType': 'PriceListImportDto',
+            'payload': {
+                'id': price_list.id,
+                'importedEntries': imported_count
+            }
+        }, status=status.HTTP_201_CREATED)
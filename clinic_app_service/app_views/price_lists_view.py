@@ -1,6 +1,9 @@
 # views.py
+from decimal import Decimal
 from math import ceil
 
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models.expressions import Case, When
 from django.db.models.fields import IntegerField
 from django.db.models.query import QuerySet
@@ -10,14 +13,57 @@ from rest_framework import status
 from rest_framework.views import APIView
 
 from ..models import PriceList, PriceListEntry, Service
+from ..pagination_service import paginate_by_cursor, InvalidCursorError
+from ..count_service import count_registry
 from clinic_app_service.serializers import PriceListSerializer
 
+PRICE_LIST_ENTRIES_BATCH_SIZE = 1000
+
+
+def validate_price_list_entries(entries) -> tuple[list[tuple[int, Decimal]], list[dict]]:
+    """
+    Перевіряє позиції до запису: serviceId - id наявної послуги, ціна - число за правилами поля
+    PriceListEntry.price (не менше 0.01, не більше 2 знаків після коми). Повертає (serviceId, ціна)
+    і помилки з індексом позиції; послуги перевіряються одним запитом.
+    """
+    price_field = PriceListEntry._meta.get_field('price')
+    cleaned, errors = [], []
+    for index, entry in enumerate(entries):
+        if not isinstance(entry, dict):
+            errors.append({'index': index, 'detail': "Entry must be an object with 'serviceId' and 'price'."})
+            continue
+
+        service_id, price = entry.get('serviceId'), entry.get('price')
+        if not isinstance(service_id, int) or isinstance(service_id, bool):
+            errors.append({'index': index, 'serviceId': service_id, 'detail': "'serviceId' must be an integer."})
+            continue
+        try:
+            if isinstance(price, bool):
+                raise ValidationError("Price must be a number.")
+            # JSON-число 10.1 перевіряється як '10.1', а не як двійкове наближення з 12 знаками
+            if isinstance(price, float):
+                price = str(price)
+            cleaned.append((index, service_id, price_field.clean(price, None)))
+        except ValidationError as e:
+            errors.append({'index': index, 'serviceId': service_id, 'price': entry.get('price'),
+                           'detail': ' '.join(e.messages)})
+
+    existing_ids = set(Service.objects.filter(pk__in={service_id for _, service_id, _ in cleaned})
+                       .values_list('id', flat=True))
+    errors.extend(
+        {'index': index, 'serviceId': service_id, 'detail': "Service does not exist."}
+        for index, service_id, _ in cleaned if service_id not in existing_ids
+    )
+    errors.sort(key=lambda error: error['index'])
+    return [(service_id, price) for _, service_id, price in cleaned if service_id in existing_ids], errors
+
 
 class PriceListsView(APIView):
     def get(self, request):
         page = int(request.query_params.get('p', 1))
         per_page = int(request.query_params.get('q', 10))
         is_archived = request.query_params.get('a')
+        cursor = request.query_params.get('cursor')
 
         queryset: QuerySet[PriceList] = PriceList.objects.all()
 
@@ -35,10 +81,32 @@ class PriceListsView(APIView):
             )
         ).order_by('order_by_active', 'id')
 
+        if cursor is not None:
+            try:
+                page_qs, next_cursor, prev_cursor = paginate_by_cursor(
+                    queryset, ['order_by_active', 'id'], cursor, per_page
+                )
+            except InvalidCursorError as e:
+                return JsonResponse({
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {'detail': str(e)}
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = PriceListSerializer(page_qs, many=True)
+            return JsonResponse({
+                'payloadType': 'PriceListRegistryDto',
+                'payload': {
+                    'perPage': per_page,
+                    'nextCursor': next_cursor,
+                    'prevCursor': prev_cursor,
+                    'entries': serializer.data
+                }
+            }, status=status.HTTP_200_OK)
+
         start_index = (page - 1) * per_page
         end_index = start_index + per_page
 
-        total_count = queryset.count()
+        total_count, is_count_exact = count_registry(queryset, is_filtered=is_archived is not None)
 
         page_qs = queryset[start_index:end_index]
 
@@ -50,6 +118,7 @@ class PriceListsView(APIView):
                 'page': page,
                 'perPage': per_page,
                 'totalPages': ceil(total_count / per_page),
+                'isCountExact': is_count_exact,
                 'entries': serializer.data
             }
         }, status=status.HTTP_200_OK)
@@ -59,29 +128,49 @@ class PriceListsView(APIView):
 
         name = data.get('name')
         entries = data.get('entries', [])
-        print('Creating new price list')
-        print(name)
-        print(entries)
-
-        new_price_list = PriceList.objects.create(
-            name=name,
-            status='INACTIVE',
-            is_archived=False,
-        )
 
-        created_entries = []
-        for entry in entries:
-            service_id = entry.get('serviceId')
-            price = entry.get('price')
+        if not name or not isinstance(entries, list):
+            return JsonResponse(
+                {
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {
+                        'detail': "Body must contain 'name' and an 'entries' list."
+                    }
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        entries, errors = validate_price_list_entries(entries)
+        if errors:
+            return JsonResponse(
+                {
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {
+                        'detail': f"{len(errors)} price list entr{'y is' if len(errors) == 1 else 'ies are'} invalid.",
+                        'entries': errors
+                    }
+                },
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            service = Service.objects.get(pk=service_id)
+        with transaction.atomic():
+            new_price_list = PriceList.objects.create(
+                name=name,
+                status='INACTIVE',
+                is_archived=False,
+            )
 
-            ple = PriceListEntry.objects.create(
-                price_list=new_price_list,
-                service=service,
-                price=price
+            PriceListEntry.objects.bulk_create(
+                (
+                    PriceListEntry(
+                        price_list=new_price_list,
+                        service_id=service_id,
+                        price=price
+                    )
+                    for service_id, price in entries
+                ),
+                batch_size=PRICE_LIST_ENTRIES_BATCH_SIZE
             )
-            created_entries.append(ple)
 
         return JsonResponse(
             {
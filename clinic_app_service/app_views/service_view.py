@@ -1,53 +1,76 @@
 from math import ceil
-from django.db.models import QuerySet
+from django.db.models import QuerySet, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.views import APIView
-from ..models import Service, PriceList, PriceListEntry, Appointment
+from ..models import Service, PriceList, PriceListEntry
+from ..pagination_service import paginate_by_cursor, InvalidCursorError
+from ..count_service import count_registry
 
 
 class ServiceView(APIView):
     def get(self, request):
         page = int(request.query_params.get('p', 1))
         per_page = int(request.query_params.get('q', 10))
+        cursor = request.query_params.get('cursor')
+
+        active_price = PriceListEntry.objects.filter(
+            service=OuterRef('pk'),
+            price_list__status='ACTIVE',
+            price_list__is_archived=False
+        ).order_by('price_list_id').values('price')[:1]
+
+        queryset: QuerySet[Service] = Service.objects.annotate(
+            active_price=Subquery(active_price),
+            completed_count=Coalesce('usage_counter__completed_count', 0)
+        ).order_by('service_name', 'id')
+
+        if cursor is not None:
+            try:
+                page_qs, next_cursor, prev_cursor = paginate_by_cursor(
+                    queryset, ['service_name', 'id'], cursor, per_page
+                )
+            except InvalidCursorError as e:
+                return JsonResponse({
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {'detail': str(e)}
+                }, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            total_count, is_count_exact = count_registry(queryset, is_filtered=False)
+            start_index = (page - 1) * per_page
+            end_index = start_index + per_page
 
-        queryset: QuerySet[Service] = Service.objects.all().order_by('service_name')
-
-        total_count = queryset.count()
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-
-        page_qs = queryset[start_index:end_index]
-
-        active_pl = PriceList.objects.filter(status='ACTIVE', is_archived=False).first()
+            page_qs = queryset[start_index:end_index]
 
         data = []
         for service in page_qs:
-            price = None
-            if active_pl:
-                entry = PriceListEntry.objects.filter(price_list=active_pl, service=service).first()
-                if entry:
-                    price = str(entry.price)
-
-            appointment_count = Appointment.objects.filter(
-                price_list_entry__service=service,
-                execution_status='COMPLETED'
-            ).count()
-
             data.append({
                 'id': service.id,
                 'title': service.service_name,
-                'price': price,
-                'count': appointment_count,
+                'price': str(service.active_price) if service.active_price is not None else None,
+                'count': service.completed_count,
                 'isArchived': service.is_service_archived,
             })
 
+        if cursor is not None:
+            return JsonResponse({
+                'payloadType': 'ServicesRegistryDto',
+                'payload': {
+                    'perPage': per_page,
+                    'nextCursor': next_cursor,
+                    'prevCursor': prev_cursor,
+                    'entries': data
+                }
+            }, status=status.HTTP_200_OK)
+
         return JsonResponse({
             'payloadType': 'ServicesRegistryDto',
             'payload': {
                 'page': page,
                 'perPage': per_page,
                 'totalPages': ceil(total_count / per_page),
+                'isCountExact': is_count_exact,
                 'entries': data
             }
         }, status=status.HTTP_200_OK)
@@ -3,6 +3,8 @@ from django.http import JsonResponse
 from rest_framework.views import APIView
 from rest_framework import status
 from ..models import Appointment
+from ..pagination_service import paginate_by_cursor, InvalidCursorError
+from ..count_service import count_registry
 
 class StatementsRegistryView(APIView):
     def post(self, request):
@@ -14,6 +16,7 @@ class StatementsRegistryView(APIView):
         order = body.get('order', 'asc')
         page = int(request.query_params.get('p', 1))
         per_page = int(request.query_params.get('q', 10))
+        cursor = request.query_params.get('cursor')
 
         qs = Appointment.objects.select_related(
             'patient',
@@ -23,7 +26,6 @@ class StatementsRegistryView(APIView):
         )
 
         if services and len(services) != 0:
-            print(services)
             qs = qs.filter(price_list_entry__service__service_name__in=services)
 
         if statuses and len(statuses) != 0:
@@ -38,12 +40,25 @@ class StatementsRegistryView(APIView):
         if order == 'desc':
             sort_field = '-' + sort_field
 
-        qs = qs.order_by(sort_field)
+        order_fields = [sort_field] if sort_field.lstrip('-') == 'id' else [sort_field, 'id']
+        qs = qs.order_by(*order_fields)
 
-        total_count = qs.count()
-        start_index = (page - 1) * per_page
-        end_index = start_index + per_page
-        page_qs = qs[start_index:end_index]
+        if cursor is not None:
+            try:
+                page_qs, next_cursor, prev_cursor = paginate_by_cursor(qs, order_fields, cursor, per_page)
+            except InvalidCursorError as e:
+                return JsonResponse(
+                    {
+                        "payloadType": "ErrorResponseDto",
+                        "payload": {"detail": str(e)}
+                    },
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+        else:
+            total_count, is_count_exact = count_registry(qs, is_filtered=bool(services or statuses))
+            start_index = (page - 1) * per_page
+            end_index = start_index + per_page
+            page_qs = qs[start_index:end_index]
 
         entries = []
         for appt in page_qs:
@@ -78,6 +93,20 @@ class StatementsRegistryView(APIView):
                 "invoiceId": appt.invoice_id
             })
 
+        if cursor is not None:
+            return JsonResponse(
+                {
+                    "payloadType": "StatementRegistryDto",
+                    "payload": {
+                        "perPage": per_page,
+                        "nextCursor": next_cursor,
+                        "prevCursor": prev_cursor,
+                        "entries": entries
+                    }
+                },
+                status=status.HTTP_200_OK
+            )
+
         total_pages = ceil(total_count / per_page)
 
         return JsonResponse(
@@ -87,6 +116,7 @@ class StatementsRegistryView(APIView):
                     "page": page,
                     "perPage": per_page,
                     "totalPages": total_pages,
+                    "isCountExact": is_count_exact,
                     "entries": entries
                 }
             },
@@ -1,86 +1,135 @@
-from django.http import JsonResponse
-from datetime import timedelta
+import json
+from decimal import Decimal
+from functools import wraps
+
+from django.conf import settings
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
-from django.db.models.functions import TruncDate
-from django.db.models import Count
 from rest_framework.views import APIView
+from rest_framework.renderers import BaseRenderer, JSONRenderer
 from rest_framework.response import Response
 from rest_framework import status
 
-from ..models import Appointment, User
+from ..availability_service import CLINIC_TZ
+from ..models import User
+from ..stats_service import cumulative_completions, doctor_stats_totals, parse_cumulate_params, parse_stats_range, \
+    period_label, revenue_amount, stats_cache, stats_cache_key, stats_change_feed, stats_periods, stats_totals
+
+
+def cached_stats(get):
+    """
+    Кешує успішні відповіді за класом view, параметрами запиту та днем клініки на STATS_CACHE_TTL секунд.
+    Ключ містить версію статистики, тож завершення чи скасування прийому робить старі записи недосяжними.
+    """
+    @wraps(get)
+    def wrapper(self, request, *args, **kwargs):
+        key = stats_cache_key(type(self).__name__, request.query_params.lists(),
+                              timezone.now().astimezone(CLINIC_TZ).date())
+        data = stats_cache().get(key)
+        if data is not None:
+            return Response(data, status=status.HTTP_200_OK)
+
+        response = get(self, request, *args, **kwargs)
+        if response.status_code == status.HTTP_200_OK:
+            stats_cache().set(key, response.data, settings.STATS_CACHE_TTL)
+        return response
+    return wrapper
+
+
+def stats_range_or_error(request):
+    """
+    (from, to, granularity) з параметрів запиту або (None, відповідь 400).
+    """
+    try:
+        return parse_stats_range(
+            request.query_params.get('from'),
+            request.query_params.get('to'),
+            request.query_params.get('granularity'),
+            timezone.now().astimezone(CLINIC_TZ).date()
+        ), None
+    except ValueError as e:
+        return None, Response(
+            {
+                "payloadType": "ErrorResponseDto",
+                "payload": {
+                    "detail": str(e)
+                }
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
+def stats_entries(start, end, granularity, totals, value):
+    return [
+        {
+            'date': period_label(period, granularity),
+            'start': period.isoformat(),
+            'count': value(totals[period]) if period in totals else 0
+        }
+        for period in stats_periods(start, end, granularity)
+    ]
+
 
 class WeeklyStatsView(APIView):
+    @cached_stats
     def get(self, request):
-        today = timezone.now().date()
-        start_date = today - timedelta(days=6)
-
-        qs = (
-            Appointment.objects
-            .filter(
-                execution_status='COMPLETED',
-                completion_date__date__gte=start_date
-            )
-            .annotate(day=TruncDate('completion_date'))
-            .values('day')
-            .annotate(count=Count('id'))
-        )
+        stats_range, error = stats_range_or_error(request)
+        if error:
+            return error
+        start_date, end_date, granularity = stats_range
 
-        counts_by_date = {item['day']: item['count'] for item in qs}
-
-        entries = []
-        for i in range(7):
-            d = start_date + timedelta(days=i)
-            day_str = d.strftime('%d.%m')
-            count_for_day = counts_by_date.get(d, 0)
-            entries.append({
-                'date': day_str,
-                'count': count_for_day
-            })
+        totals = stats_totals(start_date, end_date, granularity)
 
         return Response(
             {
                 'payloadType': 'WeeklyStatsDto',
                 'payload': {
-                    'entries': entries
+                    'granularity': granularity,
+                    'entries': stats_entries(start_date, end_date, granularity, totals,
+                                             lambda total: total['count'])
                 }
             },
             status=status.HTTP_200_OK
         )
 
+def cumulate_params_or_error(request):
+    """
+    (start, end, bucket) з параметрів запиту або (None, відповідь 400).
+    """
+    try:
+        return parse_cumulate_params(
+            request.query_params.get('start'),
+            request.query_params.get('end'),
+            request.query_params.get('bucket')
+        ), None
+    except ValueError as e:
+        return None, Response(
+            {
+                "payloadType": "ErrorResponseDto",
+                "payload": {
+                    "detail": str(e)
+                }
+            },
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+
 class TodayCumulateView(APIView):
+    """
+    Накопичена кількість завершених сьогодні прийомів на позначках start..end (HH:MM за часом клініки,
+    типово CLINIC_STATS_DAY_START..CLINIC_STATS_DAY_END) з кроком bucket хвилин (типово 60).
+    """
+
+    @cached_stats
     def get(self, request):
-        today = timezone.now().date()
-        qs = Appointment.objects.filter(
-            execution_status='COMPLETED',
-            completion_date__date=today
-        ).order_by('completion_date')
-
-        completed_times = [appt.completion_date for appt in qs]
-
-        results = []
-        running_total = 0
-        idx = 0
-
-        for hour in range(9, 19):
-            cutoff = timezone.datetime(
-                year=today.year,
-                month=today.month,
-                day=today.day,
-                hour=hour,
-                minute=0,
-                second=0,
-                tzinfo=timezone.get_current_timezone()
-            )
+        params, error = cumulate_params_or_error(request)
+        if error:
+            return error
 
-            while idx < len(completed_times) and completed_times[idx] < cutoff:
-                running_total += 1
-                idx += 1
-
-            hour_str = f"{hour:02d}:00"
-            results.append({
-                'hour': hour_str,
-                'count': running_total
-            })
+        today = timezone.now().astimezone(CLINIC_TZ).date()
+        with connection.cursor() as cursor:
+            results = cumulative_completions(cursor, today, *params)
 
         return Response(
             {
@@ -92,6 +141,50 @@ class TodayCumulateView(APIView):
             status=status.HTTP_200_OK
         )
 
+class EventStreamRenderer(BaseRenderer):
+    """
+    Дозволяє запити з Accept: text/event-stream (EventSource); помилки віддаються як JSON.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode()
+
+
+class TodayCumulateStreamView(APIView):
+    """
+    Те саме як server-sent events: подія cumulate з TodayCumulateDto надсилається одразу
+    і після кожної зміни статистики (сповіщення з переходів статусів), коментар-keepalive - під час тиші.
+    Потік тримає воркер і окреме з'єднання з БД, тому завершується через STATS_STREAM_MAX_DURATION
+    секунд (менше за timeout gunicorn); EventSource перепідключається через STATS_STREAM_RETRY мс.
+    """
+    renderer_classes = [JSONRenderer, EventStreamRenderer]
+
+    def get(self, request):
+        params, error = cumulate_params_or_error(request)
+        if error:
+            return error
+
+        def events():
+            yield f"retry: {settings.STATS_STREAM_RETRY}\n\n"
+            last_entries = None
+            for cursor, changed in stats_change_feed(settings.STATS_STREAM_HEARTBEAT,
+                                                     settings.STATS_STREAM_MAX_DURATION):
+                # Перерахунок і без сповіщення: опівночі серія починається з нуля
+                entries = cumulative_completions(cursor, timezone.now().astimezone(CLINIC_TZ).date(), *params)
+                if entries == last_entries:
+                    yield ": keepalive\n\n"
+                    continue
+                last_entries = entries
+                payload = {'payloadType': 'TodayCumulateDto', 'payload': {'entries': entries}}
+                yield f"event: cumulate\ndata: {json.dumps(payload)}\n\n"
+
+        response = StreamingHttpResponse(events(), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
 class DoctorsView(APIView):
     def get(self, request):
         doctors = User.objects.filter(user_type='DOCTOR').order_by('last_name', 'first_name')
@@ -115,6 +208,7 @@ class DoctorsView(APIView):
         )
 
 class DoctorDailyCountsView(APIView):
+    @cached_stats
     def get(self, request):
         doctor_id = request.query_params.get('doctorId')
         if not doctor_id:
@@ -128,6 +222,11 @@ class DoctorDailyCountsView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        stats_range, error = stats_range_or_error(request)
+        if error:
+            return error
+        start_date, end_date, granularity = stats_range
+
         try:
             doctor = User.objects.get(pk=doctor_id, user_type='DOCTOR')
         except User.DoesNotExist:
@@ -141,47 +240,22 @@ class DoctorDailyCountsView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        today = timezone.now().date()
-        start_date = today - timedelta(days=6)
-
-        qs = (
-            Appointment.objects
-            .filter(
-                doctor=doctor,
-                execution_status='COMPLETED',
-                completion_date__date__gte=start_date
-            )
-            .annotate(day=TruncDate('completion_date'))
-            .values('day')
-            .order_by('day')
-        )
-
-        counts_by_date = {}
-        for item in qs.annotate(count=Count('id')):
-            day = item['day']
-            cnt = item['count']
-            counts_by_date[day] = cnt
-
-        entries = []
-        for i in range(7):
-            d = start_date + timedelta(days=i)
-            day_str = d.strftime('%d.%m')
-            entries.append({
-                'date': day_str,
-                'count': counts_by_date.get(d, 0)
-            })
+        totals = stats_totals(start_date, end_date, granularity, doctor.id)
 
         return Response(
             {
                 'payloadType': 'DoctorDailyCountsDto',
                 'payload': {
-                    'entries': entries
+                    'granularity': granularity,
+                    'entries': stats_entries(start_date, end_date, granularity, totals,
+                                             lambda total: total['count'])
                 }
             },
             status=status.HTTP_200_OK
         )
 
 class DoctorDailyRevenuesView(APIView):
+    @cached_stats
     def get(self, request):
         doctor_id = request.query_params.get('doctorId')
         if not doctor_id:
@@ -195,6 +269,11 @@ class DoctorDailyRevenuesView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        stats_range, error = stats_range_or_error(request)
+        if error:
+            return error
+        start_date, end_date, granularity = stats_range
+
         try:
             doctor = User.objects.get(pk=doctor_id, user_type='DOCTOR')
         except User.DoesNotExist:
@@ -208,56 +287,63 @@ class DoctorDailyRevenuesView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        today = timezone.now().date()
-        start_date = today - timedelta(days=6)
+        totals = stats_totals(start_date, end_date, granularity, doctor.id)
 
-        qs = (
-            Appointment.objects
-            .filter(
-                doctor=doctor,
-                execution_status='COMPLETED',
-                completion_date__date__gte=start_date
-            )
-            .select_related('price_list_entry', 'invoice')
-            .annotate(day=TruncDate('completion_date'))
-            .order_by('day')
+        return Response(
+            {
+                'payloadType': 'DoctorDailyRevenuesDto',
+                'payload': {
+                    'granularity': granularity,
+                    'entries': stats_entries(start_date, end_date, granularity, totals,
+                                             lambda total: revenue_amount(total['revenue']))
+                }
+            },
+            status=status.HTTP_200_OK
         )
 
-        revenue_by_date = {}
-
-        for appt in qs:
-            day = appt.completion_date.date()
-            if day < start_date:
-                continue
-
-            base_price = appt.price_list_entry.price
-
-            discount_percent = appt.invoice.discount_percent or 0
-            revenue = base_price * (100 - discount_percent) / 100
-
-            if day not in revenue_by_date:
-                revenue_by_date[day] = revenue
-            else:
-                revenue_by_date[day] += revenue
+class DoctorsLeaderboardView(APIView):
+    """
+    Кількість прийомів і виручка всіх лікарів за період одним запитом у колонковому форматі:
+    counts[i][j] і revenues[i][j] - значення i-го періоду для лікаря doctorIds[j].
+    Лікарі впорядковані за виручкою за весь період.
+    """
 
-        entries = []
-        for i in range(7):
-            d = start_date + timedelta(days=i)
-            day_str = d.strftime('%d.%m')
-            rev = revenue_by_date.get(d, 0)
-            rev_float = float(rev)
-            entries.append({
-                'date': day_str,
-                'count': rev_float
-            })
+    @cached_stats
+    def get(self, request):
+        stats_range, error = stats_range_or_error(request)
+        if error:
+            return error
+        start_date, end_date, granularity = stats_range
+
+        totals = doctor_stats_totals(start_date, end_date, granularity)
+        periods = stats_periods(start_date, end_date, granularity)
+        doctors = list(User.objects.filter(user_type='DOCTOR').order_by('last_name', 'first_name')
+                       .values_list('id', 'last_name', 'first_name', 'middle_name'))
+
+        revenue_by_doctor = {doctor[0]: Decimal(0) for doctor in doctors}
+        for (doctor_id, _), total in totals.items():
+            if doctor_id in revenue_by_doctor:
+                revenue_by_doctor[doctor_id] += total['revenue']
+        doctors.sort(key=lambda doctor: revenue_by_doctor[doctor[0]], reverse=True)
+        doctor_ids = [doctor[0] for doctor in doctors]
+
+        def column(period, value):
+            return [value(totals[(doctor_id, period)]) if (doctor_id, period) in totals else 0
+                    for doctor_id in doctor_ids]
 
         return Response(
             {
-                'payloadType': 'DoctorDailyRevenuesDto',
+                'payloadType': 'DoctorsLeaderboardDto',
                 'payload': {
-                    'entries': entries
+                    'granularity': granularity,
+                    'periods': [period_label(period, granularity) for period in periods],
+                    'starts': [period.isoformat() for period in periods],
+                    'doctorIds': doctor_ids,
+                    'doctorNames': [f"{last} {first} {middle}".strip() for _, last, first, middle in doctors],
+                    'counts': [column(period, lambda total: total['count']) for period in periods],
+                    'revenues': [column(period, lambda total: revenue_amount(total['revenue'])) for period in periods],
+                    'totalRevenues': [revenue_amount(revenue_by_doctor[doctor_id]) for doctor_id in doctor_ids]
                 }
             },
             status=status.HTTP_200_OK
         )
-
@@ -0,0 +1,221 @@
+from collections import defaultdict
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .availability_service import CLINIC_TZ, appointment_slot, load_booked_masks, slot_label
+from .models import Appointment, PriceListEntry, ServiceUsageCounter
+from .stats_service import apply_daily_stats, notify_stats_changed
+
+# Простір ключів advisory-локів розкладу лікарів (перший аргумент pg_advisory_xact_lock(int, int))
+DOCTOR_SCHEDULE_LOCK_NAMESPACE = 7301
+
+
+class SlotConflictError(Exception):
+    def __init__(self, conflicts: list[dict]):
+        super().__init__(f"{len(conflicts)} slot(s) are already taken")
+        self.conflicts = conflicts
+
+
+def adjust_service_usage(service_id: int, delta: int):
+    counter, _ = ServiceUsageCounter.objects.get_or_create(service_id=service_id)
+    ServiceUsageCounter.objects.filter(pk=counter.pk).update(completed_count=F('completed_count') + delta)
+
+
+def adjust_service_usage_bulk(deltas: dict[int, int]):
+    """
+    Змінює лічильники кількох послуг одним INSERT ... ON CONFLICT.
+    """
+    deltas = {service_id: delta for service_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    table = ServiceUsageCounter._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (service_id, completed_count) "
+            f"SELECT * FROM unnest(%s::bigint[], %s::int[]) "
+            f"ON CONFLICT (service_id) DO UPDATE SET completed_count = {table}.completed_count + EXCLUDED.completed_count",
+            [list(deltas.keys()), list(deltas.values())]
+        )
+
+
+def rebuild_service_usage_counters() -> int:
+    """
+    Перераховує лічильники завершених прийомів з історії прийомів. Повертає кількість лічильників.
+    """
+    totals = (
+        Appointment.objects
+        .filter(execution_status='COMPLETED')
+        .order_by()
+        .values('price_list_entry__service')
+        .annotate(total=Count('id'))
+    )
+
+    with transaction.atomic():
+        ServiceUsageCounter.objects.all().delete()
+        counters = ServiceUsageCounter.objects.bulk_create(
+            ServiceUsageCounter(service_id=row['price_list_entry__service'], completed_count=row['total'])
+            for row in totals
+        )
+    return len(counters)
+
+
+def complete_appointment(appointment: Appointment):
+    with transaction.atomic():
+        previous_status = Appointment.objects.select_for_update().values_list(
+            'execution_status', flat=True
+        ).get(pk=appointment.pk)
+
+        if previous_status == 'COMPLETED':
+            # Повторне завершення переносить прийом на новий день у підсумку
+            apply_daily_stats([appointment.pk], -1)
+
+        appointment.execution_status = 'COMPLETED'
+        appointment.completion_date = timezone.now()
+        appointment.save(update_fields=['execution_status', 'completion_date'])
+        apply_daily_stats([appointment.pk], 1)
+        notify_stats_changed()
+
+        if previous_status != 'COMPLETED':
+            adjust_service_usage(appointment.price_list_entry.service_id, 1)
+
+
+def cancel_appointment(appointment: Appointment):
+    with transaction.atomic():
+        previous_status = Appointment.objects.select_for_update().values_list(
+            'execution_status', flat=True
+        ).get(pk=appointment.pk)
+
+        if previous_status == 'COMPLETED':
+            apply_daily_stats([appointment.pk], -1)
+            notify_stats_changed()
+
+        appointment.execution_status = 'CANCELED'
+        appointment.save(update_fields=['execution_status'])
+
+        if previous_status == 'COMPLETED':
+            adjust_service_usage(appointment.price_list_entry.service_id, -1)
+
+
+def lock_doctor_schedules(doctor_ids):
+    """
+    Транзакційні advisory-локи на розклади лікарів. Бронювання різних лікарів не чекають одне одного;
+    локи беруться у зростаючому порядку, тож взаємних блокувань немає.
+    """
+    # Один запит незалежно від кількості лікарів; підзапит задає порядок захоплення локів
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT pg_advisory_xact_lock(%s, doctor_id) "
+            "FROM (SELECT DISTINCT unnest(%s::int[]) AS doctor_id ORDER BY 1) AS ordered",
+            [DOCTOR_SCHEDULE_LOCK_NAMESPACE, list(doctor_ids)]
+        )
+
+
+def _conflict(appointment: Appointment, slot_minutes: int) -> dict:
+    local = appointment.appointment_date.astimezone(CLINIC_TZ)
+    return {
+        "doctorId": appointment.doctor_id,
+        "date": local.date().isoformat(),
+        "time": slot_label(appointment_slot(local, slot_minutes))
+    }
+
+
+def find_slot_conflicts(appointments: list[Appointment], slot_minutes: list[int]) -> list[dict]:
+    """
+    Запитані прийоми, що перетинаються з уже заброньованими (або між собою) у того самого лікаря.
+    """
+    local_days = [appointment.appointment_date.astimezone(CLINIC_TZ).date() for appointment in appointments]
+    booked = load_booked_masks({appointment.doctor_id for appointment in appointments}, min(local_days), max(local_days))
+
+    conflicts = []
+    for appointment, minutes, day in zip(appointments, slot_minutes, local_days):
+        key = (appointment.doctor_id, day)
+        mask = appointment_slot(appointment.appointment_date, minutes).mask
+        if booked.get(key, 0) & mask:
+            conflicts.append(_conflict(appointment, minutes))
+        booked[key] = booked.get(key, 0) | mask
+    return conflicts
+
+
+def reserve_slots(appointments: list[Appointment], slot_minutes: list[int]) -> list[Appointment]:
+    """
+    Створює прийоми, якщо всі слоти вільні; інакше SlotConflictError зі списком зайнятих слотів.
+    Викликається всередині транзакції бронювання: локи тримаються до її завершення.
+    """
+    if not appointments:
+        return []
+
+    lock_doctor_schedules(appointment.doctor_id for appointment in appointments)
+    conflicts = find_slot_conflicts(appointments, slot_minutes)
+    if conflicts:
+        raise SlotConflictError(conflicts)
+
+    try:
+        with transaction.atomic():
+            return Appointment.objects.bulk_create(appointments)
+    except IntegrityError:
+        # Страховка: унікальний індекс (лікар, час) ловить записи, створені в обхід локів
+        taken = set(Appointment.objects.filter(
+            doctor_id__in={appointment.doctor_id for appointment in appointments},
+            appointment_date__in={appointment.appointment_date for appointment in appointments}
+        ).exclude(execution_status='CANCELED').values_list('doctor_id', 'appointment_date'))
+        raise SlotConflictError([
+            _conflict(appointment, minutes)
+            for appointment, minutes in zip(appointments, slot_minutes)
+            if (appointment.doctor_id, appointment.appointment_date) in taken
+        ])
+
+
+def transition_planned_appointments(appointment_ids: list[int], new_status: str) -> dict[int, str]:
+    """
+    Переводить заплановані прийоми у COMPLETED або CANCELED одним умовним UPDATE.
+    Завершити можна лише прийом, що вже почався. Повертає результат для кожного id:
+    UPDATED, NOT_FOUND, NOT_PLANNED (прийом уже завершено чи скасовано) або NOT_STARTED.
+    """
+    now = timezone.now()
+    appointment_table = Appointment._meta.db_table
+    entry_table = PriceListEntry._meta.db_table
+
+    sql = (
+        f"UPDATE {appointment_table} AS a SET execution_status = %s"
+        f"{', completion_date = %s' if new_status == 'COMPLETED' else ''} "
+        f"FROM {entry_table} AS e "
+        f"WHERE e.id = a.price_list_entry_id AND a.id = ANY(%s) AND a.execution_status = 'PLANNED'"
+        f"{' AND a.appointment_date < %s' if new_status == 'COMPLETED' else ''} "
+        f"RETURNING a.id, e.service_id"
+    )
+    params = [new_status, now, appointment_ids, now] if new_status == 'COMPLETED' else [new_status, appointment_ids]
+
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            updated = cursor.fetchall()
+
+        if new_status == 'COMPLETED':
+            completed_by_service = defaultdict(int)
+            for _, service_id in updated:
+                completed_by_service[service_id] += 1
+            adjust_service_usage_bulk(completed_by_service)
+            if updated:
+                apply_daily_stats((appointment_id for appointment_id, _ in updated), 1)
+                notify_stats_changed()
+
+    outcomes = {appointment_id: 'UPDATED' for appointment_id, _ in updated}
+    remaining = [appointment_id for appointment_id in appointment_ids if appointment_id not in outcomes]
+    if remaining:
+        current = {
+            appointment_id: (execution_status, appointment_date)
+            for appointment_id, execution_status, appointment_date in Appointment.objects.filter(
+                pk__in=remaining
+            ).values_list('id', 'execution_status', 'appointment_date')
+        }
+        for appointment_id in remaining:
+            if appointment_id not in current:
+                outcomes[appointment_id] = 'NOT_FOUND'
+            elif current[appointment_id][0] != 'PLANNED':
+                outcomes[appointment_id] = 'NOT_PLANNED'
+            else:
+                outcomes[appointment_id] = 'NOT_STARTED'
+    return outcomes
+
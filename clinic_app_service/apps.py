@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class ClinicAppServiceConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clinic_app_service'
+
+    def ready(self):
+        from . import signals  # noqa: F401
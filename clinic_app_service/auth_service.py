@@ -0,0 +1,22 @@
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+
+from .models import User
+
+
+class ClinicJWTAuthentication(JWTAuthentication):
+    """
+    JWT-автентифікація працівників клініки: користувач визначається за claim 'sub'
+    ({id, role, fullname}, див. MyRefreshToken) серед clinic_app_service.User, а не auth.User.
+    Роль береться з БД, а не з токена.
+    """
+
+    def get_user(self, validated_token):
+        subject = validated_token.get('sub')
+        if not isinstance(subject, dict) or 'id' not in subject:
+            raise InvalidToken("Token contains no clinic user subject")
+
+        try:
+            return User.objects.get(pk=subject['id'])
+        except (User.DoesNotExist, TypeError, ValueError):
+            raise AuthenticationFailed("User not found", code='user_not_found')
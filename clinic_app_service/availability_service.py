@@ -0,0 +1,243 @@
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import date, datetime, time, timedelta
+from threading import Lock
+from typing import Iterable, Optional
+
+import pytz
+from django.conf import settings
+
+from .models import Appointment, DoctorBreak, DoctorDayOff, DoctorWorkingHours
+
+CLINIC_TZ = pytz.timezone(settings.CLINIC_TIME_ZONE)
+
+# Доба ділиться на тіки по 5 хвилин; графіки, перерви та записи - бітові маски тіків
+TICK_MINUTES = 5
+TICKS_PER_DAY = 24 * 60 // TICK_MINUTES
+DAY_MASK = (1 << TICKS_PER_DAY) - 1
+
+DEFAULT_SLOT_MINUTES = 30
+# Графік лікаря, для якого не задано робочих годин: пн-пт 09:00-18:00
+DEFAULT_WORKING_HOURS = tuple((weekday, time(9, 0), time(18, 0)) for weekday in range(5))
+
+
+@dataclass(frozen=True)
+class Slot:
+    start_tick: int
+    ticks: int
+    mask: int
+
+
+def to_tick(value: time) -> int:
+    return (value.hour * 60 + value.minute) // TICK_MINUTES
+
+
+def interval_mask(start_tick: int, end_tick: int) -> int:
+    """
+    Маска тіків напіввідкритого інтервалу [start_tick, end_tick).
+    """
+    if end_tick <= start_tick:
+        return 0
+    return ((1 << end_tick) - 1) ^ ((1 << start_tick) - 1)
+
+
+def _format_tick(tick: int) -> str:
+    minutes = tick * TICK_MINUTES
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def slot_label(slot: Slot) -> str:
+    return f"{_format_tick(slot.start_tick)} - {_format_tick(slot.start_tick + slot.ticks)}"
+
+
+def slot_start(day: date, slot: Slot) -> datetime:
+    minutes = slot.start_tick * TICK_MINUTES
+    return CLINIC_TZ.localize(datetime.combine(day, time(minutes // 60, minutes % 60)))
+
+
+def local_day_bounds(day: date) -> tuple[datetime, datetime]:
+    """
+    Напіввідкритий інтервал [00:00, 00:00 наступного дня) у часовому поясі клініки.
+    """
+    start = CLINIC_TZ.localize(datetime.combine(day, time.min))
+    return start, CLINIC_TZ.localize(datetime.combine(day + timedelta(days=1), time.min))
+
+
+class WeeklySchedule:
+    """
+    Скомпільований тижневий графік лікаря: маска робочих тіків на кожен день тижня.
+    Шаблони слотів для різної тривалості прийому будуються ліниво й запам'ятовуються.
+    """
+
+    def __init__(self, working_masks: tuple[int, ...]):
+        self.working_masks = working_masks
+        self._templates: dict[int, tuple[tuple[Slot, ...], ...]] = {}
+
+    def template(self, slot_minutes: int) -> tuple[tuple[Slot, ...], ...]:
+        template = self._templates.get(slot_minutes)
+        if template is None:
+            ticks = max(1, -(-slot_minutes // TICK_MINUTES))
+            template = tuple(self._cut_slots(mask, ticks) for mask in self.working_masks)
+            self._templates[slot_minutes] = template
+        return template
+
+    @staticmethod
+    def _cut_slots(working_mask: int, ticks: int) -> tuple[Slot, ...]:
+        """
+        Нарізає кожен безперервний робочий проміжок на слоти від його початку.
+        """
+        slots = []
+        tick = 0
+        while tick < TICKS_PER_DAY:
+            if not working_mask >> tick & 1:
+                tick += 1
+                continue
+            run_end = tick
+            while run_end < TICKS_PER_DAY and working_mask >> run_end & 1:
+                run_end += 1
+            for start in range(tick, run_end - ticks + 1, ticks):
+                slots.append(Slot(start, ticks, interval_mask(start, start + ticks)))
+            tick = run_end
+        return tuple(slots)
+
+
+def compile_weekly_schedule(working_hours: Iterable[tuple], breaks: Iterable[tuple]) -> WeeklySchedule:
+    """
+    working_hours - (день тижня, початок, кінець); breaks - те саме, день тижня None означає щодня.
+    """
+    masks = [0] * 7
+    for weekday, start, end in working_hours:
+        masks[weekday] |= interval_mask(to_tick(start), to_tick(end))
+    for weekday, start, end in breaks:
+        mask = interval_mask(to_tick(start), to_tick(end))
+        for day in (range(7) if weekday is None else (weekday,)):
+            masks[day] &= ~mask
+    return WeeklySchedule(tuple(masks))
+
+
+_schedules: dict[int, tuple[int, WeeklySchedule]] = {}
+_schedules_lock = Lock()
+
+
+def get_weekly_schedules(doctor_versions: dict[int, int]) -> dict[int, WeeklySchedule]:
+    """
+    Скомпільовані графіки лікарів: doctor_id -> WeeklySchedule.
+    doctor_versions - doctor_id -> schedule_version; правила з БД читаються лише для лікарів,
+    чия версія змінилася з моменту компіляції (зміну графіка бачать усі воркери).
+    """
+    result = {}
+    missing = []
+    for doctor_id, version in doctor_versions.items():
+        cached = _schedules.get(doctor_id)
+        if cached is not None and cached[0] == version:
+            result[doctor_id] = cached[1]
+        else:
+            missing.append(doctor_id)
+
+    if missing:
+        hours = defaultdict(list)
+        for doctor_id, *rule in DoctorWorkingHours.objects.filter(doctor_id__in=missing).values_list(
+                'doctor_id', 'weekday', 'start_time', 'end_time'):
+            hours[doctor_id].append(rule)
+        breaks = defaultdict(list)
+        for doctor_id, *rule in DoctorBreak.objects.filter(doctor_id__in=missing).values_list(
+                'doctor_id', 'weekday', 'start_time', 'end_time'):
+            breaks[doctor_id].append(rule)
+
+        with _schedules_lock:
+            for doctor_id in missing:
+                schedule = compile_weekly_schedule(hours.get(doctor_id) or DEFAULT_WORKING_HOURS,
+                                                   breaks.get(doctor_id, ()))
+                _schedules[doctor_id] = (doctor_versions[doctor_id], schedule)
+                result[doctor_id] = schedule
+    return result
+
+
+def invalidate_weekly_schedules(doctor_id: Optional[int] = None):
+    with _schedules_lock:
+        if doctor_id is None:
+            _schedules.clear()
+        else:
+            _schedules.pop(doctor_id, None)
+
+
+def appointment_slot(moment: datetime, duration_minutes: int) -> Slot:
+    """
+    Тіки, які займає прийом, що починається в moment (обрізається до кінця доби).
+    """
+    local = moment.astimezone(CLINIC_TZ)
+    start_minutes = local.hour * 60 + local.minute
+    start_tick = start_minutes // TICK_MINUTES
+    end_tick = min(-(-(start_minutes + duration_minutes) // TICK_MINUTES), TICKS_PER_DAY)
+    return Slot(start_tick, end_tick - start_tick, interval_mask(start_tick, end_tick))
+
+
+def appointment_mask(moment: datetime, duration_minutes: int) -> int:
+    return appointment_slot(moment, duration_minutes).mask
+
+
+def _active_appointments(first_day: date, last_day: date, **filters):
+    range_start, _ = local_day_bounds(first_day)
+    _, range_end = local_day_bounds(last_day)
+    return Appointment.objects.filter(
+        appointment_date__gte=range_start,
+        appointment_date__lt=range_end,
+        **filters
+    ).exclude(execution_status='CANCELED')
+
+
+def load_booked_masks(doctor_ids: Iterable[int], first_day: date, last_day: date) -> dict[tuple[int, date], int]:
+    """
+    Одним запитом за діапазоном дат повертає маски зайнятих тіків: (doctor_id, день) -> маска.
+    """
+    rows = _active_appointments(first_day, last_day, doctor_id__in=list(doctor_ids)).values_list(
+        'doctor_id', 'appointment_date', 'price_list_entry__service__slot_minutes'
+    )
+
+    masks = defaultdict(int)
+    for doctor_id, appointment_date, slot_minutes in rows:
+        day = appointment_date.astimezone(CLINIC_TZ).date()
+        masks[(doctor_id, day)] |= appointment_mask(appointment_date, slot_minutes)
+    return masks
+
+
+def load_patient_booked_masks(patient_id: int, first_day: date, last_day: date) -> dict[date, int]:
+    """
+    Тіки, у які пацієнт уже записаний (до будь-якого лікаря): день -> маска.
+    """
+    rows = _active_appointments(first_day, last_day, patient_id=patient_id).values_list(
+        'appointment_date', 'price_list_entry__service__slot_minutes'
+    )
+
+    masks = defaultdict(int)
+    for appointment_date, slot_minutes in rows:
+        masks[appointment_date.astimezone(CLINIC_TZ).date()] |= appointment_mask(appointment_date, slot_minutes)
+    return masks
+
+
+def load_days_off(doctor_ids: Iterable[int], first_day: date, last_day: date) -> set[tuple[int, date]]:
+    return set(DoctorDayOff.objects.filter(
+        doctor_id__in=list(doctor_ids),
+        date__gte=first_day,
+        date__lte=last_day
+    ).values_list('doctor_id', 'date'))
+
+
+def unavailable_mask(day: date, now: datetime) -> int:
+    """
+    Тіки дня, на які вже не можна записатися: слот недоступний, якщо він уже почався.
+    """
+    day_start, day_end = local_day_bounds(day)
+    if day_end <= now:
+        return DAY_MASK
+    if day_start <= now:
+        local = now.astimezone(CLINIC_TZ)
+        return interval_mask(0, (local.hour * 60 + local.minute) // TICK_MINUTES + 1)
+    return 0
+
+
+def free_slots(schedule: WeeklySchedule, slot_minutes: int, day: date, blocked: int = 0) -> list[Slot]:
+    """
+    Шаблон слотів дня мінус зайняті тіки - O(кількості слотів), без перебору правил графіка.
+    """
+    return [slot for slot in schedule.template(slot_minutes)[day.weekday()] if not slot.mask & blocked]
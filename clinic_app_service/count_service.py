@@ -0,0 +1,62 @@
+import hashlib
+from typing import Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.db import connection
+from django.db.models import QuerySet
+
+
+def estimate_table_rows(model) -> Optional[int]:
+    """
+    Оцінка кількості рядків таблиці зі статистики планувальника (pg_class.reltuples).
+    None - якщо оцінки немає: не PostgreSQL, таблицю ще не аналізували (-1)
+    або на момент аналізу вона була порожня (0 міг застаріти).
+    """
+    if connection.vendor != 'postgresql':
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+            [model._meta.db_table]
+        )
+        row = cursor.fetchone()
+
+    if not row or row[0] is None or row[0] <= 0:
+        return None
+    return int(row[0])
+
+
+def _count_cache_key(queryset: QuerySet) -> str:
+    sql = str(queryset.order_by().query)
+    digest = hashlib.sha1(f"{queryset.model._meta.label}:{sql}".encode()).hexdigest()
+    return f"registry-count:{digest}"
+
+
+def count_registry(queryset: QuerySet, is_filtered: bool) -> tuple[int, bool]:
+    """
+    Повертає (кількість записів, чи є вона точною).
+
+    Нефільтровані великі таблиці рахуються за оцінкою pg_class, малі - точно.
+    Фільтровані запити кешуються на REGISTRY_COUNT_CACHE_TTL секунд за ключем фільтра.
+    """
+    if not is_filtered:
+        estimate = estimate_table_rows(queryset.model)
+        if estimate is not None and estimate >= settings.REGISTRY_COUNT_ESTIMATE_THRESHOLD:
+            return estimate, False
+        return queryset.count(), True
+
+    try:
+        cache_key = _count_cache_key(queryset)
+    except EmptyResultSet:
+        return 0, True
+
+    cached_count = cache.get(cache_key)
+    if cached_count is not None:
+        return cached_count, False
+
+    total_count = queryset.count()
+    cache.set(cache_key, total_count, settings.REGISTRY_COUNT_CACHE_TTL)
+    return total_count, True
@@ -1,6 +1,15 @@
-import os
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+import json
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Mapping, Optional
+
+import requests
+from django.conf import settings
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from sendgrid.helpers.mail import Content, From, Mail, Personalization, Substitution, To
 
 def remove_plus_extension(email: str) -> str:
     if '@' not in email:
@@ -12,60 +21,211 @@ def remove_plus_extension(email: str) -> str:
         local_part = local_part[:plus_index]
     return f"{local_part}@{domain_part}"
 
-def send_appointment_notification(
-        doctor_email: str,
-        doctor_name: str,
-        patient_name: str,
-        appointment_date: str,
-        appointment_time: str,
-        patient_id: int,
-        patient_sex: str
-):
-    subject = "Заплановано огляд пацієнта"
-    body_html = f"""
-    <p>{doctor_name},</p>
+
+@dataclass(frozen=True)
+class OutgoingEmail:
+    """
+    Лист одному отримувачу. Теги підстановки (-name-) у темі та тексті замінюються значеннями
+    substitutions для кожного отримувача окремо, тож листи з однаковим шаблоном надсилаються пакетом.
+    """
+    to_email: str
+    subject: str
+    html_content: str
+    substitutions: Mapping[str, str] = field(default_factory=dict)
+
+    def render(self, text: str) -> str:
+        for tag, value in self.substitutions.items():
+            text = text.replace(tag, value)
+        return text
+
+
+class MailDeliveryError(Exception):
+    pass
+
+
+class MailTransport(ABC):
+    @abstractmethod
+    def send_batch(self, emails: list[OutgoingEmail]) -> list[Optional[Exception]]:
+        """
+        Надсилає листи; повертає для кожного None або помилку доставки (порядок збігається з emails).
+        """
+
+    def send(self, email: OutgoingEmail):
+        error = self.send_batch([email])[0]
+        if error is not None:
+            raise error
+
+
+class SendGridTransport(MailTransport):
+    """
+    Довготривалий клієнт SendGrid v3 з пулом keep-alive з'єднань (одне TLS-рукостискання на з'єднання,
+    а не на лист). Листи з однаковим шаблоном ідуть одним запитом з кількома personalizations.
+    """
+    API_URL = 'https://api.sendgrid.com/v3/mail/send'
+    MAX_PERSONALIZATIONS = 1000
+
+    def __init__(self, api_key: str, from_email: str, timeout: float = 10, pool_size: int = 10):
+        self.from_email = from_email
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.headers.update({'Authorization': f"Bearer {api_key}"})
+
+    def _payload(self, emails: list[OutgoingEmail]) -> dict:
+        message = Mail()
+        message.from_email = From(self.from_email)
+        message.subject = emails[0].subject
+        message.add_content(Content('text/html', emails[0].html_content))
+        for email in emails:
+            personalization = Personalization()
+            personalization.add_to(To(remove_plus_extension(email.to_email)))
+            for tag, value in email.substitutions.items():
+                personalization.add_substitution(Substitution(tag, value))
+            message.add_personalization(personalization)
+        return message.get()
+
+    def send_batch(self, emails: list[OutgoingEmail]) -> list[Optional[Exception]]:
+        results: list[Optional[Exception]] = [None] * len(emails)
+        groups = defaultdict(list)
+        for index, email in enumerate(emails):
+            groups[(email.subject, email.html_content)].append(index)
+
+        for indexes in groups.values():
+            for start in range(0, len(indexes), self.MAX_PERSONALIZATIONS):
+                chunk = indexes[start:start + self.MAX_PERSONALIZATIONS]
+                error = None
+                try:
+                    response = self.session.post(self.API_URL, json=self._payload([emails[i] for i in chunk]),
+                                                 timeout=self.timeout)
+                    if response.status_code >= 400:
+                        error = MailDeliveryError(f"SendGrid responded {response.status_code}: {response.text[:500]}")
+                except requests.RequestException as e:
+                    error = MailDeliveryError(f"SendGrid request failed: {e}")
+                for i in chunk:
+                    results[i] = error
+        return results
+
+
+class MemoryTransport(MailTransport):
+    """
+    Складає листи у список outbox; для тестів і навантажувального тестування без SendGrid.
+    """
+
+    def __init__(self):
+        self.outbox: list[OutgoingEmail] = []
+        self._lock = threading.Lock()
+
+    def send_batch(self, emails: list[OutgoingEmail]) -> list[Optional[Exception]]:
+        with self._lock:
+            self.outbox.extend(emails)
+        return [None] * len(emails)
+
+
+class FileTransport(MailTransport):
+    """
+    Дописує листи у файл JSON Lines (готові тема й текст для кожного отримувача).
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def send_batch(self, emails: list[OutgoingEmail]) -> list[Optional[Exception]]:
+        sent_at = timezone.now().isoformat()
+        lines = [
+            json.dumps({
+                'to': email.to_email,
+                'subject': email.render(email.subject),
+                'html': email.render(email.html_content),
+                'sentAt': sent_at
+            }, ensure_ascii=False) + '\n'
+            for email in emails
+        ]
+        with self._lock, open(self.path, 'a', encoding='utf-8') as sink:
+            sink.writelines(lines)
+        return [None] * len(emails)
+
+
+_transport: Optional[MailTransport] = None
+_transport_lock = threading.Lock()
+
+
+def get_mail_transport() -> MailTransport:
+    """
+    Транспорт процесу за settings.MAIL_TRANSPORT: 'sendgrid', 'memory' або 'file'.
+    """
+    global _transport
+    with _transport_lock:
+        if _transport is None:
+            if settings.MAIL_TRANSPORT == 'memory':
+                _transport = MemoryTransport()
+            elif settings.MAIL_TRANSPORT == 'file':
+                _transport = FileTransport(settings.MAIL_SINK_PATH)
+            elif settings.MAIL_TRANSPORT == 'sendgrid':
+                _transport = SendGridTransport(settings.SENDGRID_API_KEY, settings.MAIL_FROM_EMAIL)
+            else:
+                raise ValueError(f"Unknown MAIL_TRANSPORT: {settings.MAIL_TRANSPORT}")
+        return _transport
+
+
+def reset_mail_transport():
+    global _transport
+    with _transport_lock:
+        _transport = None
+
+
+APPOINTMENT_NOTIFICATION_HTML = """
+    <p>-doctor_name-,</p>
     <br />
-    <p>Повідомляємо, що до вас на прийом записан{'ий' if patient_sex == 'MALE' else 'а'} пацієнт{'ка' if patient_sex == 'FEMALE' else ''} {patient_name}.</p>
+    <p>Повідомляємо, що до вас на прийом -recorded- -patient_noun- -patient_name-.</p>
 
-    <p>Дата прийому: {appointment_date}</p>
-    <p>Час прийому: {appointment_time}</p>
-    <p>Медична картка: https://vitalineph.com/patient/{patient_id}</p>
+    <p>Дата прийому: -appointment_date-</p>
+    <p>Час прийому: -appointment_time-</p>
+    <p>Медична картка: https://vitalineph.com/patient/-patient_id-</p>
     <br />
 
     <p>З повагою,</p>
     <p>Система Сповіщень VitaLine</p>
     """
 
-    message = Mail(
-        from_email='appointments@vitalineph.com',
-        to_emails=remove_plus_extension(doctor_email),
-        subject=subject,
-        html_content=body_html
+def build_appointment_notification(
+        doctor_email: str,
+        doctor_name: str,
+        patient_name: str,
+        appointment_date: str,
+        appointment_time: str,
+        patient_id: int,
+        patient_sex: str
+) -> OutgoingEmail:
+    return OutgoingEmail(
+        to_email=doctor_email,
+        subject="Заплановано огляд пацієнта",
+        html_content=APPOINTMENT_NOTIFICATION_HTML,
+        substitutions={
+            '-doctor_name-': doctor_name,
+            '-recorded-': f"записан{'ий' if patient_sex == 'MALE' else 'а'}",
+            '-patient_noun-': f"пацієнт{'ка' if patient_sex == 'FEMALE' else ''}",
+            '-patient_name-': patient_name,
+            '-appointment_date-': appointment_date,
+            '-appointment_time-': appointment_time,
+            '-patient_id-': str(patient_id),
+        }
     )
 
-    try:
-        SendGridAPIClient(os.environ.get('SENDGRID_API_KEY')).send(message)
-    except Exception as e:
-        print(f"Error sending email via SendGrid: {e}")
-
 def send_email_verification_notification(
         email: str,
         verification_code: int
 ):
-    subject = "Ваш код підтвердження VitaLine"
+    """
+    Надсилає код підтвердження; MailDeliveryError передається викликачеві.
+    """
     body_html = f"""
     <p>Ваш код підтвердження - {verification_code}.</p>
     <p>З повагою, команда клініки VitaLine</p>
     """
 
-    message = Mail(
-        from_email='appointments@vitalineph.com',
-        to_emails=remove_plus_extension(email),
-        subject=subject,
+    get_mail_transport().send(OutgoingEmail(
+        to_email=email,
+        subject="Ваш код підтвердження VitaLine",
         html_content=body_html
-    )
-
-    try:
-        SendGridAPIClient(os.environ.get('SENDGRID_API_KEY')).send(message)
-    except Exception as e:
-        print(f"Error sending email via SendGrid: {e}")
\ No newline at end of file
+    ))
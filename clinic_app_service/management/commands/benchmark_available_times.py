@@ -0,0 +1,67 @@
+import statistics
+import time
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from rest_framework.test import APIRequestFactory
+
+from clinic_app_service.app_views.available_times_view import AvailableTimesView
+from clinic_app_service.availability_service import CLINIC_TZ
+from clinic_app_service.models import Appointment, Invoice, Patient, PriceList, PriceListEntry, Service, User
+
+
+class Command(BaseCommand):
+    help = ("Вимірює затримку available-times при зростанні історії прийомів лікаря. "
+            "Усі тестові дані створюються в транзакції, яка відкочується.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[100, 1000, 10000, 50000])
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._run(sorted(options['sizes']), options['repeat'])
+            transaction.set_rollback(True)
+
+    def _run(self, sizes, repeat):
+        doctor = User.objects.create(first_name='Bench', last_name='Doctor', email='bench-doctor@example.com',
+                                     user_type='DOCTOR', password_hash='-', qualification='-')
+        patient = Patient.objects.create(first_name='Bench', last_name='Patient', phone_number='+000000000000',
+                                         email='bench-patient@example.com', birth_date=date(1990, 1, 1))
+        service = Service.objects.create(service_name='Bench service')
+        entry = PriceListEntry.objects.create(price_list=PriceList.objects.create(name='Bench'),
+                                              service=service, price=100)
+        invoice = Invoice.objects.create(subtotal=100, total=100)
+
+        tz = CLINIC_TZ
+        target_day = date.today() + timedelta(days=(7 - date.today().weekday()))
+        first_slot = tz.localize(datetime.combine(target_day, datetime.min.time())) + timedelta(hours=9)
+        view = AvailableTimesView.as_view()
+        request_factory = APIRequestFactory()
+
+        created = 0
+        self.stdout.write(f"{'history':>10} {'median ms':>10} {'p95 ms':>10}")
+        for size in sizes:
+            history = []
+            for i in range(created, size):
+                # Історія розкладена в минуле по 18 прийомів на день
+                slot = first_slot - timedelta(days=1 + i // 18, minutes=30 * (i % 18))
+                history.append(Appointment(patient=patient, doctor=doctor, price_list_entry=entry, invoice=invoice,
+                                           execution_status='COMPLETED', appointment_date=slot))
+            Appointment.objects.bulk_create(history, batch_size=5000)
+            created = size
+
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Appointment._meta.db_table}")
+
+            timings = []
+            for _ in range(repeat):
+                request = request_factory.get('/', {'doctorId': doctor.id, 'date': target_day.isoformat()})
+                started = time.perf_counter()
+                view(request)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(f"{size:>10} {statistics.median(timings):>10.2f} {p95:>10.2f}")
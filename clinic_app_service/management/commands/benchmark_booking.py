@@ -0,0 +1,88 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+
+from clinic_app_service.appointment_service import SlotConflictError, reserve_slots
+from clinic_app_service.availability_service import CLINIC_TZ
+from clinic_app_service.models import Appointment, Invoice, Patient, PriceList, PriceListEntry, Service, User
+
+
+class Command(BaseCommand):
+    help = ("Навантажувальний тест паралельного бронювання слотів: пропускна здатність для різних лікарів "
+            "і для одного лікаря з конкуренцією за ті самі слоти. Тестові дані видаляються після запуску.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--bookings', type=int, default=50, help="Бронювань на потік")
+
+    def handle(self, *args, **options):
+        threads, bookings = options['threads'], options['bookings']
+        # Потоки працюють зі своїми з'єднаннями, тож дані мають бути закомічені
+        fixtures = self._seed(threads)
+        try:
+            self.stdout.write(f"{'scenario':>12} {'booked':>8} {'conflicts':>10} {'per sec':>10}")
+            self._run('distinct', fixtures, threads, bookings, contended=False)
+            self._run('contended', fixtures, threads, bookings, contended=True)
+        finally:
+            self._cleanup(fixtures)
+
+    def _seed(self, threads):
+        doctors = [
+            User.objects.create(first_name='Bench', last_name=f'Doctor {i}', email=f'bench-booking-{i}@example.com',
+                                user_type='DOCTOR', password_hash='-', qualification='-')
+            for i in range(threads)
+        ]
+        patient = Patient.objects.create(first_name='Bench', last_name='Patient', phone_number='+000000000001',
+                                         email='bench-booking-patient@example.com', birth_date=date(1990, 1, 1))
+        price_list = PriceList.objects.create(name='Bench booking')
+        service = Service.objects.create(service_name='Bench booking service')
+        entry = PriceListEntry.objects.create(price_list=price_list, service=service, price=100)
+        return {'doctors': doctors, 'patient': patient, 'price_list': price_list, 'service': service, 'entry': entry}
+
+    def _run(self, scenario, fixtures, threads, bookings, contended):
+        first_slot = CLINIC_TZ.localize(datetime.combine(date.today() + timedelta(days=365), datetime.min.time()))
+        # У сценарії з конкуренцією всі потоки намагаються зайняти ті самі слоти одного лікаря
+        day_offset = 1 if contended else 0
+
+        def worker(thread_index):
+            doctor = fixtures['doctors'][0 if contended else thread_index]
+            booked = conflicts = 0
+            try:
+                for i in range(bookings):
+                    slot = first_slot + timedelta(days=day_offset, minutes=30 * i)
+                    try:
+                        with transaction.atomic():
+                            invoice = Invoice.objects.create(subtotal=100, total=100)
+                            reserve_slots([Appointment(
+                                patient=fixtures['patient'], doctor=doctor, price_list_entry=fixtures['entry'],
+                                invoice=invoice, execution_status='PLANNED', appointment_date=slot
+                            )], [fixtures['service'].slot_minutes])
+                        booked += 1
+                    except SlotConflictError:
+                        conflicts += 1
+            finally:
+                connections.close_all()
+            return booked, conflicts
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            results = list(pool.map(worker, range(threads)))
+        elapsed = time.perf_counter() - started
+
+        booked = sum(result[0] for result in results)
+        conflicts = sum(result[1] for result in results)
+        self.stdout.write(f"{scenario:>12} {booked:>8} {conflicts:>10} {(booked + conflicts) / elapsed:>10.1f}")
+
+    def _cleanup(self, fixtures):
+        appointments = Appointment.objects.filter(price_list_entry=fixtures['entry'])
+        invoice_ids = list(appointments.values_list('invoice_id', flat=True))
+        appointments.delete()
+        Invoice.objects.filter(pk__in=invoice_ids).delete()
+        fixtures['entry'].delete()
+        fixtures['price_list'].delete()
+        fixtures['service'].delete()
+        fixtures['patient'].delete()
+        User.objects.filter(pk__in=[doctor.pk for doctor in fixtures['doctors']]).delete()
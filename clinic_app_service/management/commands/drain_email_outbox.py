@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from clinic_app_service.outbox_service import drain_outbox
+
+
+class Command(BaseCommand):
+    help = ("Надсилає листи з outbox партіями з повторними спробами та експоненційною затримкою. "
+            "Без --loop обробляє чергу, доки в ній є листи, час яких настав, і завершується.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        parser.add_argument('--max-attempts', type=int, default=None)
+        parser.add_argument('--loop', action='store_true', help="Працювати постійно, опитуючи чергу")
+        parser.add_argument('--interval', type=float, default=2.0, help="Пауза між опитуваннями порожньої черги, с")
+
+    def handle(self, *args, **options):
+        total_sent = total_failed = 0
+        while True:
+            close_old_connections()
+            sent, failed = drain_outbox(options['batch_size'], options['max_attempts'])
+            total_sent += sent
+            total_failed += failed
+            if sent or failed:
+                self.stdout.write(f"Надіслано: {sent}, невдалих спроб: {failed}")
+
+            if sent + failed < options['batch_size']:
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Готово. Надіслано: {total_sent}, невдалих спроб: {total_failed}"
+        ))
@@ -0,0 +1,20 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from clinic_app_service.stats_service import rebuild_daily_doctor_stats
+
+
+class Command(BaseCommand):
+    help = ("Перераховує денний підсумок прийомів лікарів (кількість і виручка за послугою та днем) "
+            "з історії завершених прийомів. Без --from/--to - за весь час.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from', dest='date_from', type=date.fromisoformat, default=None,
+                            help="Перший день клініки, YYYY-MM-DD")
+        parser.add_argument('--to', dest='date_to', type=date.fromisoformat, default=None,
+                            help="Останній день клініки, YYYY-MM-DD")
+
+    def handle(self, *args, **options):
+        rows_count = rebuild_daily_doctor_stats(options['date_from'], options['date_to'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {rows_count} daily doctor stats rows."))
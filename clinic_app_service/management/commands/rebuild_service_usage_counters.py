@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from clinic_app_service.appointment_service import rebuild_service_usage_counters
+
+
+class Command(BaseCommand):
+    help = "Перераховує лічильники завершених прийомів для кожної послуги з історії прийомів"
+
+    def handle(self, *args, **options):
+        counters_count = rebuild_service_usage_counters()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {counters_count} service usage counters."))
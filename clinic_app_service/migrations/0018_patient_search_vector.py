@@ -0,0 +1,25 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:38
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0017_verification_remove_user_verification_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('last_name', 'first_name', 'middle_name', config='simple', weight='A'), '||', django.contrib.postgres.search.SearchVector(models.Func(models.F('phone_number'), models.Value('\\D'), models.Value(''), models.Value('g'), function='REGEXP_REPLACE'), django.db.models.functions.text.Right(models.Func(models.F('phone_number'), models.Value('\\D'), models.Value(''), models.Value('g'), function='REGEXP_REPLACE'), 10), django.db.models.functions.text.Right(models.Func(models.F('phone_number'), models.Value('\\D'), models.Value(''), models.Value('g'), function='REGEXP_REPLACE'), 9), django.db.models.functions.text.Right(models.Func(models.F('phone_number'), models.Value('\\D'), models.Value(''), models.Value('g'), function='REGEXP_REPLACE'), 7), django.db.models.functions.text.Replace('email', models.Value('@'), models.Value(' ')), config='simple', weight='B'), django.contrib.postgres.search.SearchConfig('simple')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='patient_search_vector_idx'),
+        ),
+    ]
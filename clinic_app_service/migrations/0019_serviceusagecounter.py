@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def fill_service_usage_counters(apps, schema_editor):
+    Appointment = apps.get_model('clinic_app_service', 'Appointment')
+    ServiceUsageCounter = apps.get_model('clinic_app_service', 'ServiceUsageCounter')
+
+    totals = (
+        Appointment.objects
+        .filter(execution_status='COMPLETED')
+        .order_by()
+        .values('price_list_entry__service')
+        .annotate(total=Count('id'))
+    )
+    ServiceUsageCounter.objects.bulk_create(
+        ServiceUsageCounter(service_id=row['price_list_entry__service'], completed_count=row['total'])
+        for row in totals
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0018_patient_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ServiceUsageCounter',
+            fields=[
+                ('service', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='usage_counter', serialize=False, to='clinic_app_service.service')),
+                ('completed_count', models.PositiveIntegerField(default=0, verbose_name='Кількість завершених прийомів')),
+            ],
+        ),
+        migrations.RunPython(fill_service_usage_counters, migrations.RunPython.noop),
+    ]
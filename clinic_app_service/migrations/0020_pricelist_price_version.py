@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0019_serviceusagecounter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricelist',
+            name='price_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версія цін'),
+        ),
+    ]
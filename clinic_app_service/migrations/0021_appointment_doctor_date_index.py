@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0020_pricelist_price_version'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('execution_status', 'CANCELED'), _negated=True), fields=['doctor', 'appointment_date'], name='appt_doctor_date_active_idx'),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:48
+
+import clinic_app_service.models
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0021_appointment_doctor_date_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='slot_minutes',
+            field=models.PositiveSmallIntegerField(default=30, validators=[django.core.validators.MinValueValidator(5), clinic_app_service.models.validate_five_minutes], verbose_name='Тривалість прийому, хв'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='schedule_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версія графіка'),
+        ),
+        migrations.CreateModel(
+            name='DoctorBreak',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(blank=True, choices=[(0, 'Понеділок'), (1, 'Вівторок'), (2, 'Середа'), (3, 'Четвер'), (4, "П'ятниця"), (5, 'Субота'), (6, 'Неділя')], null=True, verbose_name='День тижня')),
+                ('start_time', models.TimeField(validators=[clinic_app_service.models.validate_five_minutes], verbose_name='Початок')),
+                ('end_time', models.TimeField(validators=[clinic_app_service.models.validate_five_minutes], verbose_name='Кінець')),
+                ('doctor', models.ForeignKey(limit_choices_to={'user_type': 'DOCTOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='breaks', to='clinic_app_service.user')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('start_time__lt', models.F('end_time'))), name='check_break_range')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorDayOff',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Дата')),
+                ('doctor', models.ForeignKey(limit_choices_to={'user_type': 'DOCTOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='days_off', to='clinic_app_service.user')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'date'), name='unique_doctor_day_off')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DoctorWorkingHours',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weekday', models.PositiveSmallIntegerField(choices=[(0, 'Понеділок'), (1, 'Вівторок'), (2, 'Середа'), (3, 'Четвер'), (4, "П'ятниця"), (5, 'Субота'), (6, 'Неділя')], verbose_name='День тижня')),
+                ('start_time', models.TimeField(validators=[clinic_app_service.models.validate_five_minutes], verbose_name='Початок')),
+                ('end_time', models.TimeField(validators=[clinic_app_service.models.validate_five_minutes], verbose_name='Кінець')),
+                ('doctor', models.ForeignKey(limit_choices_to={'user_type': 'DOCTOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='working_hours', to='clinic_app_service.user')),
+            ],
+            options={
+                'constraints': [models.CheckConstraint(condition=models.Q(('start_time__lt', models.F('end_time'))), name='check_working_hours_range')],
+            },
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:52
+
+from django.db import migrations, models
+
+MAX_REPORTED_SLOTS = 50
+
+
+def check_duplicate_active_slots(apps, schema_editor):
+    """
+    До унікального обмеження бронювання не мали локу, тож на один час лікаря могло потрапити
+    кілька активних прийомів. Міграція їх не скасовує сама: вона зупиняється зі списком конфліктних
+    слотів, і дублікати потрібно розв'язати вручну.
+    """
+    table = apps.get_model('clinic_app_service', 'Appointment')._meta.db_table
+
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT doctor_id, appointment_date, array_agg(id || ' ' || execution_status ORDER BY id) "
+            f"FROM {table} WHERE execution_status <> 'CANCELED' AND appointment_date IS NOT NULL "
+            f"GROUP BY 1, 2 HAVING COUNT(*) > 1 ORDER BY 1, 2"
+        )
+        conflicts = cursor.fetchall()
+
+    if conflicts:
+        report = '\n'.join(
+            f"  doctor_id={doctor_id} at {appointment_date.isoformat()}: appointments {', '.join(rows)}"
+            for doctor_id, appointment_date, rows in conflicts[:MAX_REPORTED_SLOTS]
+        )
+        more = f"\n  ... and {len(conflicts) - MAX_REPORTED_SLOTS} more" if len(conflicts) > MAX_REPORTED_SLOTS else ''
+        raise RuntimeError(
+            f"Cannot add unique_active_doctor_slot: {len(conflicts)} slot(s) hold more than one active "
+            f"appointment. Cancel or move the extra appointments and re-run the migration:\n{report}{more}"
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0022_doctor_schedules'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_active_slots, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('execution_status', 'CANCELED'), _negated=True), fields=('doctor', 'appointment_date'), name='unique_active_doctor_slot'),
+        ),
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_doctor_date_active_idx',
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:53
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0023_appointment_unique_active_slot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EmailOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('APPOINTMENT_NOTIFICATION', 'Сповіщення лікаря про прийом')], max_length=31, verbose_name='Тип листа')),
+                ('status', models.CharField(choices=[('PENDING', 'Очікує надсилання'), ('SENT', 'Надіслано'), ('FAILED', 'Не надіслано')], default='PENDING', max_length=15, verbose_name='Стан')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Кількість спроб')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Наступна спроба')),
+                ('last_error', models.TextField(blank=True, verbose_name='Остання помилка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Створено')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Надіслано')),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to='clinic_app_service.appointment')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('status', 'PENDING')), fields=['next_attempt_at'], name='outbox_pending_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0024_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'appointment_date'], name='appt_doctor_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 12:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0025_appointment_doctor_feed_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['patient', '-appointment_date', '-id'], name='appt_patient_date_idx'),
+        ),
+    ]
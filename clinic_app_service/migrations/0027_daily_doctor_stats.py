@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_daily_doctor_stats(apps, schema_editor):
+    # Статистика читається лише з підсумку, тож історія заповнюється одразу, а не після ручного rebuild
+    from clinic_app_service.stats_service import fill_daily_doctor_stats
+
+    with schema_editor.connection.cursor() as cursor:
+        fill_daily_doctor_stats(cursor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0026_appointment_patient_history_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDoctorStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='День')),
+                ('completed_count', models.IntegerField(default=0, verbose_name='Кількість завершених прийомів')),
+                ('revenue', models.DecimalField(decimal_places=4, default=0, max_digits=16, verbose_name='Виручка')),
+                ('doctor', models.ForeignKey(limit_choices_to={'user_type': 'DOCTOR'}, on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='clinic_app_service.user')),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='clinic_app_service.service')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='daily_stats_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('doctor', 'service', 'day'), name='unique_daily_doctor_stats')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_doctor_stats, migrations.RunPython.noop),
+    ]
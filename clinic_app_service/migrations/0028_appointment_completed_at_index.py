@@ -0,0 +1,17 @@
+# Generated by Django 5.1.6 on 2026-10-18 13:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinic_app_service', '0027_daily_doctor_stats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(condition=models.Q(('execution_status', 'COMPLETED')), fields=['completion_date'], name='appt_completed_at_idx'),
+        ),
+    ]
@@ -1,8 +1,12 @@
 import bcrypt
 from django.contrib.postgres.fields.array import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.utils import timezone
 from django.db import models
-from django.db.models import Q, CheckConstraint
+from django.db.models import Q, F, Func, Value, CheckConstraint
+from django.db.models.functions import Replace, Right
+from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 
 SEX_CHOICES = (
@@ -34,6 +38,31 @@ APPOINTMENT_STATUS_CHOICES = (
     ('COMPLETED', 'Завершений'),
 )
 
+OUTBOX_STATUS_CHOICES = (
+    ('PENDING', 'Очікує надсилання'),
+    ('SENT', 'Надіслано'),
+    ('FAILED', 'Не надіслано'),
+)
+
+WEEKDAY_CHOICES = (
+    (0, 'Понеділок'),
+    (1, 'Вівторок'),
+    (2, 'Середа'),
+    (3, 'Четвер'),
+    (4, "П'ятниця"),
+    (5, 'Субота'),
+    (6, 'Неділя'),
+)
+
+
+def validate_five_minutes(value):
+    minutes = value if isinstance(value, int) else value.hour * 60 + value.minute
+    if minutes % 5 or (not isinstance(value, int) and value.second):
+        raise ValidationError("Значення має бути кратним 5 хвилинам.")
+
+
+PHONE_DIGITS = Func(F('phone_number'), Value(r'\D'), Value(''), Value('g'), function='REGEXP_REPLACE')
+
 
 class Patient(models.Model):
     first_name = models.CharField("Ім'я", max_length=255, blank=False)
@@ -45,6 +74,30 @@ class Patient(models.Model):
     gender = models.CharField("Стать", max_length=8, choices=SEX_CHOICES, blank=False, default='Чоловіча')
     benefit_group = models.CharField("Пільгова група", max_length=50, choices=BENEFIT_GROUP_CHOICES, blank=True)
 
+    # Нормалізований пошуковий вектор для реєстру пацієнтів: ПІБ, телефон лише цифрами
+    # (повний, 10/9/7 останніх цифр - щоб знаходило і "050...", і "123-45-67") та email без "@"
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('last_name', 'first_name', 'middle_name', config='simple', weight='A') +
+            SearchVector(
+                PHONE_DIGITS,
+                Right(PHONE_DIGITS, 10),
+                Right(PHONE_DIGITS, 9),
+                Right(PHONE_DIGITS, 7),
+                Replace('email', Value('@'), Value(' ')),
+                config='simple',
+                weight='B'
+            )
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True
+    )
+
+    class Meta:
+        indexes = [
+            GinIndex(fields=['search_vector'], name='patient_search_vector_idx'),
+        ]
+
     def __str__(self):
         return f"{self.last_name} {self.first_name}"
 
@@ -52,6 +105,8 @@ class Patient(models.Model):
 class Service(models.Model):
     service_name = models.CharField("Назва послуги", max_length=100, unique=True)
     is_service_archived = models.BooleanField("Архівовано", blank=False, default=False)
+    slot_minutes = models.PositiveSmallIntegerField("Тривалість прийому, хв", default=30,
+                                                    validators=[MinValueValidator(5), validate_five_minutes])
 
     def __str__(self):
         return self.service_name
@@ -126,6 +181,8 @@ class User(models.Model):
                                       related_name='user_doctor', blank=True)
     password_hash = models.TextField("Хеш паролю", blank=False)
     qualification = models.CharField("Кваліфікація", max_length=255, blank=False)
+    # Збільшується при кожній зміні графіка лікаря; ключує скомпільовані шаблони слотів у воркерах
+    schedule_version = models.PositiveIntegerField("Версія графіка", default=0)
 
     def save(self, *args, **kwargs):
         super().save(*args, **kwargs)
@@ -140,6 +197,11 @@ class User(models.Model):
     def check_password(self, raw_password):
         return bcrypt.checkpw(raw_password.encode(), self.password_hash.encode())
 
+    @property
+    def is_authenticated(self):
+        # Для DRF (IsAuthenticated): працівник у request.user завжди знайдений за валідним токеном
+        return True
+
     def __str__(self):
         return f"{self.last_name} {self.first_name}"
 
@@ -151,6 +213,8 @@ class PriceList(models.Model):
     is_archived = models.BooleanField("Є архівованим", blank=False, default=False)
     archive_reason = models.TextField("Причина архівування", max_length=255, blank=True)
     archivation_date = models.DateTimeField("Дата архівування", null=True, blank=True)
+    # Збільшується при кожній зміні позицій прайс-листа; разом з id ключує знімок цін у воркерах
+    price_version = models.PositiveIntegerField("Версія цін", default=0)
 
     def __str__(self):
         return f"Прайс-лист {self.pk} "
@@ -179,6 +243,23 @@ class Appointment(models.Model):
     appointment_date = models.DateTimeField("Дата проведення", blank=True, null=True)
     completion_date = models.DateTimeField("Дата виконання", blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            # Один активний прийом лікаря на момент часу; індекс також обслуговує пошук зайнятих слотів
+            # за діапазоном дат (скасовані прийоми слотів не займають)
+            models.UniqueConstraint(fields=['doctor', 'appointment_date'], condition=~Q(execution_status='CANCELED'),
+                                    name='unique_active_doctor_slot'),
+        ]
+        indexes = [
+            # Стрічка прийомів лікаря за вікном дат, включно зі скасованими
+            models.Index(fields=['doctor', 'appointment_date'], name='appt_doctor_date_idx'),
+            # Історія пацієнта від найновіших (keyset за датою прийому)
+            models.Index(fields=['patient', '-appointment_date', '-id'], name='appt_patient_date_idx'),
+            # Завершені прийоми за часом завершення (статистика за день, перебудова підсумку)
+            models.Index(fields=['completion_date'], condition=Q(execution_status='COMPLETED'),
+                         name='appt_completed_at_idx'),
+        ]
+
     def __str__(self):
         return f"Прийом {self.pk}"
 
@@ -187,4 +268,113 @@ class Verification(models.Model):
     code = models.IntegerField("Verification code", null=True, blank=True)
 
     def __str__(self):
-        return  f"Verification {self.email}"
\ No newline at end of file
+        return  f"Verification {self.email}"
+
+
+class ServiceUsageCounter(models.Model):
+    service = models.OneToOneField(Service, on_delete=models.CASCADE, primary_key=True,
+                                   related_name='usage_counter')
+    completed_count = models.PositiveIntegerField("Кількість завершених прийомів", default=0)
+
+    def __str__(self):
+        return f"Лічильник послуги {self.service_id}"
+
+
+class DoctorWorkingHours(models.Model):
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='working_hours',
+                               limit_choices_to={'user_type': 'DOCTOR'})
+    weekday = models.PositiveSmallIntegerField("День тижня", choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField("Початок", validators=[validate_five_minutes])
+    end_time = models.TimeField("Кінець", validators=[validate_five_minutes])
+
+    class Meta:
+        constraints = [
+            CheckConstraint(check=Q(start_time__lt=F('end_time')), name='check_working_hours_range'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor} {self.get_weekday_display()} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class DoctorBreak(models.Model):
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='breaks',
+                               limit_choices_to={'user_type': 'DOCTOR'})
+    # Порожній день тижня - перерва щодня
+    weekday = models.PositiveSmallIntegerField("День тижня", choices=WEEKDAY_CHOICES, null=True, blank=True)
+    start_time = models.TimeField("Початок", validators=[validate_five_minutes])
+    end_time = models.TimeField("Кінець", validators=[validate_five_minutes])
+
+    class Meta:
+        constraints = [
+            CheckConstraint(check=Q(start_time__lt=F('end_time')), name='check_break_range'),
+        ]
+
+    def __str__(self):
+        return f"Перерва {self.doctor} {self.start_time:%H:%M}-{self.end_time:%H:%M}"
+
+
+class DoctorDayOff(models.Model):
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='days_off',
+                               limit_choices_to={'user_type': 'DOCTOR'})
+    date = models.DateField("Дата")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date'], name='unique_doctor_day_off'),
+        ]
+
+    def __str__(self):
+        return f"Вихідний {self.doctor} {self.date}"
+
+
+class EmailOutbox(models.Model):
+    """
+    Лист, записаний у транзакції бронювання; надсилає його воркер drain_email_outbox.
+    """
+    KIND_CHOICES = (
+        ('APPOINTMENT_NOTIFICATION', 'Сповіщення лікаря про прийом'),
+    )
+
+    kind = models.CharField("Тип листа", max_length=31, choices=KIND_CHOICES, blank=False)
+    appointment = models.ForeignKey(Appointment, on_delete=models.CASCADE, related_name='outbox_messages',
+                                    null=True, blank=True)
+    status = models.CharField("Стан", max_length=15, choices=OUTBOX_STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveSmallIntegerField("Кількість спроб", default=0)
+    next_attempt_at = models.DateTimeField("Наступна спроба", default=timezone.now)
+    last_error = models.TextField("Остання помилка", blank=True)
+    created_at = models.DateTimeField("Створено", auto_now_add=True)
+    sent_at = models.DateTimeField("Надіслано", null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_attempt_at'], condition=Q(status='PENDING'), name='outbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"Лист {self.pk} ({self.kind})"
+
+
+
+class DailyDoctorStats(models.Model):
+    """
+    Денний підсумок завершених прийомів лікаря за послугою; день - локальна дата завершення в клініці.
+    Оновлюється при завершенні та скасуванні прийомів, перебудовується командою rebuild_daily_doctor_stats.
+    """
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='daily_stats',
+                               limit_choices_to={'user_type': 'DOCTOR'})
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name='daily_stats')
+    day = models.DateField("День")
+    completed_count = models.IntegerField("Кількість завершених прийомів", default=0)
+    # Чотири знаки після коми: ціна зі знижкою у відсотках зберігається без округлення
+    revenue = models.DecimalField("Виручка", max_digits=16, decimal_places=4, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'service', 'day'], name='unique_daily_doctor_stats'),
+        ]
+        indexes = [
+            models.Index(fields=['day'], name='daily_stats_day_idx'),
+        ]
+
+    def __str__(self):
+        return f"Статистика {self.doctor_id} {self.service_id} {self.day}"
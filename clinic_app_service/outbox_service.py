@@ -0,0 +1,97 @@
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .availability_service import CLINIC_TZ
+from .mail_service import build_appointment_notification, get_mail_transport
+from .models import Appointment, EmailOutbox
+
+MAX_ERROR_LENGTH = 2000
+
+
+def enqueue_appointment_notifications(appointments: Iterable[Appointment]) -> list[EmailOutbox]:
+    """
+    Записує сповіщення лікарям у outbox одним INSERT. Викликається в транзакції бронювання,
+    тож лист з'явиться в черзі лише разом із закоміченим прийомом.
+    """
+    return EmailOutbox.objects.bulk_create(
+        EmailOutbox(kind='APPOINTMENT_NOTIFICATION', appointment=appointment) for appointment in appointments
+    )
+
+
+def _build_message(message: EmailOutbox):
+    if message.kind == 'APPOINTMENT_NOTIFICATION':
+        appointment = message.appointment
+        doctor, patient = appointment.doctor, appointment.patient
+        local = appointment.appointment_date.astimezone(CLINIC_TZ)
+        return build_appointment_notification(
+            doctor_email=doctor.email,
+            doctor_name=f"{doctor.first_name} {doctor.last_name}",
+            patient_name=f"{patient.last_name} {patient.first_name} {patient.middle_name}",
+            appointment_date=local.strftime("%d.%m.%Y"),
+            appointment_time=local.strftime("%H:%M"),
+            patient_id=patient.id,
+            patient_sex=patient.gender
+        )
+    raise ValueError(f"Unknown outbox message kind: {message.kind}")
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """
+    Експоненційна затримка перед наступною спробою: base, 2*base, 4*base, ... але не більше max.
+    """
+    seconds = settings.EMAIL_OUTBOX_RETRY_BASE * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(seconds, settings.EMAIL_OUTBOX_RETRY_MAX))
+
+
+def drain_outbox(batch_size: int = 100, max_attempts: Optional[int] = None) -> tuple[int, int]:
+    """
+    Надсилає одну партію листів, час яких настав. Повертає (надіслано, невдалих спроб).
+    Рядки партії блокуються з SKIP LOCKED, тож паралельні воркери не надсилають той самий лист.
+    """
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+
+    with transaction.atomic():
+        batch = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .filter(status='PENDING', next_attempt_at__lte=timezone.now())
+            .select_related('appointment__doctor', 'appointment__patient')
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+
+        emails, deliverable = [], []
+        errors: dict[int, Exception] = {}
+        for message in batch:
+            try:
+                emails.append(_build_message(message))
+                deliverable.append(message)
+            except Exception as e:
+                errors[message.pk] = e
+
+        # Листи з однаковим шаблоном транспорт надсилає одним запитом
+        for message, error in zip(deliverable, get_mail_transport().send_batch(emails)):
+            if error is not None:
+                errors[message.pk] = error
+
+        sent = failed = 0
+        for message in batch:
+            message.attempts += 1
+            error = errors.get(message.pk)
+            if error is not None:
+                failed += 1
+                message.last_error = str(error)[:MAX_ERROR_LENGTH]
+                if message.attempts >= max_attempts:
+                    message.status = 'FAILED'
+                else:
+                    message.next_attempt_at = timezone.now() + retry_delay(message.attempts)
+            else:
+                sent += 1
+                message.status = 'SENT'
+                message.sent_at = timezone.now()
+
+        EmailOutbox.objects.bulk_update(batch, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
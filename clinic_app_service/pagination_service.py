@@ -0,0 +1,152 @@
+import base64
+import binascii
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from functools import reduce
+from typing import Optional
+
+from django.db.models import Q, QuerySet
+
+CURSOR_NEXT = 'next'
+CURSOR_PREV = 'prev'
+
+
+class InvalidCursorError(ValueError):
+    pass
+
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    raise TypeError(f"Unsupported cursor value type: {type(value).__name__}")
+
+
+def encode_cursor(values: list, direction: str) -> str:
+    raw = json.dumps({'v': values, 'd': direction}, default=_encode_value, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str, fields_count: int) -> Optional[tuple[list, str]]:
+    """
+    Порожній курсор означає першу сторінку (None).
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        values = data['v']
+        direction = data['d']
+    except (binascii.Error, UnicodeDecodeError, ValueError, KeyError, TypeError):
+        raise InvalidCursorError("Invalid cursor.")
+
+    if not isinstance(values, list) or len(values) != fields_count \
+            or direction not in (CURSOR_NEXT, CURSOR_PREV):
+        raise InvalidCursorError("Invalid cursor.")
+
+    return values, direction
+
+
+def _read_value(obj, field: str):
+    value = obj
+    for part in field.split('__'):
+        if value is None:
+            return None
+        value = getattr(value, part)
+    return value
+
+
+def _split_order(order_field: str) -> tuple[str, bool]:
+    if order_field.startswith('-'):
+        return order_field[1:], True
+    return order_field, False
+
+
+def _after_condition(field: str, descending: bool, value) -> Optional[Q]:
+    """
+    Умова "строго після value" з урахуванням порядку NULL у PostgreSQL:
+    ASC - NULL в кінці, DESC - NULL на початку.
+    """
+    if descending:
+        if value is None:
+            return Q(**{f'{field}__isnull': False})
+        return Q(**{f'{field}__lt': value})
+
+    if value is None:
+        return None
+    return Q(**{f'{field}__gt': value}) | Q(**{f'{field}__isnull': True})
+
+
+def _equal_condition(field: str, value) -> Q:
+    if value is None:
+        return Q(**{f'{field}__isnull': True})
+    return Q(**{field: value})
+
+
+def _keyset_filter(order_fields: list[str], values: list) -> Q:
+    conditions = []
+    for i, order_field in enumerate(order_fields):
+        field, descending = _split_order(order_field)
+        after = _after_condition(field, descending, values[i])
+        if after is None:
+            continue
+
+        prefix = [_equal_condition(_split_order(f)[0], values[j]) for j, f in enumerate(order_fields[:i])]
+        conditions.append(reduce(lambda acc, cond: acc & cond, prefix, after))
+
+    if not conditions:
+        return Q(pk__in=[])
+    return reduce(lambda acc, cond: acc | cond, conditions)
+
+
+def _reverse_order(order_fields: list[str]) -> list[str]:
+    return [f[1:] if f.startswith('-') else f'-{f}' for f in order_fields]
+
+
+def paginate_by_cursor(queryset: QuerySet, order_fields: list[str], cursor: Optional[str], per_page: int):
+    """
+    Keyset-пагінація: вартість сторінки не залежить від того, наскільки далеко прогорнуто реєстр.
+    Останнє поле order_fields має бути унікальним (зазвичай 'id').
+
+    Повертає (елементи сторінки, nextCursor, prevCursor).
+    """
+    decoded = decode_cursor(cursor, len(order_fields))
+
+    if decoded is None:
+        values, direction = None, CURSOR_NEXT
+    else:
+        values, direction = decoded
+
+    if direction == CURSOR_NEXT:
+        qs = queryset.order_by(*order_fields)
+        if values is not None:
+            qs = qs.filter(_keyset_filter(order_fields, values))
+    else:
+        reversed_fields = _reverse_order(order_fields)
+        qs = queryset.order_by(*reversed_fields).filter(_keyset_filter(reversed_fields, values))
+
+    items = list(qs[:per_page + 1])
+    has_more = len(items) > per_page
+    items = items[:per_page]
+
+    if direction == CURSOR_PREV:
+        items.reverse()
+
+    def cursor_for(obj, cursor_direction):
+        return encode_cursor([_read_value(obj, _split_order(f)[0]) for f in order_fields], cursor_direction)
+
+    next_cursor = None
+    prev_cursor = None
+    if items:
+        if direction == CURSOR_NEXT:
+            next_cursor = cursor_for(items[-1], CURSOR_NEXT) if has_more else None
+            prev_cursor = cursor_for(items[0], CURSOR_PREV) if values is not None else None
+        else:
+            prev_cursor = cursor_for(items[0], CURSOR_PREV) if has_more else None
+            next_cursor = cursor_for(items[-1], CURSOR_NEXT)
+
+    return items, next_cursor, prev_cursor
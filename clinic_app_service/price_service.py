@@ -0,0 +1,109 @@
+import threading
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+from django.conf import settings
+from django.db.models import F
+
+from .models import PriceList, PriceListEntry
+
+
+@dataclass(frozen=True)
+class PricedService:
+    entry_id: int
+    service_id: int
+    price: Decimal
+    slot_minutes: int
+
+
+@dataclass(frozen=True)
+class PriceTable:
+    """
+    Незмінний знімок активного прайс-листа: назва послуги -> позиція прайс-листа.
+    """
+    price_list_id: int
+    version: int
+    entries: Mapping[str, PricedService]
+
+    def price_of(self, service_name: str) -> Optional[Decimal]:
+        entry = self.entries.get(service_name)
+        return entry.price if entry else None
+
+
+_lock = threading.Lock()
+_price_table: Optional[PriceTable] = None
+_checked_at = 0.0
+
+
+def _active_price_list_stamp() -> Optional[tuple[int, int]]:
+    return PriceList.objects.filter(status='ACTIVE').order_by('id').values_list('id', 'price_version').first()
+
+
+def _build_price_table(price_list_id: int, version: int) -> PriceTable:
+    rows = PriceListEntry.objects.filter(price_list_id=price_list_id).order_by('id').values_list(
+        'service__service_name', 'id', 'service_id', 'price', 'service__slot_minutes'
+    )
+    entries = {}
+    for service_name, entry_id, service_id, price, slot_minutes in rows:
+        entries.setdefault(service_name, PricedService(entry_id=entry_id, service_id=service_id, price=price,
+                                                       slot_minutes=slot_minutes))
+    return PriceTable(price_list_id=price_list_id, version=version, entries=MappingProxyType(entries))
+
+
+def get_price_table() -> Optional[PriceTable]:
+    """
+    Повертає знімок цін активного прайс-листа або None, якщо активного прайс-листа немає.
+
+    Протягом PRICE_TABLE_CHECK_INTERVAL секунд знімок віддається без звернення до БД;
+    після цього перевіряється лише (id, price_version) активного прайс-листа,
+    а позиції перечитуються тільки якщо штамп змінився.
+    """
+    global _price_table, _checked_at
+
+    with _lock:
+        now = time.monotonic()
+        if _price_table is not None and now - _checked_at < settings.PRICE_TABLE_CHECK_INTERVAL:
+            return _price_table
+
+        stamp = _active_price_list_stamp()
+        if stamp is None:
+            _price_table = None
+            return None
+
+        if _price_table is None or (_price_table.price_list_id, _price_table.version) != stamp:
+            _price_table = _build_price_table(*stamp)
+        _checked_at = now
+        return _price_table
+
+
+def invalidate_price_table():
+    global _price_table
+    with _lock:
+        _price_table = None
+
+
+def bump_price_version(price_list_id: int):
+    PriceList.objects.filter(pk=price_list_id).update(price_version=F('price_version') + 1)
+    invalidate_price_table()
+
+
+BENEFIT_GROUP_DISCOUNTS = {
+    'military': 20,
+    'elderly': 10,
+    'disabled': 5,
+    'staff_family': 40,
+}
+
+
+def to_cents(price: Decimal) -> int:
+    return int((price * 100).to_integral_value())
+
+
+def apply_discount_cents(subtotal_cents: int, discount_percent: int) -> int:
+    """
+    Сума зі знижкою в копійках, округлення до найближчої копійки (половина - вгору).
+    """
+    return (subtotal_cents * (100 - discount_percent) + 50) // 100
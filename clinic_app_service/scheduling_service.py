@@ -0,0 +1,132 @@
+from dataclasses import dataclass
+from datetime import date
+from typing import Optional
+
+from .availability_service import TICKS_PER_DAY, Slot, WeeklySchedule, free_slots
+
+# Межа кроків перебору для одного порогу: кошики невеликі, тож на практиці вона не досягається
+MAX_SEARCH_STEPS = 100_000
+
+
+@dataclass(frozen=True)
+class ScheduledSlot:
+    service_name: str
+    doctor_id: int
+    day: date
+    slot: Slot
+
+
+@dataclass(frozen=True)
+class _Candidate:
+    day_index: int
+    slot: Slot
+    doctor_id: int
+
+    @property
+    def end(self) -> int:
+        return self.day_index * TICKS_PER_DAY + self.slot.start_tick + self.slot.ticks
+
+
+def _assign(candidates: list[list[_Candidate]], limit: int) -> Optional[list[_Candidate]]:
+    """
+    Перебір з поверненням: кожній послузі - слот, що закінчується не пізніше limit,
+    і жодні два прийоми пацієнта не перетинаються в часі (слоти можуть мати різну тривалість).
+    """
+    order = sorted(range(len(candidates)), key=lambda i: len(candidates[i]))
+    occupied: dict[int, int] = {}
+    chosen: list[Optional[_Candidate]] = [None] * len(candidates)
+    steps = 0
+
+    def place(position: int) -> bool:
+        nonlocal steps
+        if position == len(order):
+            return True
+        service_index = order[position]
+        for candidate in candidates[service_index]:
+            if candidate.end > limit:
+                break
+            steps += 1
+            if steps > MAX_SEARCH_STEPS:
+                return False
+            day_mask = occupied.get(candidate.day_index, 0)
+            if day_mask & candidate.slot.mask:
+                continue
+            occupied[candidate.day_index] = day_mask | candidate.slot.mask
+            chosen[service_index] = candidate
+            if place(position + 1):
+                return True
+            occupied[candidate.day_index] = day_mask
+        return False
+
+    return chosen if place(0) else None
+
+
+def _earliest_assignment(candidates: list[list[_Candidate]]) -> Optional[list[_Candidate]]:
+    """
+    Шукає призначення з найранішим завершенням останнього прийому (бінарний пошук за межею).
+    """
+    if any(not options for options in candidates):
+        return None
+    ends = sorted({candidate.end for options in candidates for candidate in options})
+    if _assign(candidates, ends[-1]) is None:
+        return None
+
+    low, high = 0, len(ends) - 1
+    while low < high:
+        middle = (low + high) // 2
+        if _assign(candidates, ends[middle]) is not None:
+            high = middle
+        else:
+            low = middle + 1
+    return _assign(candidates, ends[low])
+
+
+def schedule_cart(
+        service_names: list[str],
+        doctors_by_service: dict[str, list[int]],
+        slot_minutes_by_service: dict[str, int],
+        schedules: dict[int, WeeklySchedule],
+        days: list[date],
+        booked_masks: dict[tuple[int, date], int],
+        days_off: set[tuple[int, date]],
+        blocked_masks: dict[date, int],
+        same_day: bool = False
+) -> Optional[list[ScheduledSlot]]:
+    """
+    Підбирає для кошика найраніший набір прийомів, що не перетинаються.
+
+    booked_masks - зайняті тіки лікарів (doctor_id, день) -> маска; days_off - вихідні лікарів;
+    blocked_masks - тіки дня, недоступні пацієнтові (вже минули або пацієнт уже записаний).
+    Якщо same_day, усі прийоми мають бути в один день (обирається найраніший такий день).
+    """
+    def options_for(service_name: str, day_indexes: range) -> list[_Candidate]:
+        # Для пацієнта важливий лише час, тож однаковий слот кількох лікарів лишаємо один раз
+        options = {}
+        for doctor_id in doctors_by_service.get(service_name, []):
+            for day_index in day_indexes:
+                day = days[day_index]
+                if (doctor_id, day) in days_off:
+                    continue
+                blocked = booked_masks.get((doctor_id, day), 0) | blocked_masks.get(day, 0)
+                for slot in free_slots(schedules[doctor_id], slot_minutes_by_service[service_name], day, blocked):
+                    options.setdefault((day_index, slot), _Candidate(day_index, slot, doctor_id))
+        return sorted(options.values(), key=lambda candidate: (candidate.end, candidate.slot.start_tick))
+
+    def to_slots(assignment: list[_Candidate]) -> list[ScheduledSlot]:
+        slots = [
+            ScheduledSlot(service_names[i], candidate.doctor_id, days[candidate.day_index], candidate.slot)
+            for i, candidate in enumerate(assignment)
+        ]
+        return sorted(slots, key=lambda slot: (slot.day, slot.slot.start_tick))
+
+    if same_day:
+        for day_index in range(len(days)):
+            assignment = _earliest_assignment(
+                [options_for(name, range(day_index, day_index + 1)) for name in service_names]
+            )
+            if assignment is not None:
+                return to_slots(assignment)
+        return None
+
+    assignment = _earliest_assignment([options_for(name, range(len(days))) for name in service_names])
+    return to_slots(assignment) if assignment is not None else None
@@ -0,0 +1,43 @@
+import re
+from typing import Optional
+
+from django.contrib.postgres.search import SearchQuery
+
+PHONE_PATTERN = re.compile(r'^[\d\s()+-]+$')
+# Усе, крім літер, цифр і крапки, розділяє слова (апострофи, '_', '-', '+'), як і парсер 'simple';
+# крапку парсер лишає всередині email і доменів ('ivan.petrenko', 'example.com')
+SEPARATOR_PATTERN = re.compile(r'[^\w.]|_')
+
+
+def normalize_search_tokens(search_phrase: str) -> list[str]:
+    """
+    Розбиває пошукову фразу на токени у тій самій формі, в якій вони зберігаються
+    у Patient.search_vector: телефон - лише цифри, email - без "@", решта - слова у нижньому регістрі,
+    розділені так само, як їх розділяє парсер 'simple'.
+    """
+    phrase = search_phrase.strip()
+    if not phrase:
+        return []
+
+    if PHONE_PATTERN.match(phrase):
+        digits = re.sub(r'\D', '', phrase)
+        return [digits] if digits else []
+
+    tokens = []
+    for raw_token in SEPARATOR_PATTERN.sub(' ', phrase.lower()).split():
+        token = raw_token.strip('.')
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def build_patient_search_query(search_phrase: str) -> Optional[SearchQuery]:
+    """
+    Кожен токен шукається як префікс (token:*), усі токени мають збігтися.
+    """
+    tokens = normalize_search_tokens(search_phrase)
+    if not tokens:
+        return None
+
+    raw_query = ' & '.join(f"'{token}':*" for token in tokens)
+    return SearchQuery(raw_query, search_type='raw', config='simple')
@@ -0,0 +1,37 @@
+from django.db.models import F
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .availability_service import invalidate_weekly_schedules
+from .models import DoctorBreak, DoctorWorkingHours, PriceList, PriceListEntry, Service, User
+from .price_service import bump_price_version, invalidate_price_table
+
+
+@receiver(post_save, sender=PriceListEntry)
+@receiver(post_delete, sender=PriceListEntry)
+def price_list_entry_changed(sender, instance, **kwargs):
+    bump_price_version(instance.price_list_id)
+
+
+@receiver(post_save, sender=Service)
+def service_changed(sender, instance, created, **kwargs):
+    # Знімок цін ключується назвою послуги, тож перейменування змінює активні ціни
+    if not created:
+        for price_list_id in PriceList.objects.filter(status='ACTIVE').values_list('id', flat=True):
+            bump_price_version(price_list_id)
+
+
+@receiver(post_save, sender=PriceList)
+@receiver(post_delete, sender=PriceList)
+def price_list_changed(sender, instance, **kwargs):
+    invalidate_price_table()
+
+
+@receiver(post_save, sender=DoctorWorkingHours)
+@receiver(post_delete, sender=DoctorWorkingHours)
+@receiver(post_save, sender=DoctorBreak)
+@receiver(post_delete, sender=DoctorBreak)
+def doctor_schedule_changed(sender, instance, **kwargs):
+    # Нова версія графіка змушує всі воркери перекомпілювати шаблон слотів лікаря
+    User.objects.filter(pk=instance.doctor_id).update(schedule_version=F('schedule_version') + 1)
+    invalidate_weekly_schedules(instance.doctor_id)
@@ -0,0 +1,318 @@
+import hashlib
+import time
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from django.db.models import DateField, Sum
+from django.db.models.functions import Trunc
+
+from .availability_service import local_day_bounds
+from .models import Appointment, DailyDoctorStats, Invoice, PriceListEntry
+
+STATS_GRANULARITIES = ('day', 'week', 'month')
+DEFAULT_STATS_DAYS = 7
+MAX_STATS_DAYS = 5 * 366
+
+# Канал LISTEN/NOTIFY, у який пишуть переходи статусів прийомів (див. notify_stats_changed)
+STATS_CHANNEL = 'clinic_stats_changed'
+STATS_VERSION_KEY = 'stats:version'
+
+# Виручка прийому: ціна з прайс-листа зі знижкою рахунку, у Decimal без округлення
+APPOINTMENT_REVENUE_SQL = "e.price * (100 - COALESCE(i.discount_percent, 0)) / 100"
+
+
+def _rollup_select(where: str) -> str:
+    appointment_table = Appointment._meta.db_table
+    entry_table = PriceListEntry._meta.db_table
+    invoice_table = Invoice._meta.db_table
+    return (
+        f"SELECT a.doctor_id, e.service_id, (a.completion_date AT TIME ZONE %s)::date, "
+        f"%s * COUNT(*), %s * SUM({APPOINTMENT_REVENUE_SQL}) "
+        f"FROM {appointment_table} AS a "
+        f"JOIN {entry_table} AS e ON e.id = a.price_list_entry_id "
+        f"JOIN {invoice_table} AS i ON i.id = a.invoice_id "
+        f"WHERE a.completion_date IS NOT NULL AND {where} "
+        f"GROUP BY 1, 2, 3"
+    )
+
+
+def stats_cache():
+    return caches[settings.STATS_CACHE_ALIAS]
+
+
+def stats_version() -> int:
+    """
+    Поточна версія статистики; входить у ключі кешованих відповідей stats/*.
+    """
+    version = stats_cache().get(STATS_VERSION_KEY)
+    if version is None:
+        # Після втрати ключа нова версія не збігається з жодною попередньою
+        stats_cache().add(STATS_VERSION_KEY, time.time_ns(), None)
+        version = stats_cache().get(STATS_VERSION_KEY, 0)
+    return version
+
+
+def bump_stats_version():
+    try:
+        stats_cache().incr(STATS_VERSION_KEY)
+    except ValueError:
+        stats_cache().add(STATS_VERSION_KEY, time.time_ns(), None)
+
+
+def stats_cache_key(endpoint: str, params: Iterable[tuple[str, list[str]]], today: date) -> str:
+    query = '&'.join(f"{name}={','.join(values)}" for name, values in sorted(params))
+    digest = hashlib.sha1(f"{endpoint}?{query}@{today.isoformat()}".encode()).hexdigest()
+    return f"stats:{stats_version()}:{digest}"
+
+
+def notify_stats_changed():
+    """
+    Сповіщає слухачів каналу STATS_CHANNEL і після коміту змінює версію кешу статистики.
+    Обидва спрацьовують лише після коміту транзакції переходу статусу, тож відповідь,
+    порахована за незакоміченими даними, не потрапить у кеш під новою версією.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_notify(%s, '')", [STATS_CHANNEL])
+    transaction.on_commit(bump_stats_version)
+
+
+def apply_daily_stats(appointment_ids: Iterable[int], sign: int):
+    """
+    Додає (sign=1) або віднімає (sign=-1) прийоми з денного підсумку одним INSERT ... ON CONFLICT.
+    День береться з поточної completion_date, тож при скасуванні викликається до зміни прийому.
+    """
+    appointment_ids = list(appointment_ids)
+    if not appointment_ids:
+        return
+    table = DailyDoctorStats._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"INSERT INTO {table} (doctor_id, service_id, day, completed_count, revenue) "
+            f"{_rollup_select('a.id = ANY(%s)')} "
+            f"ON CONFLICT (doctor_id, service_id, day) DO UPDATE SET "
+            f"completed_count = {table}.completed_count + EXCLUDED.completed_count, "
+            f"revenue = {table}.revenue + EXCLUDED.revenue",
+            [settings.CLINIC_TIME_ZONE, sign, sign, appointment_ids]
+        )
+
+
+def fill_daily_doctor_stats(cursor, date_from: Optional[date] = None, date_to: Optional[date] = None) -> int:
+    """
+    Записує денний підсумок завершених прийомів (за весь час або за дні клініки date_from..date_to
+    включно) у таблицю, де цих днів ще немає. Використовується також міграцією, що створює таблицю.
+    """
+    table = DailyDoctorStats._meta.db_table
+    local_day = "(a.completion_date AT TIME ZONE %s)::date"
+    conditions, params = ["a.execution_status = 'COMPLETED'"], []
+    if date_from:
+        conditions.append(f"{local_day} >= %s")
+        params += [settings.CLINIC_TIME_ZONE, date_from]
+    if date_to:
+        conditions.append(f"{local_day} <= %s")
+        params += [settings.CLINIC_TIME_ZONE, date_to]
+
+    cursor.execute(
+        f"INSERT INTO {table} (doctor_id, service_id, day, completed_count, revenue) "
+        f"{_rollup_select(' AND '.join(conditions))}",
+        [settings.CLINIC_TIME_ZONE, 1, 1, *params]
+    )
+    return cursor.rowcount
+
+
+def rebuild_daily_doctor_stats(date_from: Optional[date] = None, date_to: Optional[date] = None) -> int:
+    """
+    Перераховує денний підсумок з історії завершених прийомів (за весь час або за дні клініки
+    date_from..date_to включно). Повертає кількість записаних рядків.
+    """
+    stale = DailyDoctorStats.objects.all()
+    if date_from:
+        stale = stale.filter(day__gte=date_from)
+    if date_to:
+        stale = stale.filter(day__lte=date_to)
+
+    with transaction.atomic():
+        stale.delete()
+        with connection.cursor() as cursor:
+            rows_count = fill_daily_doctor_stats(cursor, date_from, date_to)
+        notify_stats_changed()
+    return rows_count
+
+
+def parse_stats_range(from_str: Optional[str], to_str: Optional[str], granularity: Optional[str],
+                      today: date) -> tuple[date, date, str]:
+    """
+    Дні клініки from..to включно (типово - останні 7 днів до today) і крок групування.
+    ValueError з описом, якщо параметри некоректні.
+    """
+    granularity = granularity or 'day'
+    if granularity not in STATS_GRANULARITIES:
+        raise ValueError(f"'granularity' must be one of: {', '.join(STATS_GRANULARITIES)}.")
+    try:
+        end = datetime.strptime(to_str, "%Y-%m-%d").date() if to_str else today
+        start = (datetime.strptime(from_str, "%Y-%m-%d").date() if from_str
+                 else end - timedelta(days=DEFAULT_STATS_DAYS - 1))
+    except ValueError:
+        raise ValueError("Invalid 'from' or 'to' date format. Use YYYY-MM-DD.")
+    if start > end:
+        raise ValueError("'from' must not be after 'to'.")
+    if (end - start).days >= MAX_STATS_DAYS:
+        raise ValueError(f"Range must not exceed {MAX_STATS_DAYS} days.")
+    return start, end, granularity
+
+
+def period_start(day: date, granularity: str) -> date:
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def stats_periods(start: date, end: date, granularity: str) -> list[date]:
+    """
+    Початки періодів (день, тиждень з понеділка або місяць), що покривають start..end.
+    """
+    periods = []
+    current = period_start(start, granularity)
+    while current <= end:
+        periods.append(current)
+        if granularity == 'month':
+            current = (current.replace(day=28) + timedelta(days=4)).replace(day=1)
+        else:
+            current += timedelta(days=7 if granularity == 'week' else 1)
+    return periods
+
+
+def period_label(period: date, granularity: str) -> str:
+    return period.strftime('%m.%Y' if granularity == 'month' else '%d.%m')
+
+
+def revenue_amount(revenue: Decimal) -> float:
+    return float(revenue.quantize(Decimal('0.01')))
+
+
+def _period_rows(start: date, end: date, granularity: str, group_fields=(), **filters):
+    qs = DailyDoctorStats.objects.filter(day__gte=start, day__lte=end, **filters)
+    if granularity != 'day':
+        qs = qs.annotate(period=Trunc('day', granularity, output_field=DateField()))
+    period_field = 'day' if granularity == 'day' else 'period'
+    rows = qs.order_by().values(*group_fields, period_field).annotate(
+        count=Sum('completed_count'), revenue=Sum('revenue')
+    )
+    return rows, period_field
+
+
+def stats_totals(start: date, end: date, granularity: str = 'day',
+                 doctor_id: Optional[int] = None) -> dict[date, dict]:
+    """
+    Кількість і виручка за періодами в межах днів start..end включно (усіх лікарів або одного):
+    один GROUP BY по денному підсумку, суми в Decimal без округлення.
+    """
+    filters = {} if doctor_id is None else {'doctor_id': doctor_id}
+    rows, period_field = _period_rows(start, end, granularity, **filters)
+    return {
+        row[period_field]: {'count': row['count'], 'revenue': row['revenue'] or Decimal(0)}
+        for row in rows
+    }
+
+
+def doctor_stats_totals(start: date, end: date, granularity: str = 'day') -> dict[tuple[int, date], dict]:
+    """
+    Те саме для всіх лікарів одразу: ключ (doctor_id, початок періоду), один GROUP BY.
+    """
+    rows, period_field = _period_rows(start, end, granularity, ['doctor'])
+    return {
+        (row['doctor'], row[period_field]): {'count': row['count'], 'revenue': row['revenue'] or Decimal(0)}
+        for row in rows
+    }
+
+
+def parse_day_minutes(value: str) -> int:
+    """
+    'HH:MM' (від 00:00 до 24:00) у хвилини від початку дня.
+    """
+    hours, minutes = value.split(':')
+    total = int(hours) * 60 + int(minutes)
+    if len(minutes) != 2 or not 0 <= int(minutes) < 60 or not 0 <= total <= 24 * 60:
+        raise ValueError(value)
+    return total
+
+
+def parse_cumulate_params(start_str: Optional[str], end_str: Optional[str],
+                          bucket_str: Optional[str]) -> tuple[int, int, int]:
+    """
+    Межі дня (хвилини від півночі за часом клініки) і крок гістограми в хвилинах.
+    ValueError з описом, якщо параметри некоректні.
+    """
+    try:
+        start = parse_day_minutes(start_str or settings.CLINIC_STATS_DAY_START)
+        end = parse_day_minutes(end_str or settings.CLINIC_STATS_DAY_END)
+    except ValueError:
+        raise ValueError("Invalid 'start' or 'end' time. Use HH:MM.")
+    try:
+        bucket = int(bucket_str) if bucket_str else 60
+    except ValueError:
+        raise ValueError("'bucket' must be a number of minutes.")
+    if start >= end:
+        raise ValueError("'start' must be before 'end'.")
+    if bucket < 5 or bucket % 5 or bucket > end - start:
+        raise ValueError("'bucket' must be a multiple of 5 minutes and fit between 'start' and 'end'.")
+    return start, end, bucket
+
+
+def cumulative_completions(cursor, day: date, start: int, end: int, bucket: int) -> list[dict]:
+    """
+    Скільки прийомів завершено за день клініки до кожної позначки start, start+bucket, ... <= end
+    (хвилини від півночі за місцевим часом). Гістограма за кроками рахується одним GROUP BY.
+    """
+    day_start, day_end = local_day_bounds(day)
+    cursor.execute(
+        f"SELECT GREATEST(FLOOR((EXTRACT(EPOCH FROM (completion_date AT TIME ZONE %s)::time) / 60 - %s) / %s), -1)::int, "
+        f"COUNT(*) FROM {Appointment._meta.db_table} "
+        f"WHERE execution_status = 'COMPLETED' AND completion_date >= %s AND completion_date < %s "
+        f"GROUP BY 1",
+        [settings.CLINIC_TIME_ZONE, start, bucket, day_start, day_end]
+    )
+    histogram = dict(cursor.fetchall())
+
+    entries = []
+    running_total = histogram.get(-1, 0)
+    for index, cutoff in enumerate(range(start, end + 1, bucket)):
+        if index:
+            running_total += histogram.get(index - 1, 0)
+        entries.append({
+            'hour': f"{cutoff // 60:02d}:{cutoff % 60:02d}",
+            'count': running_total
+        })
+    return entries
+
+
+def stats_change_feed(heartbeat: float, duration: float):
+    """
+    Окреме з'єднання з LISTEN на STATS_CHANNEL. Видає (курсор цього з'єднання, чи були зміни):
+    одразу, після кожного сповіщення (пачка сповіщень об'єднується) і після heartbeat секунд тиші.
+    Через duration секунд ітерація завершується; з'єднання закривається і тоді, коли споживач
+    припиняє ітерацію раніше.
+    """
+    deadline = time.monotonic() + duration
+    listener = connection.get_new_connection(connection.get_connection_params())
+    try:
+        listener.autocommit = True
+        listener.execute(f"LISTEN {STATS_CHANNEL}")
+        changed = True
+        while True:
+            with listener.cursor() as cursor:
+                yield cursor, changed
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            changed = any(True for _ in listener.notifies(timeout=min(heartbeat, remaining), stop_after=1))
+            if changed:
+                for _ in listener.notifies(timeout=0):
+                    pass
+    finally:
+        listener.close()
@@ -1,3 +1,1342 @@
-from django.test import TestCase
+import base64
+import importlib
+import json
+import time as time_module
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from concurrent.futures import ThreadPoolExecutor
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .appointment_service import rebuild_service_usage_counters
+from .availability_service import CLINIC_TZ, invalidate_weekly_schedules
+from .count_service import estimate_table_rows
+from .mail_service import MailDeliveryError, MailTransport, MemoryTransport, SendGridTransport, \
+    build_appointment_notification, get_mail_transport, reset_mail_transport
+from .outbox_service import drain_outbox
+from .models import Patient, Service, User, PriceList, PriceListEntry, Invoice, Appointment, \
+    DoctorWorkingHours, DoctorBreak, DoctorDayOff, EmailOutbox, Verification, ServiceUsageCounter, DailyDoctorStats
+from .price_service import invalidate_price_table
+from .views import MyRefreshToken
+
+
+def create_patient(**kwargs):
+    defaults = {
+        'first_name': 'Іван',
+        'last_name': 'Петренко',
+        'middle_name': 'Олегович',
+        'phone_number': '+380501234567',
+        'email': 'patient@example.com',
+        'birth_date': date(1990, 1, 1),
+        'gender': 'MALE',
+    }
+    defaults.update(kwargs)
+    return Patient.objects.create(**defaults)
+
+
+def create_doctor(**kwargs):
+    defaults = {
+        'first_name': 'Олена',
+        'last_name': 'Коваль',
+        'email': 'doctor@example.com',
+        'user_type': 'DOCTOR',
+        'password_hash': '-',
+        'qualification': 'Терапевт',
+    }
+    defaults.update(kwargs)
+    return User.objects.create(**defaults)
+
+
+def auth_header(user):
+    return {'HTTP_AUTHORIZATION': f"Bearer {MyRefreshToken.for_user(user).access_token}"}
+
+
+def create_catalog(price_list, size, offset=0):
+    services = Service.objects.bulk_create(
+        Service(service_name=f'Послуга {i:04d}') for i in range(offset, offset + size)
+    )
+    entries = PriceListEntry.objects.bulk_create(
+        PriceListEntry(price_list=price_list, service=service, price=100 + i)
+        for i, service in enumerate(services)
+    )
+    return services, entries
+
+
+class ServiceRegistryTests(TestCase):
+    def setUp(self):
+        self.url = reverse('services-ops')
+        self.price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+
+    def test_registry_returns_active_price_and_completed_count(self):
+        services, entries = create_catalog(self.price_list, 2)
+        patient = create_patient()
+        doctor = create_doctor()
+        invoice = Invoice.objects.create(subtotal=100, total=100)
+        started = timezone.now() - timedelta(hours=1)
+        Appointment.objects.bulk_create([
+            Appointment(patient=patient, doctor=doctor, price_list_entry=entries[0], invoice=invoice,
+                        execution_status=execution_status, appointment_date=started - timedelta(hours=i))
+            for i, execution_status in enumerate(('COMPLETED', 'COMPLETED', 'PLANNED', 'CANCELED'))
+        ])
+        rebuild_service_usage_counters()
+
+        response = self.client.get(self.url, {'q': 10})
+
+        entries_by_id = {entry['id']: entry for entry in response.json()['payload']['entries']}
+        self.assertEqual(entries_by_id[services[0].id]['price'], '100.00')
+        self.assertEqual(entries_by_id[services[0].id]['count'], 2)
+        self.assertEqual(entries_by_id[services[1].id]['price'], '101.00')
+        self.assertEqual(entries_by_id[services[1].id]['count'], 0)
+
+    def test_registry_query_count_does_not_grow_with_catalog(self):
+        create_catalog(self.price_list, 5)
+        with CaptureQueriesContext(connection) as small_catalog:
+            self.client.get(self.url, {'q': 50})
+
+        create_catalog(self.price_list, 50, offset=5)
+        with CaptureQueriesContext(connection) as large_catalog:
+            response = self.client.get(self.url, {'q': 50})
+
+        self.assertEqual(len(response.json()['payload']['entries']), 50)
+        self.assertEqual(len(small_catalog), len(large_catalog))
+
+    def test_cursor_page_is_single_query(self):
+        create_catalog(self.price_list, 30)
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'q': 25, 'cursor': ''})
+
+        self.assertEqual(len(response.json()['payload']['entries']), 25)
+
+
+class ServiceUsageCounterTests(TestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, entries = create_catalog(price_list, 1)
+        self.doctor = create_doctor()
+        self.appointment = Appointment.objects.create(
+            patient=create_patient(),
+            doctor=self.doctor,
+            price_list_entry=entries[0],
+            invoice=Invoice.objects.create(subtotal=100, total=100),
+            appointment_date=timezone.now() - timedelta(hours=1)
+        )
+        self.url = reverse('appointments-doctor-operations')
+
+    def completed_count(self):
+        response = self.client.get(reverse('services-ops'))
+        return response.json()['payload']['entries'][0]['count']
+
+    def test_counter_follows_completion_and_cancellation(self):
+        self.client.post(f'{self.url}?id={self.appointment.id}', **auth_header(self.doctor))
+        self.client.post(f'{self.url}?id={self.appointment.id}', **auth_header(self.doctor))
+        self.assertEqual(self.completed_count(), 1)
+
+        self.client.put(f'{self.url}?id={self.appointment.id}', **auth_header(self.doctor))
+        self.assertEqual(self.completed_count(), 0)
+
+    def test_rebuild_recounts_history(self):
+        Appointment.objects.filter(pk=self.appointment.pk).update(execution_status='COMPLETED')
+
+        call_command('rebuild_service_usage_counters', stdout=StringIO())
+
+        self.assertEqual(self.completed_count(), 1)
+
+
+class ActivatePriceListTests(TestCase):
+    def test_activation_carries_forward_latest_prices(self):
+        old_list = PriceList.objects.create(name='Старий', status='ACTIVE')
+        services, _ = create_catalog(old_list, 3)
+        newer_list = PriceList.objects.create(name='Новіший')
+        PriceListEntry.objects.create(price_list=newer_list, service=services[0], price=500)
+        Service.objects.filter(pk=services[2].pk).update(is_service_archived=True)
+
+        target = PriceList.objects.create(name='Новий')
+        PriceListEntry.objects.create(price_list=target, service=services[1], price=999)
+
+        target.refresh_from_db()
+        with self.assertNumQueries(8):
+            response = self.client.post(f"{reverse('active-price-list-ops')}?id={target.id}")
+
+        self.assertEqual(response.json()['payload']['carriedOverEntries'], 1)
+        self.assertEqual(PriceList.objects.get(pk=target.pk).price_version, target.price_version + 1)
+        prices = dict(target.entries.values_list('service_id', 'price'))
+        self.assertEqual(prices, {services[0].id: 500, services[1].id: 999})
+        self.assertEqual(PriceList.objects.get(status='ACTIVE'), target)
+
+
+class PriceListCreationTests(TestCase):
+    def test_bulk_creation_rejects_unknown_services(self):
+        services, _ = create_catalog(PriceList.objects.create(name='Основний'), 2)
+        url = reverse('price-lists-crud')
+
+        response = self.client.post(url, {
+            'name': 'Новий',
+            'entries': [{'serviceId': services[0].id, 'price': 10}, {'serviceId': 0, 'price': 20}]
+        }, content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PriceList.objects.filter(name='Новий').exists())
+
+        with self.assertNumQueries(5):
+            response = self.client.post(url, {
+                'name': 'Новий',
+                'entries': [{'serviceId': service.id, 'price': 10} for service in services]
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(PriceList.objects.get(name='Новий').entries.count(), 2)
+
+    def test_bulk_creation_reports_invalid_entries(self):
+        services, _ = create_catalog(PriceList.objects.create(name='Основний'), 1)
+        service_id = services[0].id
+        url = reverse('price-lists-crud')
+
+        response = self.client.post(url, {
+            'name': 'Новий',
+            'entries': [
+                {'serviceId': service_id, 'price': 10.1},
+                {'serviceId': service_id},
+                {'serviceId': service_id, 'price': None},
+                {'serviceId': service_id, 'price': -5},
+                {'serviceId': service_id, 'price': 'дорого'},
+                {'serviceId': service_id, 'price': '1.005'},
+                {'serviceId': 0, 'price': 20},
+                'not an entry',
+            ]
+        }, content_type='application/json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([error['index'] for error in response.json()['payload']['entries']], [1, 2, 3, 4, 5, 6, 7])
+        self.assertFalse(PriceList.objects.filter(name='Новий').exists())
+
+        response = self.client.post(url, {'name': 'Новий', 'entries': [{'serviceId': service_id, 'price': 10.1}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(PriceList.objects.get(name='Новий').entries.get().price, Decimal('10.10'))
+
+    def test_csv_import_resolves_service_names(self):
+        services, _ = create_catalog(PriceList.objects.create(name='Основний'), 2)
+        csv_file = SimpleUploadedFile('prices.csv', (
+            'name,price\n'
+            f'{services[0].service_name},150.5\n'
+            f'{services[1].service_name},"200,00"\n'
+        ).encode())
+
+        response = self.client.post(f"{reverse('price-list-csv-import')}?name=CSV", {'file': csv_file})
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['payload']['importedEntries'], 2)
+        prices = dict(PriceList.objects.get(name='CSV').entries.values_list('service_id', 'price'))
+        self.assertEqual(prices, {services[0].id: Decimal('150.50'), services[1].id: Decimal('200.00')})
+
+    def test_csv_import_rolls_back_on_unknown_service(self):
+        csv_file = SimpleUploadedFile('prices.csv', 'Невідома послуга,100\n'.encode())
+
+        response = self.client.post(f"{reverse('price-list-csv-import')}?name=CSV", {'file': csv_file})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(PriceList.objects.filter(name='CSV').exists())
+
+    def test_csv_import_rejects_invalid_prices_and_malformed_files(self):
+        services, _ = create_catalog(PriceList.objects.create(name='Основний'), 1)
+        url = f"{reverse('price-list-csv-import')}?name=CSV"
+
+        for raw_price in ('NaN', 'Infinity', '1234567890123', '10.005', '0', 'дорого', ''):
+            with self.subTest(raw_price=raw_price):
+                csv_file = SimpleUploadedFile('prices.csv', f'{services[0].service_name},{raw_price}\n'.encode())
+                response = self.client.post(url, {'file': csv_file})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('row 1', response.json()['payload']['detail'])
+
+        oversized = SimpleUploadedFile('prices.csv', f"{services[0].service_name},{'1' * 200000}\n".encode())
+        response = self.client.post(url, {'file': oversized})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Malformed CSV', response.json()['payload']['detail'])
+        self.assertFalse(PriceList.objects.filter(name='CSV').exists())
+
+
+class PriceTableTests(TestCase):
+    def setUp(self):
+        invalidate_price_table()
+        self.price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, self.entries = create_catalog(self.price_list, 2)
+        self.url = reverse('cart-calculation-view')
+        self.body = {'services': [service.service_name for service in self.services]}
+
+    def prices(self):
+        response = self.client.post(self.url, self.body, content_type='application/json')
+        return [item['price'] for item in response.json()['payload']['prices']]
+
+    def test_cart_is_priced_from_snapshot_without_queries(self):
+        self.assertEqual(self.prices(), [100.0, 101.0])
+
+        with self.assertNumQueries(0):
+            self.assertEqual(self.prices(), [100.0, 101.0])
+
+    def test_snapshot_is_rebuilt_after_entry_change_and_activation(self):
+        self.prices()
+
+        entry = self.entries[0]
+        entry.price = 150
+        entry.save()
+        self.assertEqual(self.prices(), [150.0, 101.0])
+
+        new_list = PriceList.objects.create(name='Новий')
+        PriceListEntry.objects.create(price_list=new_list, service=self.services[1], price=300)
+        self.client.post(f"{reverse('active-price-list-ops')}?id={new_list.id}")
+        self.assertEqual(self.prices(), [150.0, 300.0])
+
+    @override_settings(PRICE_TABLE_CHECK_INTERVAL=0)
+    def test_carry_forward_into_active_list_refreshes_snapshot(self):
+        active = PriceList.objects.create(name='Активний', status='ACTIVE')
+        PriceListEntry.objects.create(price_list=active, service=self.services[0], price=200)
+        PriceList.objects.filter(pk=self.price_list.pk).update(status='INACTIVE')
+        self.body = {'services': [self.services[0].service_name]}
+        self.assertEqual(self.prices(), [200.0])
+
+        # Повторна активація переносить відсутню послугу. Знімок в іншому воркері не скидається сигналами
+        # цього процесу й бачить лише штамп (id, price_version)
+        with mock.patch('clinic_app_service.signals.invalidate_price_table'), \
+                mock.patch('clinic_app_service.price_service.invalidate_price_table'):
+            self.client.post(f"{reverse('active-price-list-ops')}?id={active.id}")
+
+        self.body = {'services': [service.service_name for service in self.services]}
+        self.assertEqual(self.prices(), [200.0, 101.0])
+
+
+class BatchQuoteTests(TestCase):
+    def setUp(self):
+        invalidate_price_table()
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, entries = create_catalog(price_list, 2)
+        PriceListEntry.objects.filter(pk=entries[0].pk).update(price=Decimal('10.05'))
+        PriceListEntry.objects.filter(pk=entries[1].pk).update(price=Decimal('0.10'))
+        self.url = reverse('calculate-totals-batch-view')
+
+    def test_quotes_many_carts_in_exact_cents(self):
+        regular = create_patient()
+        military = create_patient(phone_number='+380500000002', email='m@example.com', benefit_group='military')
+        names = [service.service_name for service in self.services]
+
+        with self.assertNumQueries(3):
+            response = self.client.post(self.url, {'carts': [
+                {'patientId': regular.id, 'services': names},
+                {'patientId': military.id, 'services': names + ['Невідома']},
+            ]}, content_type='application/json')
+
+        quotes = response.json()['payload']['quotes']
+        self.assertEqual(quotes[0], {'patientId': regular.id, 'subtotal': 10.15, 'discount': 0.0,
+                                     'total': 10.15, 'unknownServices': []})
+        self.assertEqual(quotes[1]['total'], 8.12)
+        self.assertEqual(quotes[1]['unknownServices'], ['Невідома'])
+
+    def test_single_cart_endpoint_agrees_with_batch(self):
+        # 10.15 * 0.9 = 9.135: у float це 9.13, з округленням копійок половина вгору - 9.14
+        elderly = create_patient(phone_number='+380500000003', email='e@example.com', benefit_group='elderly')
+        names = [service.service_name for service in self.services] + ['Невідома']
+
+        single = self.client.post(f"{reverse('calculate-totals-view')}?patientId={elderly.id}",
+                                  {'services': names}, content_type='application/json').json()['payload']
+        batch = self.client.post(self.url, {'carts': [{'patientId': elderly.id, 'services': names}]},
+                                 content_type='application/json').json()['payload']['quotes'][0]
+
+        self.assertEqual(single, {key: batch[key] for key in ('subtotal', 'discount', 'total')})
+        self.assertEqual(single['total'], 9.14)
+
+    def test_unknown_patient_is_rejected(self):
+        response = self.client.post(self.url, {'carts': [{'patientId': 999999, 'services': []}]},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 404)
+
+
+class AvailabilityTests(TestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, self.entries = create_catalog(price_list, 1)
+        self.doctor = create_doctor()
+        self.doctor.services.set(self.services)
+        self.other_doctor = create_doctor(email='other@example.com', last_name='Яковенко')
+        self.other_doctor.services.set(self.services)
+        self.patient = create_patient()
+        self.invoice = Invoice.objects.create(subtotal=100, total=100)
+        # Найближчий понеділок, щонайменше через тиждень
+        today = timezone.localdate()
+        self.monday = today + timedelta(days=7 + (7 - today.weekday()) % 7)
+        invalidate_weekly_schedules()
+
+    def book(self, doctor, day, hour, minute=0, execution_status='PLANNED', patient=None):
+        return Appointment.objects.create(
+            patient=patient or self.patient, doctor=doctor, price_list_entry=self.entries[0], invoice=self.invoice,
+            execution_status=execution_status,
+            appointment_date=CLINIC_TZ.localize(datetime.combine(day, time(hour, minute)))
+        )
+
+    def test_available_times_excludes_booked_slots(self):
+        self.book(self.doctor, self.monday, 9)
+        self.book(self.doctor, self.monday, 10, 30, execution_status='CANCELED')
+        self.book(self.doctor, self.monday - timedelta(days=1), 11)
+
+        response = self.client.get(reverse('available-times-view'),
+                                   {'doctorId': self.doctor.id, 'date': self.monday.isoformat()})
+
+        entries = response.json()['payload']['entries']
+        self.assertEqual(len(entries), 17)
+        self.assertEqual(entries[0], '09:30 - 10:00')
+        self.assertIn('10:30 - 11:00', entries)
+
+    def test_grid_loads_all_doctors_and_days_in_fixed_queries(self):
+        for hour in range(9, 18):
+            self.book(self.doctor, self.monday, hour)
+            self.book(self.doctor, self.monday, hour, 30)
+        self.book(self.other_doctor, self.monday, 9)
+
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('availability-grid-view'), {
+                'service': self.services[0].service_name,
+                'from': (self.monday - timedelta(days=2)).isoformat(),
+                'to': (self.monday + timedelta(days=4)).isoformat(),
+            })
+
+        payload = response.json()['payload']
+        self.assertEqual(len(payload['days']), 7)
+        doctors = {doc['id']: doc['availability'] for doc in payload['doctors']}
+        self.assertFalse(any(doctors[self.doctor.id][0]))
+        self.assertFalse(any(doctors[self.doctor.id][2]))
+        self.assertEqual(len(doctors[self.doctor.id][3]), 18)
+        self.assertEqual(payload['firstAvailable'], {
+            'doctorId': self.other_doctor.id, 'date': self.monday.isoformat(), 'time': '09:30 - 10:00'
+        })
+
+    def test_cart_scheduler_finds_earliest_non_overlapping_slots(self):
+        second_service = Service.objects.create(service_name='Друга послуга')
+        self.doctor.services.add(second_service)
+        self.other_doctor.services.set([second_service])
+        # Перший лікар зайнятий до 10:00, другий - о 10:00; сам пацієнт уже записаний на 10:30
+        someone_else = create_patient(phone_number='+380500000002', email='else@example.com')
+        self.book(self.doctor, self.monday, 9, patient=someone_else)
+        self.book(self.doctor, self.monday, 9, 30, patient=someone_else)
+        self.book(self.other_doctor, self.monday, 10, patient=someone_else)
+        self.book(self.other_doctor, self.monday, 10, 30, execution_status='CANCELED', patient=someone_else)
+        self.book(create_doctor(email='third@example.com'), self.monday, 10, 30)
+
+        with self.assertNumQueries(7):
+            response = self.client.post(
+                f"{reverse('cart-schedule-view')}?patientId={self.patient.id}",
+                {'services': [self.services[0].service_name, 'Друга послуга'],
+                 'from': self.monday.isoformat(), 'days': 5},
+                content_type='application/json'
+            )
+
+        appointments = response.json()['payload']['appointments']
+        self.assertEqual([(a['date'], a['time']) for a in appointments], [
+            (self.monday.isoformat(), '09:00 - 09:30'),
+            (self.monday.isoformat(), '10:00 - 10:30'),
+        ])
+        self.assertEqual([a['doctorId'] for a in appointments], [self.other_doctor.id, self.doctor.id])
+
+    def test_doctor_schedule_defines_slots(self):
+        self.services[0].slot_minutes = 45
+        self.services[0].save()
+        DoctorWorkingHours.objects.create(doctor=self.doctor, weekday=0, start_time=time(8, 0), end_time=time(13, 0))
+        DoctorBreak.objects.create(doctor=self.doctor, start_time=time(10, 0), end_time=time(10, 30))
+        DoctorDayOff.objects.create(doctor=self.doctor, date=self.monday + timedelta(days=7))
+        self.book(self.doctor, self.monday, 11)
+
+        def entries(day, **params):
+            return self.client.get(reverse('available-times-view'), {
+                'doctorId': self.doctor.id, 'date': day.isoformat(), **params
+            }).json()['payload']['entries']
+
+        self.assertEqual(entries(self.monday, service=self.services[0].service_name),
+                         ['08:00 - 08:45', '08:45 - 09:30', '12:00 - 12:45'])
+        self.assertEqual(entries(self.monday + timedelta(days=1)), [])
+        self.assertEqual(entries(self.monday + timedelta(days=7)), [])
+
+        # Зміна графіка підвищує версію й перекомпільовує шаблон
+        DoctorWorkingHours.objects.create(doctor=self.doctor, weekday=1, start_time=time(9, 0), end_time=time(10, 0))
+        self.doctor.refresh_from_db()
+        self.assertEqual(self.doctor.schedule_version, 3)
+        self.assertEqual(entries(self.monday + timedelta(days=1)), ['09:00 - 09:30', '09:30 - 10:00'])
+
+
+class BookingConflictTests(TestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, self.entries = create_catalog(price_list, 2)
+        Service.objects.filter(pk=self.services[0].pk).update(slot_minutes=45)
+        invalidate_price_table()
+        self.doctor = create_doctor()
+        self.doctor.services.set(self.services)
+        self.patient = create_patient()
+        self.day = timezone.localdate() + timedelta(days=10)
+
+    def create(self, *appointments):
+        return self.client.post(
+            f"{reverse('create-appointments-view')}?patientId={self.patient.id}",
+            {'appointments': [
+                {'service': service.service_name, 'doctorId': self.doctor.id,
+                 'date': self.day.isoformat(), 'time': time_label}
+                for service, time_label in appointments
+            ]},
+            content_type='application/json'
+        )
+
+    def test_overlapping_slot_is_rejected_with_conflicts(self):
+        self.assertEqual(self.create((self.services[0], '10:00 - 10:45')).status_code, 201)
+
+        response = self.create((self.services[1], '11:00 - 11:30'), (self.services[1], '10:30 - 11:00'))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['payload']['conflicts'], [
+            {'doctorId': self.doctor.id, 'date': self.day.isoformat(), 'time': '10:30 - 11:00'}
+        ])
+        self.assertEqual(Appointment.objects.count(), 1)
+        self.assertEqual(Invoice.objects.count(), 1)
+
+    def test_invalid_pairs_are_rejected_before_any_write(self):
+        other_service = Service.objects.create(service_name='Не надається')
+        PriceListEntry.objects.create(price_list=self.entries[0].price_list, service=other_service, price=10)
+        invalidate_price_table()
+
+        self.assertEqual(self.create((other_service, '10:00 - 10:30')).status_code, 400)
+        self.assertEqual(self.create((Service(service_name='Невідома'), '10:00 - 10:30')).status_code, 404)
+        User.objects.filter(pk=self.doctor.pk).delete()
+        self.assertEqual(self.create((self.services[1], '10:00 - 10:30')).status_code, 404)
+        self.assertFalse(Invoice.objects.exists())
+
+    def test_empty_or_malformed_list_is_rejected_before_any_query(self):
+        valid = {'service': self.services[1].service_name, 'doctorId': self.doctor.id,
+                 'date': self.day.isoformat(), 'time': '10:00 - 10:30'}
+        url = f"{reverse('create-appointments-view')}?patientId={self.patient.id}"
+
+        for appointments in ([], 'not a list', [valid, 'not an appointment'], [{**valid, 'service': ['a']}],
+                             [{key: value for key, value in valid.items() if key != 'service'}],
+                             [{**valid, 'time': 1000}]):
+            with self.subTest(appointments=appointments), self.assertNumQueries(0):
+                response = self.client.post(url, {'appointments': appointments}, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertFalse(Invoice.objects.exists())
+
+    def test_query_count_does_not_grow_with_appointments(self):
+        for i in range(4):
+            create_doctor(email=f'extra{i}@example.com').services.set(self.services)
+        doctors = list(User.objects.filter(user_type='DOCTOR'))
+        self.create((self.services[1], '08:00 - 08:30'))  # прогріває знімок цін
+
+        def book(count, hour):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.post(
+                    f"{reverse('create-appointments-view')}?patientId={self.patient.id}",
+                    {'appointments': [
+                        {'service': self.services[1].service_name, 'doctorId': doctors[i].id,
+                         'date': self.day.isoformat(), 'time': f'{hour}:{i * 10:02d} - {hour}:{i * 10 + 30:02d}'}
+                        for i in range(count)
+                    ]},
+                    content_type='application/json'
+                )
+            self.assertEqual(response.status_code, 201)
+            return len(queries)
+
+        self.assertEqual(book(1, 12), book(5, 14))
+
+    def test_canceled_appointment_frees_the_slot(self):
+        self.create((self.services[1], '10:00 - 10:30'))
+        Appointment.objects.update(execution_status='CANCELED')
+
+        self.assertEqual(self.create((self.services[1], '10:00 - 10:30')).status_code, 201)
+
+
+class ConcurrentBookingTests(TransactionTestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, _ = create_catalog(price_list, 1)
+        invalidate_price_table()
+        self.doctors = [create_doctor(email=f'doctor{i}@example.com') for i in range(4)]
+        for doctor in self.doctors:
+            doctor.services.set(self.services)
+        self.patient = create_patient()
+        self.day = timezone.localdate() + timedelta(days=10)
+
+    def book_in_parallel(self, doctors):
+        def book(doctor):
+            try:
+                return self.client_class().post(
+                    f"{reverse('create-appointments-view')}?patientId={self.patient.id}",
+                    {'appointments': [{'service': self.services[0].service_name, 'doctorId': doctor.id,
+                                       'date': self.day.isoformat(), 'time': '10:00 - 10:30'}]},
+                    content_type='application/json'
+                ).status_code
+            finally:
+                connections.close_all()
+
+        with ThreadPoolExecutor(max_workers=len(doctors)) as pool:
+            return sorted(pool.map(book, doctors))
+
+    def test_parallel_bookings_of_one_slot_admit_exactly_one(self):
+        statuses = self.book_in_parallel([self.doctors[0]] * 8)
+
+        self.assertEqual(statuses, [201] + [409] * 7)
+        self.assertEqual(Appointment.objects.count(), 1)
+
+    def test_parallel_bookings_of_different_doctors_all_succeed(self):
+        statuses = self.book_in_parallel(self.doctors)
+
+        self.assertEqual(statuses, [201] * len(self.doctors))
+
+
+@override_settings(MAIL_TRANSPORT='memory')
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        reset_mail_transport()
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, _ = create_catalog(price_list, 2)
+        invalidate_price_table()
+        self.doctor = create_doctor()
+        self.doctor.services.set(self.services)
+        self.patient = create_patient()
+        day = (timezone.localdate() + timedelta(days=10)).isoformat()
+        response = self.client.post(
+            f"{reverse('create-appointments-view')}?patientId={self.patient.id}",
+            {'appointments': [
+                {'service': service.service_name, 'doctorId': self.doctor.id, 'date': day, 'time': time_label}
+                for service, time_label in zip(self.services, ['10:00 - 10:30', '11:00 - 11:30'])
+            ]},
+            content_type='application/json'
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(get_mail_transport().outbox, [])
+
+    def test_booking_enqueues_one_message_per_appointment(self):
+        self.assertEqual(
+            set(EmailOutbox.objects.values_list('appointment_id', 'status')),
+            {(appointment_id, 'PENDING') for appointment_id in Appointment.objects.values_list('id', flat=True)}
+        )
+
+    def test_drain_sends_batch_and_marks_messages_sent(self):
+        with self.assertNumQueries(4):
+            self.assertEqual(drain_outbox(batch_size=10), (2, 0))
+
+        sent = get_mail_transport().outbox
+        self.assertEqual([email.to_email for email in sent], [self.doctor.email] * 2)
+        self.assertIn('Час прийому: 10:00', sent[0].render(sent[0].html_content))
+        self.assertFalse(EmailOutbox.objects.exclude(status='SENT').exists())
+
+    def test_failed_delivery_is_retried_with_backoff_then_given_up(self):
+        def fail(emails):
+            return [ConnectionError('timeout')] * len(emails)
+
+        with mock.patch.object(MemoryTransport, 'send_batch', side_effect=fail):
+            self.assertEqual(drain_outbox(batch_size=10, max_attempts=2), (0, 2))
+            # Наступна спроба ще не настала
+            self.assertEqual(drain_outbox(batch_size=10, max_attempts=2), (0, 0))
+
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            self.assertEqual(drain_outbox(batch_size=10, max_attempts=2), (0, 2))
+
+        message = EmailOutbox.objects.first()
+        self.assertEqual((message.status, message.attempts, message.last_error), ('FAILED', 2, 'timeout'))
+
+
+class MailTransportTests(TestCase):
+    def test_transport_must_implement_send_batch(self):
+        class IncompleteTransport(MailTransport):
+            pass
+
+        with self.assertRaises(TypeError):
+            IncompleteTransport()
+
+    def test_sendgrid_batches_same_template_into_personalizations(self):
+        transport = SendGridTransport('key', 'appointments@vitalineph.com')
+        emails = [
+            build_appointment_notification(f'doctor+{i}@example.com', f'Лікар {i}', 'Пацієнт', '01.01.2030',
+                                           '10:00', i, 'FEMALE')
+            for i in range(3)
+        ]
+
+        with mock.patch.object(transport.session, 'post', return_value=mock.Mock(status_code=202)) as post:
+            self.assertEqual(transport.send_batch(emails), [None] * 3)
+
+        post.assert_called_once()
+        personalizations = post.call_args.kwargs['json']['personalizations']
+        self.assertEqual(sorted(p['to'][0]['email'] for p in personalizations),
+                         ['doctor@example.com'] * 3)
+        self.assertEqual(sorted(p['substitutions']['-doctor_name-'] for p in personalizations),
+                         ['Лікар 0', 'Лікар 1', 'Лікар 2'])
+
+    def test_sendgrid_error_is_reported_per_message(self):
+        transport = SendGridTransport('key', 'appointments@vitalineph.com')
+        email = build_appointment_notification('doctor@example.com', 'Лікар', 'Пацієнт', '01.01.2030',
+                                               '10:00', 1, 'MALE')
+
+        with mock.patch.object(transport.session, 'post', return_value=mock.Mock(status_code=401, text='denied')):
+            errors = transport.send_batch([email])
+
+        self.assertIn('401', str(errors[0]))
+
+    @override_settings(MAIL_TRANSPORT='memory')
+    def test_verification_code_goes_through_transport(self):
+        reset_mail_transport()
+
+        response = self.client.get(reverse('send-email-verification-view'), {'email': 'new@example.com'})
+
+        self.assertEqual(response.status_code, 200)
+        [email] = get_mail_transport().outbox
+        self.assertIn(str(Verification.objects.get(email='new@example.com').code), email.html_content)
+
+    @override_settings(MAIL_TRANSPORT='memory')
+    def test_verification_code_is_sent_outside_a_transaction(self):
+        reset_mail_transport()
+        test_atomic_depth = len(connection.atomic_blocks)
+        depths = []
+
+        def send_batch(emails):
+            depths.append(len(connection.atomic_blocks))
+            self.assertTrue(Verification.objects.filter(email='new@example.com').exists())
+            return [None] * len(emails)
+
+        with mock.patch.object(MemoryTransport, 'send_batch', side_effect=send_batch):
+            response = self.client.get(reverse('send-email-verification-view'), {'email': 'new@example.com'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(depths, [test_atomic_depth])
+
+    @override_settings(MAIL_TRANSPORT='memory')
+    def test_failed_verification_email_is_not_stored(self):
+        reset_mail_transport()
+
+        with mock.patch.object(MemoryTransport, 'send_batch', side_effect=lambda emails: [MailDeliveryError('down')]):
+            response = self.client.get(reverse('send-email-verification-view'), {'email': 'new@example.com'})
+
+        self.assertEqual(response.status_code, 502)
+        self.assertFalse(Verification.objects.exists())
+
+
+class AppointmentStatusBatchTests(TestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, self.entries = create_catalog(price_list, 2)
+        self.doctor = create_doctor()
+        self.patient = create_patient()
+        self.invoice = Invoice.objects.create(subtotal=100, total=100)
+        now = timezone.now()
+        self.past = [self.appointment(now - timedelta(hours=i + 1), entry) for i, entry in
+                     enumerate(self.entries * 2)]
+        self.future = self.appointment(now + timedelta(days=1), self.entries[0])
+        self.completed = self.appointment(now - timedelta(days=1), self.entries[0], 'COMPLETED')
+
+    def appointment(self, appointment_date, entry, execution_status='PLANNED'):
+        return Appointment.objects.create(patient=self.patient, doctor=self.doctor, price_list_entry=entry,
+                                          invoice=self.invoice, execution_status=execution_status,
+                                          appointment_date=appointment_date)
+
+    def post(self, ids, new_status, headers=None):
+        return self.client.post(reverse('appointments-status-batch'), {'ids': ids, 'status': new_status},
+                                content_type='application/json',
+                                **(auth_header(self.doctor) if headers is None else headers))
+
+    def test_requires_token(self):
+        response = self.post([self.past[0].id], 'COMPLETED', headers={})
+
+        self.assertEqual(response.status_code, 401)
+        self.past[0].refresh_from_db()
+        self.assertEqual(self.past[0].execution_status, 'PLANNED')
+
+    def test_complete_reports_outcome_per_id_and_updates_counters(self):
+        ids = [appt.id for appt in self.past] + [self.future.id, self.completed.id, 999999]
+
+        # 7 запитів переходу і один - користувач із токена
+        with self.assertNumQueries(8):
+            response = self.post(ids, 'COMPLETED')
+
+        payload = response.json()['payload']
+        self.assertEqual(payload['updated'], 4)
+        self.assertEqual([result['outcome'] for result in payload['results']],
+                         ['UPDATED'] * 4 + ['NOT_STARTED', 'NOT_PLANNED', 'NOT_FOUND'])
+        self.assertEqual(Appointment.objects.filter(execution_status='COMPLETED',
+                                                    completion_date__isnull=False).count(), 4)
+        self.assertEqual(
+            dict(ServiceUsageCounter.objects.values_list('service_id', 'completed_count')),
+            {self.services[0].id: 2, self.services[1].id: 2}
+        )
+
+    def test_cancel_touches_only_planned_appointments(self):
+        response = self.post([self.future.id, self.completed.id], 'CANCELED')
+
+        self.assertEqual([result['outcome'] for result in response.json()['payload']['results']],
+                         ['UPDATED', 'NOT_PLANNED'])
+        self.future.refresh_from_db()
+        self.completed.refresh_from_db()
+        self.assertEqual((self.future.execution_status, self.completed.execution_status), ('CANCELED', 'COMPLETED'))
+
+
+class DoctorAppointmentFeedTests(TestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        _, self.entries = create_catalog(price_list, 1)
+        self.doctor = create_doctor()
+        self.other_doctor = create_doctor(email='other@example.com')
+        self.registrar = create_doctor(email='registrar@example.com', user_type='REGISTRAR')
+        self.patient = create_patient()
+        self.invoice = Invoice.objects.create(subtotal=100, total=100)
+        self.today = timezone.now().astimezone(CLINIC_TZ).date()
+        self.mine_today = self.appointment(self.doctor, self.today, 12)
+        self.mine_later = self.appointment(self.doctor, self.today + timedelta(days=30), 12)
+        self.theirs_today = self.appointment(self.other_doctor, self.today, 13)
+
+    def appointment(self, doctor, day, hour):
+        return Appointment.objects.create(patient=self.patient, doctor=doctor, price_list_entry=self.entries[0],
+                                          invoice=self.invoice,
+                                          appointment_date=CLINIC_TZ.localize(datetime.combine(day, time(hour))))
+
+    def feed(self, user=None, **params):
+        response = self.client.get(reverse('appointments-doctor-operations'), params,
+                                   **auth_header(user or self.registrar))
+        return response, [entry['id'] for entry in response.json()['payload'].get('entries', [])]
+
+    def test_doctor_token_scopes_feed_to_own_appointments(self):
+        _, ids = self.feed(self.doctor, doctorId=self.other_doctor.id)
+        self.assertEqual(ids, [self.mine_today.id, self.mine_later.id])
+
+        _, ids = self.feed()
+        self.assertEqual(len(ids), 3)
+
+        _, ids = self.feed(doctorId=self.other_doctor.id)
+        self.assertEqual(ids, [self.theirs_today.id])
+
+    def test_requests_without_valid_token_are_refused(self):
+        url = reverse('appointments-doctor-operations')
+        past = self.appointment(self.doctor, self.today - timedelta(days=1), 12)
+
+        self.assertEqual(self.client.get(url, {'doctorId': self.doctor.id}).status_code, 401)
+        self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer not-a-token').status_code, 401)
+        self.assertEqual(self.client.post(f'{url}?id={past.id}').status_code, 401)
+        self.assertEqual(self.client.put(f'{url}?id={past.id}').status_code, 401)
+
+        deleted = create_doctor(email='deleted@example.com')
+        headers = auth_header(deleted)
+        User.objects.filter(pk=deleted.pk).delete()
+        self.assertEqual(self.client.get(url, **headers).status_code, 401)
+
+        past.refresh_from_db()
+        self.assertEqual(past.execution_status, 'PLANNED')
+
+    def test_date_windows(self):
+        _, ids = self.feed(self.doctor, window='today')
+        self.assertEqual(ids, [self.mine_today.id])
+
+        later = (self.today + timedelta(days=30)).isoformat()
+        _, ids = self.feed(self.doctor, window='custom', **{'from': later})
+        self.assertEqual(ids, [self.mine_later.id])
+
+        _, ids = self.feed(window='week', cursor='')
+        self.assertEqual(ids, [self.mine_today.id, self.theirs_today.id])
+
+        response, _ = self.feed(window='custom', **{'from': 'yesterday'})
+        self.assertEqual(response.status_code, 400)
+
+
+class PatientAppointmentsTests(TestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        _, entries = create_catalog(price_list, 1)
+        doctor = create_doctor()
+        self.patient = create_patient()
+        invoice = Invoice.objects.create(subtotal=100, total=100, discount_percent=10)
+        start = CLINIC_TZ.localize(datetime(2025, 1, 1, 10))
+        Appointment.objects.bulk_create(
+            Appointment(patient=self.patient, doctor=doctor, price_list_entry=entries[0], invoice=invoice,
+                        execution_status='COMPLETED' if i % 5 else 'CANCELED',
+                        appointment_date=start + timedelta(days=i))
+            for i in range(25)
+        )
+        self.url = reverse('patient-appointments-ops')
+
+    def test_history_is_paged_by_keyset_newest_first(self):
+        seen = []
+        cursor = ''
+        while cursor is not None:
+            with self.assertNumQueries(2):
+                payload = self.client.get(self.url, {'id': self.patient.id, 'q': 10, 'cursor': cursor}).json()['payload']
+            seen.extend(entry['id'] for entry in payload['entries'])
+            cursor = payload['nextCursor']
+
+        self.assertEqual(len(seen), 25)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_filters_by_status_and_dates(self):
+        payload = self.client.get(self.url, {
+            'id': self.patient.id, 'q': 50, 'status': 'CANCELED', 'from': '2025-01-02', 'to': '2025-01-20'
+        }).json()['payload']
+
+        self.assertEqual([entry['appointmentDate'] for entry in payload['entries']], [
+            int(CLINIC_TZ.localize(datetime(2025, 1, day, 10)).timestamp() * 1000) for day in (16, 11, 6)
+        ])
+        self.assertEqual(payload['entries'][0]['price'], 90.0)
+
+    def test_ndjson_streams_full_history(self):
+        response = self.client.get(self.url, {'id': self.patient.id, 'output': 'ndjson'})
+
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 25)
+        self.assertEqual(json.loads(lines[-1])['status'], 'CANCELED')
+
+
+
+class DailyDoctorStatsTests(TestCase):
+    def setUp(self):
+        caches['stats'].clear()
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        self.services, self.entries = create_catalog(price_list, 2)
+        self.doctor = create_doctor()
+        self.other_doctor = create_doctor(email='other@example.com')
+        self.patient = create_patient()
+        self.invoice = Invoice.objects.create(discount_percent=15, subtotal=100, total=85)
+        started = timezone.now() - timedelta(minutes=30)
+        self.appointments = [
+            Appointment.objects.create(patient=self.patient, doctor=doctor, price_list_entry=entry,
+                                       invoice=self.invoice, appointment_date=started - timedelta(hours=i))
+            for i, (doctor, entry) in enumerate([(self.doctor, self.entries[0]), (self.doctor, self.entries[1]),
+                                                 (self.other_doctor, self.entries[0])])
+        ]
+        self.operations_url = reverse('appointments-doctor-operations')
+
+    def today_entry(self, url_name, **params):
+        return self.client.get(reverse(url_name), params).json()['payload']['entries'][-1]['count']
+
+    def test_rollup_follows_completion_and_cancellation(self):
+        for appointment in self.appointments:
+            self.client.post(f'{self.operations_url}?id={appointment.id}', **auth_header(appointment.doctor))
+
+        self.assertEqual(self.today_entry('weekly-general-stats'), 3)
+        self.assertEqual(self.today_entry('doctor-weekly-count-stats', doctorId=self.doctor.id), 2)
+        # (100 + 101) * 0.85
+        self.assertEqual(self.today_entry('doctor-weekly-revenue-stats', doctorId=self.doctor.id), 170.85)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(f'{self.operations_url}?id={self.appointments[1].id}', **auth_header(self.doctor))
+
+        self.assertEqual(self.today_entry('doctor-weekly-count-stats', doctorId=self.doctor.id), 1)
+        self.assertEqual(self.today_entry('doctor-weekly-revenue-stats', doctorId=self.doctor.id), 85.0)
+
+    def test_batch_completion_updates_rollup(self):
+        self.client.post(reverse('appointments-status-batch'),
+                         {'ids': [appointment.id for appointment in self.appointments], 'status': 'COMPLETED'},
+                         content_type='application/json', **auth_header(self.doctor))
+
+        self.assertEqual(DailyDoctorStats.objects.filter(doctor=self.doctor).count(), 2)
+        self.assertEqual(self.today_entry('weekly-general-stats'), 3)
+
+    def test_rebuild_matches_incremental_rollup(self):
+        for appointment in self.appointments:
+            self.client.post(f'{self.operations_url}?id={appointment.id}', **auth_header(appointment.doctor))
+        incremental = set(DailyDoctorStats.objects.values_list('doctor', 'service', 'day', 'completed_count', 'revenue'))
+
+        DailyDoctorStats.objects.all().delete()
+        call_command('rebuild_daily_doctor_stats', stdout=StringIO())
+
+        self.assertEqual(
+            set(DailyDoctorStats.objects.values_list('doctor', 'service', 'day', 'completed_count', 'revenue')),
+            incremental
+        )
+
+    def test_migration_backfills_completed_history(self):
+        for appointment in self.appointments:
+            self.client.post(f'{self.operations_url}?id={appointment.id}', **auth_header(appointment.doctor))
+        incremental = set(DailyDoctorStats.objects.values_list('doctor', 'service', 'day', 'completed_count', 'revenue'))
+        DailyDoctorStats.objects.all().delete()
+
+        migration = importlib.import_module('clinic_app_service.migrations.0027_daily_doctor_stats')
+        migration.backfill_daily_doctor_stats(django_apps, connection.schema_editor())
+
+        self.assertEqual(
+            set(DailyDoctorStats.objects.values_list('doctor', 'service', 'day', 'completed_count', 'revenue')),
+            incremental
+        )
+        self.assertEqual(self.today_entry('weekly-general-stats'), 3)
+
+    def test_doctor_stats_read_only_rollup(self):
+        for appointment in self.appointments:
+            self.client.post(f'{self.operations_url}?id={appointment.id}', **auth_header(appointment.doctor))
+
+        with self.assertNumQueries(2):
+            self.client.get(reverse('doctor-weekly-revenue-stats'), {'doctorId': self.doctor.id})
+
+    def test_ranges_are_grouped_by_granularity(self):
+        for day, count, revenue in ((date(2025, 1, 30), 2, '170.0034'), (date(2025, 2, 3), 1, '33.3333'),
+                                    (date(2025, 2, 28), 1, '33.3333')):
+            DailyDoctorStats.objects.create(doctor=self.doctor, service=self.services[0], day=day,
+                                            completed_count=count, revenue=Decimal(revenue))
+        url = reverse('doctor-weekly-revenue-stats')
+
+        months = self.client.get(url, {'doctorId': self.doctor.id, 'from': '2025-01-01', 'to': '2025-03-31',
+                                       'granularity': 'month'}).json()['payload']['entries']
+        weeks = self.client.get(url, {'doctorId': self.doctor.id, 'from': '2025-01-27', 'to': '2025-02-09',
+                                      'granularity': 'week'}).json()['payload']['entries']
+        counts = self.client.get(reverse('weekly-general-stats'), {'from': '2025-02-01', 'to': '2025-02-03'})
+
+        self.assertEqual([(entry['date'], entry['count']) for entry in months],
+                         [('01.2025', 170.0), ('02.2025', 66.67), ('03.2025', 0)])
+        self.assertEqual([(entry['start'], entry['count']) for entry in weeks],
+                         [('2025-01-27', 170.0), ('2025-02-03', 33.33)])
+        self.assertEqual([entry['count'] for entry in counts.json()['payload']['entries']], [0, 0, 1])
+
+    def test_invalid_range_is_rejected(self):
+        for params in ({'granularity': 'year'}, {'from': '2025-02-01', 'to': '2025-01-01'}, {'from': '01.02.2025'}):
+            response = self.client.get(reverse('weekly-general-stats'), params)
+            self.assertEqual(response.status_code, 400)
+
+    def test_leaderboard_returns_all_doctors_in_columns(self):
+        idle_doctor = create_doctor(email='idle@example.com', last_name='Андрієнко')
+        for day, doctor, count, revenue in ((date(2025, 3, 1), self.doctor, 2, '150.5'),
+                                            (date(2025, 3, 2), self.other_doctor, 3, '300'),
+                                            (date(2025, 3, 2), self.doctor, 1, '80')):
+            DailyDoctorStats.objects.create(doctor=doctor, service=self.services[0], day=day,
+                                            completed_count=count, revenue=Decimal(revenue))
+
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('doctors-leaderboard-stats'), {'from': '2025-03-01', 'to': '2025-03-03'})
+
+        payload = response.json()['payload']
+        self.assertEqual(payload['doctorIds'], [self.other_doctor.id, self.doctor.id, idle_doctor.id])
+        self.assertEqual(payload['starts'], ['2025-03-01', '2025-03-02', '2025-03-03'])
+        self.assertEqual(payload['counts'], [[0, 2, 0], [3, 1, 0], [0, 0, 0]])
+        self.assertEqual(payload['revenues'], [[0, 150.5, 0], [300.0, 80.0, 0], [0, 0, 0]])
+        self.assertEqual(payload['totalRevenues'], [300.0, 230.5, 0.0])
+
+
+class TodayCumulateTests(TestCase):
+    def setUp(self):
+        caches['stats'].clear()
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        _, entries = create_catalog(price_list, 1)
+        doctor, patient = create_doctor(), create_patient()
+        invoice = Invoice.objects.create(subtotal=100, total=100)
+        today = timezone.now().astimezone(CLINIC_TZ).date()
+        moments = [(time(8, 30), 'COMPLETED'), (time(9, 10), 'COMPLETED'), (time(10, 59), 'COMPLETED'),
+                   (time(12, 0), 'COMPLETED'), (time(9, 30), 'CANCELED')]
+        Appointment.objects.bulk_create([
+            Appointment(patient=patient, doctor=doctor, price_list_entry=entries[0], invoice=invoice,
+                        execution_status=execution_status,
+                        appointment_date=CLINIC_TZ.localize(datetime.combine(today, moment)) - timedelta(hours=1),
+                        completion_date=CLINIC_TZ.localize(datetime.combine(today, moment)))
+            for moment, execution_status in moments
+        ])
+        self.url = reverse('todays-visits-cumulate')
+
+    def test_histogram_uses_clinic_hours_and_bucket(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'start': '09:00', 'end': '12:00', 'bucket': 60})
+
+        self.assertEqual(response.json()['payload']['entries'], [
+            {'hour': '09:00', 'count': 1}, {'hour': '10:00', 'count': 2},
+            {'hour': '11:00', 'count': 3}, {'hour': '12:00', 'count': 3}
+        ])
+
+    def test_default_window_and_invalid_params(self):
+        entries = self.client.get(self.url, {'bucket': 30}).json()['payload']['entries']
+
+        self.assertEqual((entries[0]['hour'], entries[-1]['hour'], len(entries)), ('09:00', '19:00', 21))
+        self.assertEqual(entries[-1]['count'], 4)
+        for params in ({'bucket': 7}, {'start': '18:00', 'end': '09:00'}, {'end': '25:00'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+
+
+@override_settings(STATS_STREAM_HEARTBEAT=5)
+class TodayCumulateStreamTests(TransactionTestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        _, entries = create_catalog(price_list, 1)
+        self.appointment = Appointment.objects.create(
+            patient=create_patient(), doctor=create_doctor(), price_list_entry=entries[0],
+            invoice=Invoice.objects.create(subtotal=100, total=100),
+            appointment_date=timezone.now() - timedelta(minutes=10)
+        )
+
+    def test_stream_pushes_series_after_completion(self):
+        response = self.client.get(reverse('todays-visits-cumulate-stream'),
+                                   {'start': '00:00', 'end': '24:00', 'bucket': 720},
+                                   HTTP_ACCEPT='text/event-stream')
+        events = iter(response.streaming_content)
+        try:
+            self.assertEqual(response['Content-Type'], 'text/event-stream')
+            self.assertEqual(next(events), b'retry: 1000\n\n')
+            first = next(events).decode()
+            self.client.post(f"{reverse('appointments-doctor-operations')}?id={self.appointment.id}",
+                             **auth_header(self.appointment.doctor))
+            second = next(events).decode()
+        finally:
+            response.close()
+
+        def last_count(event):
+            self.assertTrue(event.startswith('event: cumulate\n'))
+            return json.loads(event.split('data: ', 1)[1])['payload']['entries'][-1]['count']
+
+        self.assertEqual((last_count(first), last_count(second)), (0, 1))
+
+    @override_settings(STATS_STREAM_MAX_DURATION=0.5)
+    def test_stream_ends_before_worker_timeout(self):
+        started = time_module.monotonic()
+        response = self.client.get(reverse('todays-visits-cumulate-stream'), HTTP_ACCEPT='text/event-stream')
+
+        events = [event.decode() for event in response.streaming_content]
+
+        self.assertLess(time_module.monotonic() - started, 5)
+        self.assertEqual(events[0], 'retry: 1000\n\n')
+        self.assertTrue(events[1].startswith('event: cumulate\n'))
+
+
+class StatsCacheTests(TestCase):
+    def setUp(self):
+        caches['stats'].clear()
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        _, entries = create_catalog(price_list, 1)
+        self.doctor = create_doctor()
+        self.appointment = Appointment.objects.create(
+            patient=create_patient(), doctor=self.doctor, price_list_entry=entries[0],
+            invoice=Invoice.objects.create(subtotal=100, total=100),
+            appointment_date=timezone.now() - timedelta(minutes=10)
+        )
+
+    def test_repeated_requests_are_served_from_cache_until_completion(self):
+        url = reverse('doctor-weekly-count-stats')
+        params = {'doctorId': self.doctor.id, 'granularity': 'week'}
+        first = self.client.get(url, params).json()
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(url, params).json()
+        self.assertEqual(cached, first)
+        self.assertEqual(self.client.get(url, {**params, 'granularity': 'day'}).status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f"{reverse('appointments-doctor-operations')}?id={self.appointment.id}",
+                             **auth_header(self.appointment.doctor))
+
+        self.assertEqual(self.client.get(url, params).json()['payload']['entries'][-1]['count'], 1)
+
+    def test_errors_are_not_cached(self):
+        url = reverse('doctor-weekly-count-stats')
+        self.assertEqual(self.client.get(url, {'doctorId': 999999}).status_code, 404)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(url, {'doctorId': 999999}).status_code, 404)
+
+
+class PatientSearchTests(TestCase):
+    def setUp(self):
+        self.url = reverse('registry')
+        # Пацієнтка зі збігом лише в email створюється першою: порядок має задавати ранг, а не id
+        self.by_email = create_patient(first_name='Ольга', last_name='Бондар', email='ivan_petrenko@example.com',
+                                       phone_number='+380671112233')
+        self.by_name = create_patient(last_name='Ivan', first_name='Petrenko', email='p@example.com')
+        self.apostrophe = create_patient(first_name="Мар'яна", last_name='Дуб', email='maryana@example.com',
+                                         phone_number='+380931234500')
+
+    def search(self, phrase):
+        response = self.client.get(self.url, {'s': phrase, 'q': 10})
+        return [entry['id'] for entry in response.json()['payload']['entries']]
+
+    def test_name_search_including_apostrophes(self):
+        self.assertEqual(self.search('Дуб'), [self.apostrophe.id])
+        self.assertEqual(self.search("Мар'яна"), [self.apostrophe.id])
+        self.assertEqual(self.search('Мар’ян'), [self.apostrophe.id])
+
+    def test_phone_suffix_email_and_id_search(self):
+        self.assertEqual(self.search('067 111 22 33'), [self.by_email.id])
+        self.assertEqual(self.search('maryana@example'), [self.apostrophe.id])
+        self.assertEqual(self.search('ivan_petr'), [self.by_name.id, self.by_email.id])
+        self.assertIn(self.apostrophe.id, self.search(str(self.apostrophe.id)))
+
+    def test_name_matches_rank_above_email_matches(self):
+        self.assertEqual(self.search('ivan petrenko'), [self.by_name.id, self.by_email.id])
+
+    def test_cursor_pages_keep_rows_with_equal_rank(self):
+        # Однаковий ранг у всіх, крім першої; межі сторінок припадають на нічиї
+        best = create_patient(first_name='Коваль', last_name='Коваль', email='best@example.com',
+                              phone_number='+380670000100')
+        tied = [create_patient(last_name='Коваль', email=f'tied{i}@example.com', phone_number=f'+38067000020{i}')
+                for i in range(5)]
+
+        seen, cursor = [], ''
+        for _ in range(len(tied) + 1):
+            if cursor is None:
+                break
+            payload = self.client.get(self.url, {'s': 'коваль', 'q': 2, 'cursor': cursor}).json()['payload']
+            seen += [entry['id'] for entry in payload['entries']]
+            cursor = payload['nextCursor']
+
+        self.assertEqual(seen, [best.id] + [patient.id for patient in tied])
+
+
+class UniqueActiveSlotMigrationTests(TestCase):
+    def setUp(self):
+        self.migration = importlib.import_module('clinic_app_service.migrations.0023_appointment_unique_active_slot')
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        _, self.entries = create_catalog(price_list, 1)
+        self.doctor, self.patient = create_doctor(), create_patient()
+        self.invoice = Invoice.objects.create(subtotal=100, total=100)
+        self.slot = CLINIC_TZ.localize(datetime(2025, 3, 3, 10))
+        # Дублікати, які могли з'явитися до обмеження; DROP INDEX відкочується разом із транзакцією тесту
+        with connection.cursor() as cursor:
+            cursor.execute("DROP INDEX unique_active_doctor_slot")
+
+    def appointment(self, execution_status, appointment_date=None):
+        return Appointment.objects.create(patient=self.patient, doctor=self.doctor, price_list_entry=self.entries[0],
+                                          invoice=self.invoice, execution_status=execution_status,
+                                          appointment_date=appointment_date or self.slot)
+
+    def run_migration_step(self):
+        self.migration.check_duplicate_active_slots(django_apps, connection.schema_editor())
+
+    def test_aborts_with_report_instead_of_canceling_duplicates(self):
+        planned, completed = self.appointment('PLANNED'), self.appointment('COMPLETED')
+        other_slot = [self.appointment('PLANNED', self.slot + timedelta(hours=1)) for _ in range(2)]
+
+        with self.assertRaises(RuntimeError) as raised:
+            self.run_migration_step()
+
+        self.assertIn('2 slot(s)', str(raised.exception))
+        self.assertIn(f"appointments {planned.id} PLANNED, {completed.id} COMPLETED", str(raised.exception))
+        self.assertIn(f"appointments {other_slot[0].id} PLANNED, {other_slot[1].id} PLANNED", str(raised.exception))
+        self.assertFalse(Appointment.objects.filter(execution_status='CANCELED').exists())
+
+    def test_passes_when_only_canceled_rows_share_a_slot(self):
+        self.appointment('CANCELED')
+        self.appointment('PLANNED')
+
+        self.run_migration_step()
+
+
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        price_list = PriceList.objects.create(name='Основний', status='ACTIVE')
+        _, entries = create_catalog(price_list, 2)
+        doctor, patient = create_doctor(), create_patient()
+        invoice = Invoice.objects.create(subtotal=100, total=100)
+        started = timezone.now() - timedelta(days=10)
+        finished = timezone.now() - timedelta(days=1)
+        # Однакові назви послуг і однакові дати завершення (нічия вирішується за id), частина без дати (NULL)
+        completion_dates = [finished, None, finished, finished - timedelta(hours=1), None, finished, None, None]
+        Appointment.objects.bulk_create(
+            Appointment(patient=patient, doctor=doctor, price_list_entry=entries[i % 2], invoice=invoice,
+                        execution_status='COMPLETED' if completion_date else 'PLANNED',
+                        appointment_date=started + timedelta(hours=i), completion_date=completion_date)
+            for i, completion_date in enumerate(completion_dates)
+        )
+        self.url = reverse('statements-view')
+
+    def page(self, cursor, sort_by, order):
+        response = self.client.post(f'{self.url}?q=3&cursor={cursor}', {'sortBy': sort_by, 'order': order},
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        payload = response.json()['payload']
+        return [entry['id'] for entry in payload['entries']], payload['nextCursor'], payload['prevCursor']
+
+    def assert_walks_in_db_order(self, sort_by, order, order_fields):
+        expected = list(Appointment.objects.order_by(*order_fields).values_list('id', flat=True))
+
+        pages, cursor = [], ''
+        while cursor is not None:
+            ids, cursor, prev_cursor = self.page(cursor, sort_by, order)
+            self.assertEqual(prev_cursor is None, not pages)
+            pages.append((ids, prev_cursor))
+        self.assertEqual([appointment_id for ids, _ in pages for appointment_id in ids], expected)
+
+        # Назад від останньої сторінки через prevCursor - ті самі сторінки у зворотному порядку
+        for (ids, _), (_, prev_cursor) in zip(reversed(pages[:-1]), reversed(pages[1:])):
+            self.assertEqual(self.page(prev_cursor, sort_by, order)[0], ids)
+
+    def test_ascending_with_ties_and_nulls_last(self):
+        self.assert_walks_in_db_order('service', 'asc', ['price_list_entry__service__service_name', 'id'])
+        self.assert_walks_in_db_order('endDate', 'asc', ['completion_date', 'id'])
+
+    def test_descending_with_ties_and_nulls_first(self):
+        self.assert_walks_in_db_order('endDate', 'desc', ['-completion_date', 'id'])
+        self.assert_walks_in_db_order('id', 'desc', ['-id'])
+
+    def test_invalid_cursors_are_rejected(self):
+        def encoded(data):
+            return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip('=')
+
+        for cursor in ('not*base64', encoded(['x']), encoded({'v': [1], 'd': 'next'}),
+                       encoded({'v': [None, 1], 'd': 'sideways'})):
+            response = self.client.post(f'{self.url}?q=3&cursor={cursor}', {'sortBy': 'endDate', 'order': 'asc'},
+                                        content_type='application/json')
+            self.assertEqual(response.status_code, 400, cursor)
+            self.assertEqual(response.json()['payloadType'], 'ErrorResponseDto')
+
+
+class RegistryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.url = reverse('registry')
+        self.patients_created = 0
+        for i in range(5):
+            self.create_patient(first_name=f'Пацієнт{i}')
+
+    def create_patient(self, **kwargs):
+        self.patients_created += 1
+        return create_patient(email=f'p{self.patients_created}@example.com',
+                              phone_number=f'+38050000{self.patients_created:04d}', **kwargs)
+
+    def registry(self, **params):
+        return self.client.get(self.url, {'q': 2, **params}).json()['payload']
+
+    def table_stub(self, table):
+        return SimpleNamespace(_meta=SimpleNamespace(db_table=table))
+
+    def test_never_analyzed_and_empty_tables_have_no_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute("CREATE TEMP TABLE count_estimate_probe (id int)")
+            self.assertIsNone(estimate_table_rows(self.table_stub('count_estimate_probe')))  # reltuples = -1
+
+            cursor.execute("ANALYZE count_estimate_probe")
+            self.assertIsNone(estimate_table_rows(self.table_stub('count_estimate_probe')))  # reltuples = 0
+
+            cursor.execute("INSERT INTO count_estimate_probe SELECT generate_series(1, 3)")
+            cursor.execute("ANALYZE count_estimate_probe")
+            self.assertEqual(estimate_table_rows(self.table_stub('count_estimate_probe')), 3)
+
+    @override_settings(REGISTRY_COUNT_ESTIMATE_THRESHOLD=0)
+    def test_unfiltered_count_without_estimate_is_exact(self):
+        with mock.patch('clinic_app_service.count_service.estimate_table_rows', return_value=None):
+            payload = self.registry()
+
+        self.assertEqual((payload['totalPages'], payload['isCountExact']), (3, True))
+
+    @override_settings(REGISTRY_COUNT_ESTIMATE_THRESHOLD=3)
+    def test_large_unfiltered_table_uses_planner_estimate(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {Patient._meta.db_table}")
+        self.create_patient()
+
+        payload = self.registry()
+
+        # Оцінка з останнього ANALYZE (5 рядків), а не точні 6
+        self.assertEqual((payload['totalPages'], payload['isCountExact']), (3, False))
+
+    def test_filtered_totals_are_cached_until_expiry(self):
+        first = self.registry(s='Пацієнт1')
+        self.create_patient(first_name='Пацієнт1')
+        cached = self.registry(s='Пацієнт1')
+        other_filter = self.registry(s='Пацієнт2')
+
+        self.assertEqual((first['totalPages'], first['isCountExact']), (1, True))
+        self.assertEqual((cached['totalPages'], cached['isCountExact']), (1, False))
+        self.assertEqual(other_filter['isCountExact'], True)
+
+        expired = time_module.time() + settings.REGISTRY_COUNT_CACHE_TTL + 1
+        with mock.patch('django.core.cache.backends.locmem.time.time', return_value=expired):
+            refreshed = self.registry(s='Пацієнт1', q=1)
+        self.assertEqual((refreshed['totalPages'], refreshed['isCountExact']), (2, True))
@@ -81,42 +81,68 @@ class LoginView(APIView):
 
 
 from math import ceil
-from django.db.models import Q, Value, CharField
-from django.db.models.functions import Concat
+from django.contrib.postgres.search import SearchRank
+from django.db.models import Q, F, DecimalField
+from django.db.models.functions import Cast
 from django.shortcuts import get_object_or_404
 from django.http import JsonResponse
 from rest_framework import status
 from rest_framework.views import APIView
 from .models import Patient
 from .serializers import PatientSerializer  # Make sure your PatientSerializer is defined
+from .search_service import build_patient_search_query
+from .pagination_service import paginate_by_cursor, InvalidCursorError
+from .count_service import count_registry
 
 class PatientListView(APIView):
     def get(self, request):
         page = int(request.query_params.get('p', 1))
         per_page = int(request.query_params.get('q', 10))
         search_phrase = request.query_params.get('s', '').strip()
+        cursor = request.query_params.get('cursor')
 
-        queryset = Patient.objects.all().order_by('id').annotate(
-            full_name=Concat(
-                'last_name', Value(' '),
-                'first_name', Value(' '),
-                'middle_name',
-                output_field=CharField()
-            )
-        )
+        queryset = Patient.objects.all().order_by('id')
+        order_fields = ['id']
 
         if search_phrase:
-            filters = Q(first_name__icontains=search_phrase) | \
-                      Q(last_name__icontains=search_phrase) | \
-                      Q(middle_name__icontains=search_phrase) | \
-                      Q(full_name__icontains=search_phrase) | \
-                      Q(phone_number__icontains=search_phrase) | \
-                      Q(email__icontains=search_phrase)
+            filters = Q()
+            search_query = build_patient_search_query(search_phrase)
+            if search_query is not None:
+                filters |= Q(search_vector=search_query)
             if search_phrase.isdigit():
                 filters |= Q(id=int(search_phrase))
-            queryset = queryset.filter(filters)
+            queryset = queryset.filter(filters) if filters else queryset.none()
+
+            if search_query is not None:
+                # float4 ранг після JSON-курсора не дорівнює собі ж у PostgreSQL;
+                # numeric робить ключ курсора точним, і рядки з однаковим рангом не губляться між сторінками
+                queryset = queryset.annotate(
+                    rank=Cast(SearchRank(F('search_vector'), search_query),
+                              DecimalField(max_digits=12, decimal_places=8))
+                ).order_by('-rank', 'id')
+                order_fields = ['-rank', 'id']
+
+        if cursor is not None:
+            try:
+                page_qs, next_cursor, prev_cursor = paginate_by_cursor(queryset, order_fields, cursor, per_page)
+            except InvalidCursorError as e:
+                return JsonResponse({
+                    'payloadType': 'ErrorResponseDto',
+                    'payload': {'detail': str(e)}
+                }, status=status.HTTP_400_BAD_REQUEST)
+
+            serializer = PatientSerializer(page_qs, many=True)
+            return JsonResponse({
+                'payloadType': 'PatientsRegistryDto',
+                'payload': {
+                    'perPage': per_page,
+                    'nextCursor': next_cursor,
+                    'prevCursor': prev_cursor,
+                    'entries': serializer.data
+                }
+            }, status=status.HTTP_200_OK)
 
-        total_count = queryset.count()
+        total_count, is_count_exact = count_registry(queryset, is_filtered=bool(search_phrase))
         start_index = (page - 1) * per_page
         end_index = start_index + per_page
 
@@ -129,6 +155,7 @@ class PatientListView(APIView):
                 'page': page,
                 'perPage': per_page,
                 'totalPages': ceil(total_count / per_page),
+                'isCountExact': is_count_exact,
                 'entries': serializer.data
             }
         }, status=status.HTTP_200_OK)
@@ -2,4 +2,7 @@
 echo "Starting Django application..."
 python3 manage.py collectstatic --noinput
 python3 manage.py migrate --noinput
-python3 -m gunicorn --bind 0.0.0.0:8000 --workers 3 private_hospital.wsgi:application
\ No newline at end of file
+# gthread: live stats streams (stats/cumulate/stream) occupy a thread each, not a whole worker;
+# they end after STATS_STREAM_MAX_DURATION seconds, below --timeout
+python3 -m gunicorn --bind 0.0.0.0:8000 --workers 3 --worker-class gthread --threads 8 --timeout 30 \
+    private_hospital.wsgi:application
\ No newline at end of file
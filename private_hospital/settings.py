@@ -187,4 +187,55 @@ API_BASE = 'api/ph/v0'
 API_PUB = f'{API_BASE}/public'
 API_DOC = f'{API_BASE}/doctor'
 API_REG = f'{API_BASE}/registrar'
-API_OWN = f'{API_BASE}/owner'
\ No newline at end of file
+API_OWN = f'{API_BASE}/owner'
+
+# Registry totals: unfiltered tables above the threshold are counted from pg_class estimates,
+# filtered totals are cached for a short time
+REGISTRY_COUNT_ESTIMATE_THRESHOLD = int(os.getenv("REGISTRY_COUNT_ESTIMATE_THRESHOLD", 100000))
+REGISTRY_COUNT_CACHE_TTL = int(os.getenv("REGISTRY_COUNT_CACHE_TTL", 30))
+
+# How long (seconds) a worker trusts its in-process active price table before re-checking the version stamp
+PRICE_TABLE_CHECK_INTERVAL = float(os.getenv("PRICE_TABLE_CHECK_INTERVAL", 5))
+
+# Clinic-local time zone for schedules and slot labels ('Etc/GMT-2' is a fixed UTC+2; set 'Europe/Kyiv' for DST)
+CLINIC_TIME_ZONE = os.getenv("CLINIC_TIME_ZONE", "Etc/GMT-2")
+
+# Appointment e-mails go through the outbox table; the drain_email_outbox worker retries failures
+# with exponential backoff (seconds) and gives up after EMAIL_OUTBOX_MAX_ATTEMPTS
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv("EMAIL_OUTBOX_MAX_ATTEMPTS", 8))
+EMAIL_OUTBOX_RETRY_BASE = int(os.getenv("EMAIL_OUTBOX_RETRY_BASE", 30))
+EMAIL_OUTBOX_RETRY_MAX = int(os.getenv("EMAIL_OUTBOX_RETRY_MAX", 3600))
+
+# Mail transport: 'sendgrid' (pooled API client), 'memory' or 'file' (JSON Lines sink at MAIL_SINK_PATH)
+# for running booking and verification flows offline
+MAIL_TRANSPORT = os.getenv("MAIL_TRANSPORT", "sendgrid")
+MAIL_SINK_PATH = os.getenv("MAIL_SINK_PATH", str(BASE_DIR / "mail-sink.jsonl"))
+MAIL_FROM_EMAIL = os.getenv("MAIL_FROM_EMAIL", "appointments@vitalineph.com")
+SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
+
+# Default clinic-local day window (HH:MM) for the cumulative visits chart, and how often (seconds)
+# the live stats stream sends a keep-alive when nothing changes
+CLINIC_STATS_DAY_START = os.getenv("CLINIC_STATS_DAY_START", "09:00")
+CLINIC_STATS_DAY_END = os.getenv("CLINIC_STATS_DAY_END", "19:00")
+STATS_STREAM_HEARTBEAT = float(os.getenv("STATS_STREAM_HEARTBEAT", 15))
+# Each open stream holds a gunicorn worker thread and its own LISTEN connection, so it ends after
+# STATS_STREAM_MAX_DURATION seconds and the browser reconnects after STATS_STREAM_RETRY milliseconds.
+# Keep the duration below gunicorn's --timeout and run gthread workers with spare --threads
+# (see entrypoint.prod.sh) so wall displays do not occupy every worker serving the API
+STATS_STREAM_MAX_DURATION = float(os.getenv("STATS_STREAM_MAX_DURATION", 25))
+STATS_STREAM_RETRY = int(os.getenv("STATS_STREAM_RETRY", 1000))
+
+# stats/* responses are cached until an appointment status transition bumps the stats version.
+# Local memory is per worker, so other workers see changes only after STATS_CACHE_TTL seconds;
+# set STATS_CACHE_REDIS_URL (requires the redis package) to share the cache and its version between workers
+STATS_CACHE_ALIAS = 'stats'
+STATS_CACHE_TTL = int(os.getenv("STATS_CACHE_TTL", 60))
+STATS_CACHE_REDIS_URL = os.getenv("STATS_CACHE_REDIS_URL")
+CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    STATS_CACHE_ALIAS: (
+        {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': STATS_CACHE_REDIS_URL}
+        if STATS_CACHE_REDIS_URL else
+        {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'clinic-stats'}
+    ),
+}